@@ -0,0 +1,26 @@
+from django_filters import rest_framework as filters
+
+from .models import AuditEvent
+
+
+class AuditEventFilter(filters.FilterSet):
+    """
+    Query parameter filters for the audit trail.
+
+    GET /api/v1/audit-events/?subject_type=patient&subject_id=42&start=2025-01-01&end=2025-02-01
+    GET /api/v1/audit-events/?user=7&action=view&start=2025-01-01
+
+    Filter by subject or by user, bounded by ``start``/``end``: those follow
+    the indexes and let Postgres prune monthly partitions.
+    """
+
+    subject_type = filters.CharFilter(field_name="subject_type")
+    subject_id = filters.NumberFilter(field_name="subject_id")
+    user = filters.NumberFilter(field_name="user")
+    action = filters.ChoiceFilter(choices=AuditEvent.Action.choices)
+    start = filters.DateTimeFilter(field_name="occurred_at", lookup_expr="gte")
+    end = filters.DateTimeFilter(field_name="occurred_at", lookup_expr="lt")
+
+    class Meta:
+        model = AuditEvent
+        fields = ["subject_type", "subject_id", "user", "action", "start", "end"]
@@ -0,0 +1,188 @@
+"""
+Append-only audit trail of who viewed or changed patient data (HIPAA).
+
+Events are ``AuditEvent`` rows for ``Patient``, ``EMSReport`` and ``Trip``:
+
+- views: ``AuditMiddleware`` (audit.middleware) records successful reads of
+  their API endpoints, and of ``ArchivedTrip``'s (archived trips keep their
+  EMS report data), one event per request; list and export requests have
+  no subject id and keep their query string in ``path``;
+- changes: model signals (audit.signals) record creates, updates and deletes
+  once the transaction commits. Queryset ``update()`` and ``delete()`` send
+  no signals; code using them records its own events (trips.lifecycle does).
+
+Recording never touches the database. Events go into a bounded in-process
+queue of ``AUDIT_BUFFER_SIZE`` events, and a daemon thread in each process
+writes them out with one ``bulk_create`` per ``AUDIT_BATCH_SIZE`` events, at
+least every ``AUDIT_FLUSH_INTERVAL`` seconds. A batch that fails to write is
+retried until it succeeds. When the queue is full the event is counted in
+``atw_audit_events_dropped_total`` and logged on the ``audit.overflow``
+logger instead, so the trail survives in the logs.
+
+The queue is lost if a process is killed; ``flush`` runs at exit otherwise.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from prometheus_client import Counter, Gauge
+
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+overflow_logger = logging.getLogger("audit.overflow")
+
+RECORDED = Counter("atw_audit_events_total", "Audit events recorded", ["action", "subject_type"])
+DROPPED = Counter("atw_audit_events_dropped_total", "Audit events dropped because the buffer was full")
+WRITTEN = Counter("atw_audit_events_written_total", "Audit events written to the database")
+FLUSH_FAILURES = Counter("atw_audit_flush_failures_total", "Audit batches that failed to write and were retried")
+BUFFERED = Gauge("atw_audit_buffer_events", "Audit events waiting to be written by this process")
+
+# Request being served, set by AuditMiddleware; None in tasks and management commands
+_request = contextvars.ContextVar("audit_request", default=None)
+
+
+def current_request():
+    return _request.get()
+
+
+def _client_ip(request):
+    return request.META.get("REMOTE_ADDR") or None
+
+
+def build_event(action, subject_type, subject_id=None, fields=None, request=None):
+    """Return an unsaved ``AuditEvent``, attributed to ``request`` (default: the current one)."""
+    request = request or current_request()
+    event = AuditEvent(action=action, subject_type=subject_type, subject_id=subject_id, fields=fields)
+    if request is not None:
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            event.user_id = user.pk
+        event.method = request.method
+        event.path = request.get_full_path()[:255]
+        event.ip_address = _client_ip(request)
+    return event
+
+
+class AuditLog:
+    """Bounded queue of audit events drained to the database in batches by a per-process thread."""
+
+    def __init__(self):
+        self.queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so each worker process gets its own queue and writer
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(maxsize=getattr(settings, "AUDIT_BUFFER_SIZE", 10000))
+            self._pid = os.getpid()
+            BUFFERED.set_function(self.queue.qsize)
+            if getattr(settings, "AUDIT_BACKGROUND_FLUSH", True):
+                threading.Thread(target=self._run, name="audit-writer", daemon=True).start()
+
+    def put(self, event):
+        """Queue ``event`` without blocking; counts and logs it when the buffer is full."""
+        self._ensure_started()
+        RECORDED.labels(event.action, event.subject_type).inc()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            DROPPED.inc()
+            overflow_logger.warning(
+                json.dumps(
+                    {
+                        "occurred_at": event.occurred_at.isoformat(),
+                        "user_id": event.user_id,
+                        "action": event.action,
+                        "subject_type": event.subject_type,
+                        "subject_id": event.subject_id,
+                        "fields": event.fields,
+                        "method": event.method,
+                        "path": event.path,
+                        "ip_address": event.ip_address,
+                    }
+                )
+            )
+
+    def take(self, batch_size, timeout=None):
+        """Return up to ``batch_size`` queued events, waiting up to ``timeout`` seconds for them to collect."""
+        self._ensure_started()
+        events = []
+        deadline = time.monotonic() + timeout if timeout else None
+        while len(events) < batch_size:
+            try:
+                if deadline is None:
+                    events.append(self.queue.get_nowait())
+                else:
+                    events.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return events
+
+    def write(self, events):
+        if events:
+            AuditEvent.objects.bulk_create(events)
+            WRITTEN.inc(len(events))
+
+    def flush(self):
+        """Write everything queued so far in this thread; returns the events written."""
+        batch_size = getattr(settings, "AUDIT_BATCH_SIZE", 500)
+        written = 0
+        while events := self.take(batch_size):
+            self.write(events)
+            written += len(events)
+        return written
+
+    def _run(self):
+        batch_size = getattr(settings, "AUDIT_BATCH_SIZE", 500)
+        interval = getattr(settings, "AUDIT_FLUSH_INTERVAL", 2.0)
+        events = []
+        while True:
+            if not events:
+                events = self.take(batch_size, timeout=interval)
+            if not events:
+                continue
+            try:
+                close_old_connections()
+                self.write(events)
+                events = []
+            except Exception:
+                FLUSH_FAILURES.inc()
+                logger.exception("Could not write %d audit events, retrying", len(events))
+                time.sleep(interval)
+
+
+audit_log = AuditLog()
+
+
+def record(action, subject_type, subject_id=None, fields=None, request=None):
+    """Record an audit event now."""
+    audit_log.put(build_event(action, subject_type, subject_id, fields, request))
+
+
+def record_on_commit(action, subject_type, subject_id=None, fields=None):
+    """Record an audit event once the current transaction commits, attributed to the current request."""
+    event = build_event(action, subject_type, subject_id, fields)
+    transaction.on_commit(lambda: audit_log.put(event))
+
+
+@atexit.register
+def _flush_at_exit():
+    if audit_log._pid == os.getpid():
+        try:
+            audit_log.flush()
+        except Exception:
+            logger.exception("Could not write the remaining audit events")
@@ -0,0 +1,67 @@
+"""
+Records reads of the audited API endpoints (see audit.log).
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .log import _request, record
+from .models import AuditEvent
+
+# Router basenames of the audited viewsets, which are also the subjects' model names
+AUDITED_ROUTES = ("patient", "emsreport", "trip", "archivedtrip")
+READ_METHODS = ("GET", "HEAD")
+
+
+def audited_subject(request, response):
+    """Return ``(subject_type, subject_id)`` when the request read an audited endpoint, else None."""
+    match = getattr(request, "resolver_match", None)
+    if request.method not in READ_METHODS or response.status_code >= 400 or match is None or not match.url_name:
+        return None
+    basename = match.url_name.split("-", 1)[0]
+    if basename not in AUDITED_ROUTES:
+        return None
+    subject_id = match.kwargs.get("pk")
+    return basename, int(subject_id) if subject_id and str(subject_id).isdigit() else None
+
+
+class AuditMiddleware:
+    """
+    Makes the request available to audit signals and records reads of the endpoints in AUDITED_ROUTES.
+
+    Place after ``AuthenticationMiddleware``; token-authenticated users are
+    known once the view has run.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = _request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        self.record_read(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = _request.set(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+        self.record_read(request, response)
+        return response
+
+    def record_read(self, request, response):
+        subject = audited_subject(request, response)
+        if subject is not None:
+            record(AuditEvent.Action.VIEW, *subject, request=request)
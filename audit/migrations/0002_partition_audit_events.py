@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from trips.partitions import partition_table
+
+
+def partition_audit_events(apps, schema_editor):
+    # Postgres only: other databases keep a plain table (see trips.partitions)
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    partition_table(schema_editor, apps.get_model("audit", "AuditEvent"), "occurred_at")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("audit", "0001_initial"),
+        ("trips", "0007_partition_history_tables"),
+    ]
+
+    operations = [
+        # Reversing leaves the table partitioned, which the earlier model state reads and writes unchanged
+        migrations.RunPython(partition_audit_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class AuditEvent(models.Model):
+    """
+    One access to, or change of, patient data: who, what, when, from where.
+
+    Append-only; written in batches by audit.log. On Postgres the table is
+    range partitioned by month on ``occurred_at`` (see trips.partitions);
+    bound ``occurred_at`` in queries so partitions are pruned. The user is
+    not constrained, so deleting a user never touches their trail.
+    """
+
+    class Action(models.TextChoices):
+        VIEW = "view", _("Viewed")
+        CREATE = "create", _("Created")
+        UPDATE = "update", _("Updated")
+        DELETE = "delete", _("Deleted")
+
+    occurred_at = models.DateTimeField(default=timezone.now)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", blank=True, null=True
+    )
+    action = models.CharField(max_length=10, choices=Action.choices)
+    # Model name of the subject (patient, emsreport, trip, archivedtrip); no id for list and export requests
+    subject_type = models.CharField(max_length=32)
+    subject_id = models.BigIntegerField(blank=True, null=True)
+    # Fields written by an update, when known
+    fields = models.JSONField(blank=True, null=True)
+
+    method = models.CharField(max_length=10, blank=True)
+    path = models.CharField(max_length=255, blank=True)
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["subject_type", "subject_id", "occurred_at"], name="audit_subject_time_idx"),
+            models.Index(fields=["user", "occurred_at"], name="audit_user_time_idx"),
+            models.Index(fields=["occurred_at"], name="audit_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.action} {self.subject_type} {self.subject_id}"
@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+from .models import AuditEvent
+
+
+class AuditEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditEvent
+        fields = "__all__"
@@ -0,0 +1,32 @@
+"""
+Records creates, updates and deletes of audited models once they commit (see audit.log).
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ems.models import EMSReport
+from patients.models import Patient
+from trips.models import Trip
+
+from .log import record_on_commit
+from .models import AuditEvent
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_save, sender=EMSReport)
+@receiver(post_save, sender=Trip)
+def audit_save(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        record_on_commit(AuditEvent.Action.CREATE, sender._meta.model_name, instance.pk)
+    else:
+        fields = sorted(update_fields) if update_fields else None
+        record_on_commit(AuditEvent.Action.UPDATE, sender._meta.model_name, instance.pk, fields)
+
+
+# Connected per model: a post_delete receiver for every sender would stop Django's fast deletes everywhere
+@receiver(post_delete, sender=Patient)
+@receiver(post_delete, sender=EMSReport)
+@receiver(post_delete, sender=Trip)
+def audit_delete(sender, instance, **kwargs):
+    record_on_commit(AuditEvent.Action.DELETE, sender._meta.model_name, instance.pk)
@@ -0,0 +1,192 @@
+"""
+Tests for the HIPAA audit trail.
+"""
+
+from unittest import mock
+
+from django.contrib.auth.models import Permission
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from audit.log import AuditLog, audit_log, build_event
+from audit.models import AuditEvent
+from ems.models import EMSReport
+from patients.models import Patient
+from trips.models import ArchivedTrip, Trip
+from users.models import User
+
+
+class AuditTestCase(TestCase):
+    def setUp(self):
+        # Drop events queued by other tests; nothing writes them in the background under the test runner
+        while audit_log.take(1000):
+            pass
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="nurse", email="nurse@example.com", password="pass123", role=User.Role.PARAMEDIC
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+        self.patient = Patient.objects.create(name="Jane Roe", dob="1970-05-01")
+
+    def written(self):
+        audit_log.flush()
+        return list(AuditEvent.objects.order_by("pk").values_list("user_id", "action", "subject_type", "subject_id", "fields"))
+
+
+class AuditCaptureTestCase(AuditTestCase):
+    """Test what is recorded from requests and model changes."""
+
+    def test_reads_of_audited_endpoints(self):
+        """Successful reads are recorded with the token user; other endpoints and errors are not."""
+        self.client.get(reverse("patient-detail", args=[self.patient.pk]))
+        self.client.get(reverse("patient-list"), {"dob": "1970-05-01"})
+        self.client.get(reverse("patient-detail", args=[self.patient.pk + 1000]))
+        self.client.get(reverse("vehicle-list"))
+
+        self.assertEqual(
+            self.written(),
+            [
+                (self.user.pk, "view", "patient", self.patient.pk, None),
+                (self.user.pk, "view", "patient", None, None),
+            ],
+        )
+        event = AuditEvent.objects.get(subject_id=self.patient.pk)
+        self.assertEqual(
+            (event.method, event.path, event.ip_address), ("GET", f"/api/v1/patients/{self.patient.pk}/", "127.0.0.1")
+        )
+        self.assertIn("dob=1970-05-01", AuditEvent.objects.get(subject_id=None).path)
+
+    def test_reads_of_archived_trips(self):
+        """Archived trips keep EMS report data, so their reads are recorded too."""
+        now = timezone.now()
+        archived = ArchivedTrip.objects.create(
+            id=9001,
+            patient=self.patient,
+            start_location="Home",
+            end_location="Clinic",
+            status=Trip.Status.COMPLETED,
+            created_at=now,
+            updated_at=now,
+            ems_medical_data="BP 120/80",
+        )
+        self.client.get(reverse("archivedtrip-list"))
+        self.client.get(reverse("archivedtrip-detail", args=[archived.pk]))
+        self.client.get(reverse("archivedtrip-messages", args=[archived.pk]))
+
+        self.assertEqual(
+            self.written(),
+            [
+                (self.user.pk, "view", "archivedtrip", None, None),
+                (self.user.pk, "view", "archivedtrip", archived.pk, None),
+                (self.user.pk, "view", "archivedtrip", archived.pk, None),
+            ],
+        )
+
+    def test_changes_are_recorded_on_commit(self):
+        """Creates, updates and deletes are recorded once committed, with the fields written."""
+        with self.captureOnCommitCallbacks(execute=True):
+            trip = Trip.objects.create(patient=self.patient, start_location="Home", end_location="Clinic")
+            report = EMSReport.objects.create(trip=trip, medical_data="BP 120/80")
+            report_id = report.pk
+            self.patient.name = "Jane Q. Roe"
+            self.patient.save(update_fields=["name"])
+            report.delete()
+
+        self.assertEqual(
+            self.written(),
+            [
+                (None, "create", "trip", trip.pk, None),
+                (None, "create", "emsreport", report_id, None),
+                (None, "update", "patient", self.patient.pk, ["name"]),
+                (None, "delete", "emsreport", report_id, None),
+            ],
+        )
+
+    def test_rolled_back_changes_are_not_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError), transaction.atomic():
+            self.patient.delete()
+            raise RuntimeError
+        self.assertEqual(self.written(), [])
+
+    def test_api_changes_and_transitions_name_the_user(self):
+        """Writes through the API carry the request's user, transitions included."""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse("patient-detail", args=[self.patient.pk]), {"name": "J. Roe"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        trip = Trip.objects.create(start_location="Home", end_location="Clinic")
+        with mock.patch("trips.outbox.kick"), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("trip-transition", args=[trip.pk]), {"status": "cancelled"}, format="json")
+
+        events = self.written()
+        self.assertEqual(
+            events,
+            [
+                (self.user.pk, "update", "patient", self.patient.pk, None),
+                (self.user.pk, "update", "trip", trip.pk, ["status", "version"]),
+            ],
+        )
+
+
+class AuditBufferTestCase(AuditTestCase):
+    """Test the bounded buffer and batched writes."""
+
+    @override_settings(AUDIT_BUFFER_SIZE=2, AUDIT_BATCH_SIZE=2)
+    def test_overflow_is_counted_and_logged(self):
+        """Events beyond the buffer are dropped from the table but kept in the log."""
+        log = AuditLog()
+        dropped = REGISTRY.get_sample_value("atw_audit_events_dropped_total") or 0
+        with self.assertLogs("audit.overflow", "WARNING") as logs:
+            for subject_id in range(3):
+                log.put(build_event(AuditEvent.Action.VIEW, "patient", subject_id))
+
+        self.assertEqual(REGISTRY.get_sample_value("atw_audit_events_dropped_total"), dropped + 1)
+        self.assertIn('"subject_id": 2', logs.output[0])
+        with self.assertNumQueries(1):
+            self.assertEqual(log.flush(), 2)
+        self.assertEqual(list(AuditEvent.objects.values_list("subject_id", flat=True).order_by("subject_id")), [0, 1])
+
+    @override_settings(AUDIT_BATCH_SIZE=50)
+    def test_flush_writes_in_batches(self):
+        for subject_id in range(120):
+            audit_log.put(build_event(AuditEvent.Action.VIEW, "trip", subject_id))
+        with self.assertNumQueries(3):
+            self.assertEqual(audit_log.flush(), 120)
+
+
+class AuditQueryTestCase(AuditTestCase):
+    """Test the audit trail API."""
+
+    def setUp(self):
+        super().setUp()
+        self.auditor = User.objects.create_user(username="auditor", password="pass123", role=User.Role.ADMIN)
+        self.auditor.user_permissions.add(Permission.objects.get(content_type__app_label="audit", codename="view_auditevent"))
+        other = Patient.objects.create(name="John Roe")
+        for subject_id in (self.patient.pk, self.patient.pk, other.pk):
+            audit_log.put(build_event(AuditEvent.Action.VIEW, "patient", subject_id))
+        audit_log.flush()
+
+    def test_filter_by_subject(self):
+        self.client.force_authenticate(self.auditor)
+        response = self.client.get(reverse("auditevent-list"), {"subject_type": "patient", "subject_id": self.patient.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["subject_id"] for row in response.data["results"]], [self.patient.pk] * 2)
+        self.assertIsNone(response.data["previous"])
+
+    def test_only_auditors_can_read(self):
+        """The admin role alone, which users get by default, does not grant access; staff status does."""
+        self.assertEqual(self.client.get(reverse("auditevent-list")).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = User.objects.create_user(username="dispatch_admin", email="dispatch_admin@example.com", password="pass123")
+        self.assertEqual(admin.role, User.Role.ADMIN)
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get(reverse("auditevent-list")).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin.is_staff = True
+        self.assertEqual(self.client.get(reverse("auditevent-list")).status_code, status.HTTP_200_OK)
@@ -0,0 +1,33 @@
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import pagination, permissions, viewsets
+
+from .filters import AuditEventFilter
+from .models import AuditEvent
+from .serializers import AuditEventSerializer
+
+
+class IsAuditor(permissions.BasePermission):
+    """Staff and users granted ``audit.view_auditevent`` (directly or through a group) may read the audit trail."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and (user.is_staff or user.has_perm("audit.view_auditevent")))
+
+
+class AuditEventPagination(pagination.CursorPagination):
+    # Keyset pages over occurred_at: no OFFSET scans however deep the trail
+    ordering = ("-occurred_at", "-id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class AuditEventViewSet(viewsets.ReadOnlyModelViewSet):
+    """Who viewed or changed patient, EMS report and trip data, newest first (see audit.log)."""
+
+    queryset = AuditEvent.objects.all()
+    serializer_class = AuditEventSerializer
+    permission_classes = [IsAuditor]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AuditEventFilter
+    pagination_class = AuditEventPagination
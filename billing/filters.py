@@ -0,0 +1,23 @@
+from django_filters import rest_framework as filters
+
+from .models import Invoice
+
+
+class InvoiceFilter(filters.FilterSet):
+    """
+    Query parameter filters for invoices.
+
+    GET /api/v1/invoices/?status=pending&due_before=2025-02-01&company=3&ordering=due_date
+    """
+
+    status = filters.MultipleChoiceFilter(choices=Invoice.Status.choices, distinct=False)
+    company = filters.NumberFilter(field_name="company")
+    trip = filters.NumberFilter(field_name="trip")
+    due_after = filters.DateTimeFilter(field_name="due_date", lookup_expr="gte")
+    due_before = filters.DateTimeFilter(field_name="due_date", lookup_expr="lt")
+    start = filters.DateTimeFilter(field_name="created_at", lookup_expr="gte")
+    end = filters.DateTimeFilter(field_name="created_at", lookup_expr="lt")
+
+    class Meta:
+        model = Invoice
+        fields = ["status", "company", "trip", "due_after", "due_before", "start", "end"]
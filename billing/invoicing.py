@@ -0,0 +1,119 @@
+"""
+Batch invoicing of completed trips.
+
+Completed trips without an invoice are walked by primary key (keyset
+pagination) in fixed-size chunks. Each chunk is one transaction that reads
+only the columns pricing needs, prices the whole chunk in one pass and
+inserts its invoices with a single ``bulk_create``. Concurrent runs skip
+each other's locked trips, and ``generate_invoice`` takes the same trip lock,
+so every trip a batch selects is still uninvoiced when it inserts and the
+invoices it reports are exactly the ones it created. Should anything else
+invoice one of those trips meanwhile, ``Invoice.trip`` being unique fails
+the batch's insert; the batch rolls back and is retried without that trip,
+up to ``MAX_BATCH_RETRIES`` times before the error is raised.
+
+Trips whose patient has no company cannot be billed and are left alone.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from trips.models import Trip
+
+from .models import Invoice
+from .pricing import get_tariff
+
+DEFAULT_DISTANCE_KM = Decimal("10.0")  # When the trip has no odometer readings
+
+# Attempts at a batch after its insert failed an integrity check, before giving up
+MAX_BATCH_RETRIES = 3
+
+# Columns read per trip: everything pricing and the invoice row need
+TRIP_COLUMNS = ["pk", "patient__company_id", "start_odometer", "end_odometer"]
+
+
+def invoiceable_trips():
+    return Trip.objects.filter(status=Trip.Status.COMPLETED, invoice__isnull=True, patient__company__isnull=False)
+
+
+def trip_distance(start_odometer, end_odometer):
+    if start_odometer is None or end_odometer is None or end_odometer < start_odometer:
+        return DEFAULT_DISTANCE_KM
+    return Decimal(str(end_odometer - start_odometer))
+
+
+def price_trips(rows, tariff=None, at=None):
+    """
+    Price ``(company_id, start_odometer, end_odometer)`` rows in one pass.
+
+    Returns a list of ``(amount, tax)`` pairs, rounded to cents, in input order.
+    """
+    tariff = tariff or get_tariff()
+    return tariff.price_many(((company_id, trip_distance(start, end)) for company_id, start, end in rows), at)
+
+
+def invoice_batch(after_id=0, batch_size=1000, now=None):
+    """
+    Invoice the next ``batch_size`` invoiceable trips with ids above ``after_id``.
+
+    Returns ``(last_trip_id, invoices)`` where ``invoices`` lists the
+    ``(invoice_id, company_id)`` pairs created; ``last_trip_id`` is None
+    when nothing is left.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = list(
+            invoiceable_trips()
+            .filter(pk__gt=after_id)
+            .order_by("pk")
+            .select_for_update(skip_locked=True, of=("self",))
+            .values_list(*TRIP_COLUMNS)[:batch_size]
+        )
+        if not rows:
+            return None, []
+
+        tariff = get_tariff()
+        prices = price_trips((row[1:] for row in rows), tariff, now)
+        due_date = now + timedelta(days=tariff.payment_terms_days)
+        invoices = Invoice.objects.bulk_create(
+            [
+                Invoice(trip_id=trip_id, company_id=company_id, amount=amount, tax=tax, due_date=due_date)
+                for (trip_id, company_id, _, _), (amount, tax) in zip(rows, prices)
+            ]
+        )
+    return rows[-1][0], [(invoice.pk, invoice.company_id) for invoice in invoices]
+
+
+def invoice_trips(batch_size=None, now=None):
+    """
+    Invoice every completed, uninvoiced trip, batch by batch.
+
+    Returns ``{company_id: [invoice_id, ...]}`` for the invoices created.
+    """
+    batch_size = batch_size or getattr(settings, "INVOICE_BATCH_SIZE", 1000)
+    now = now or timezone.now()
+
+    by_company = {}
+    last_id = 0
+    conflicts = 0
+    while True:
+        try:
+            next_id, invoices = invoice_batch(after_id=last_id, batch_size=batch_size, now=now)
+        except IntegrityError:
+            # A trip in the batch was invoiced without its lock and the retry no longer selects it;
+            # an error that repeats has another cause and is raised
+            conflicts += 1
+            if conflicts > MAX_BATCH_RETRIES:
+                raise
+            continue
+        conflicts = 0
+        if next_id is None:
+            break
+        last_id = next_id
+        for invoice_id, company_id in invoices:
+            by_company.setdefault(company_id, []).append(invoice_id)
+    return by_company
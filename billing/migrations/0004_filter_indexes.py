@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0003_export_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="invoice",
+            index=models.Index(fields=["status", "due_date"], name="invoice_status_due_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="invoice",
+            index=models.Index(condition=models.Q(("status", "pending")), fields=["due_date"], name="invoice_pending_due_idx"),
+        ),
+    ]
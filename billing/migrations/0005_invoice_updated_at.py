@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0004_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="invoice",
+            index=models.Index(fields=["updated_at"], name="invoice_updated_idx"),
+        ),
+    ]
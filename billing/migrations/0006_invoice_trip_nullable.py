@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0007_partition_history_tables"),
+        ("billing", "0005_invoice_updated_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="invoice",
+            name="trip",
+            field=models.OneToOneField(
+                blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="invoice", to="trips.trip"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0006_invoice_trip_nullable"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contract",
+            name="base_fare",
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name="contract",
+            name="per_km_rate",
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name="contract",
+            name="tax_rate",
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=5, null=True),
+        ),
+    ]
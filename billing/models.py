@@ -8,7 +8,8 @@ class Invoice(models.Model):
         PAID = "paid", _("Paid")
         OVERDUE = "overdue", _("Overdue")
 
-    trip = models.OneToOneField("trips.Trip", on_delete=models.CASCADE, related_name="invoice")
+    # Cleared when the trip is archived; the archived trip keeps the invoice id (see trips.archive)
+    trip = models.OneToOneField("trips.Trip", on_delete=models.CASCADE, related_name="invoice", blank=True, null=True)
     company = models.ForeignKey("users.Company", on_delete=models.CASCADE, related_name="invoices")
 
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -16,8 +17,18 @@ class Invoice(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     due_date = models.DateTimeField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["company", "created_at"], name="invoice_company_created_idx"),
+            models.Index(fields=["status", "due_date"], name="invoice_status_due_idx"),
+            models.Index(fields=["due_date"], condition=models.Q(status="pending"), name="invoice_pending_due_idx"),
+            # Watermark scans for the operational rollups (reports.rollups)
+            models.Index(fields=["updated_at"], name="invoice_updated_idx"),
+        ]
+
     @property
     def total(self):
         return self.amount + self.tax
@@ -43,6 +54,11 @@ class Contract(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.ACTIVE)
     terms_document_path = models.CharField(max_length=255, blank=True, null=True)
 
+    # Rate card for client contracts; blank rates fall back to SystemSettings (see billing.pricing)
+    base_fare = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    per_km_rate = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=4, blank=True, null=True)
+
     def __str__(self):
         return f"Contract for {self.company}"
 
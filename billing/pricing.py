@@ -0,0 +1,180 @@
+"""
+Compiled tariff for pricing trips.
+
+The active ``SystemSettings`` pricing keys and every contract's rate card
+are compiled into an immutable ``Tariff``: a default ``RateCard`` plus, per
+company, the contract rate cards with the period they apply to. Pricing
+looks rates up in those tables and never touches the database, so a batch
+of thousands of trips costs one ``Tariff.price_many`` call.
+
+Pricing settings come from the process's ``SystemSettings`` snapshot
+(billing.system_settings), which has its own invalidation; contracts are
+versioned by a shared tariff version (a Django cache key) that saving or
+deleting a ``Contract`` bumps (see ``billing.signals``). Each process keeps
+its compiled tariff until it was compiled from an older snapshot or the
+tariff version changes, so every web and Celery process recompiles on its
+next lookup. Bulk ``QuerySet.update`` calls bypass the signals; call
+``invalidate_tariff`` (or ``invalidate_system_settings``) after them. If the
+cache is unreachable, processes keep their current tariff.
+"""
+
+import bisect
+import logging
+import threading
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from types import MappingProxyType
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Contract
+from .system_settings import get_snapshot
+
+logger = logging.getLogger(__name__)
+
+TARIFF_VERSION_KEY = "billing:tariff:version"
+
+CENT = Decimal("0.01")
+
+
+class RateCard(NamedTuple):
+    base_fare: Decimal
+    per_km_rate: Decimal
+    tax_rate: Decimal
+
+
+# Used for any SystemSettings pricing key that is missing or invalid
+DEFAULT_RATE_CARD = RateCard(Decimal("50.00"), Decimal("2.50"), Decimal("0.15"))
+DEFAULT_PAYMENT_TERMS_DAYS = 30
+
+
+class Tariff:
+    """
+    Immutable pricing tables.
+
+    ``contracts`` maps a company id to a tuple of ``(start, end, RateCard)``
+    sorted by start; a trip priced at ``at`` uses the latest-starting
+    contract whose period covers it, else the default rate card.
+    """
+
+    __slots__ = ("version", "default", "contracts", "payment_terms_days", "_starts")
+
+    def __init__(self, version, default, contracts, payment_terms_days):
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "default", default)
+        object.__setattr__(self, "contracts", MappingProxyType({k: tuple(v) for k, v in contracts.items()}))
+        object.__setattr__(self, "payment_terms_days", payment_terms_days)
+        object.__setattr__(
+            self, "_starts", MappingProxyType({k: tuple(start for start, _, _ in v) for k, v in self.contracts.items()})
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Tariff is immutable")
+
+    def rate_card(self, company_id, at):
+        periods = self.contracts.get(company_id)
+        if periods:
+            # Walk back from the latest contract starting at or before ``at``
+            for start, end, card in reversed(periods[: bisect.bisect_right(self._starts[company_id], at)]):
+                if end >= at:
+                    return card
+        return self.default
+
+    def price(self, company_id, distance_km, at=None):
+        """Return ``(amount, tax)`` for a trip, rounded to cents."""
+        card = self.rate_card(company_id, at or timezone.now())
+        amount = (card.base_fare + Decimal(distance_km) * card.per_km_rate).quantize(CENT, ROUND_HALF_UP)
+        return amount, (amount * card.tax_rate).quantize(CENT, ROUND_HALF_UP)
+
+    def price_many(self, rows, at=None):
+        """Price ``(company_id, distance_km)`` rows; returns ``(amount, tax)`` pairs in input order."""
+        at = at or timezone.now()
+        return [self.price(company_id, distance_km, at) for company_id, distance_km in rows]
+
+
+def _decimal(values, key, default):
+    value = values.get(key)
+    if value is None:
+        return default
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        logger.warning("Invalid pricing setting %s=%r, using %s", key, value, default)
+        return default
+
+
+def _rate_card(contract, default):
+    return RateCard(
+        default.base_fare if contract.base_fare is None else contract.base_fare,
+        default.per_km_rate if contract.per_km_rate is None else contract.per_km_rate,
+        default.tax_rate if contract.tax_rate is None else contract.tax_rate,
+    )
+
+
+def compile_tariff(version=None, snapshot=None):
+    """Compile the pricing settings of ``snapshot`` (default: the current one) and the client contracts into a ``Tariff``."""
+    values = (snapshot or get_snapshot()).values
+    default = RateCard(
+        _decimal(values, "base_fare", DEFAULT_RATE_CARD.base_fare),
+        _decimal(values, "per_km_rate", DEFAULT_RATE_CARD.per_km_rate),
+        _decimal(values, "tax_rate", DEFAULT_RATE_CARD.tax_rate),
+    )
+    terms = _decimal(values, "payment_terms_days", Decimal(DEFAULT_PAYMENT_TERMS_DAYS))
+
+    contracts = {}
+    for contract in Contract.objects.filter(contract_type=Contract.Type.CLIENT, status=Contract.Status.ACTIVE).order_by(
+        "start_date", "pk"
+    ):
+        if contract.base_fare is None and contract.per_km_rate is None and contract.tax_rate is None:
+            continue
+        contracts.setdefault(contract.company_id, []).append(
+            (contract.start_date, contract.end_date, _rate_card(contract, default))
+        )
+    return Tariff(version, default, contracts, int(terms))
+
+
+_lock = threading.Lock()
+_tariff = None
+_compiled_from = None  # The settings snapshot _tariff was compiled from
+
+
+def _shared_version():
+    try:
+        return cache.get_or_set(TARIFF_VERSION_KEY, 1, timeout=None)
+    except Exception:
+        logger.warning("Tariff version unavailable, keeping the compiled tariff", exc_info=True)
+        return None
+
+
+def get_tariff():
+    """Return this process's compiled tariff, recompiling it if the settings snapshot or the shared version moved."""
+    global _tariff, _compiled_from
+    snapshot = get_snapshot()
+    version = _shared_version()
+    tariff = _tariff
+    if tariff is not None and _compiled_from is snapshot and (version is None or tariff.version == version):
+        return tariff
+    with _lock:
+        if _tariff is None or _compiled_from is not snapshot or (version is not None and _tariff.version != version):
+            _tariff = compile_tariff(version, snapshot)
+            _compiled_from = snapshot
+        return _tariff
+
+
+def invalidate_tariff():
+    """Make every process recompile its tariff on its next lookup (contracts; settings go through their snapshot)."""
+    global _tariff
+    _tariff = None
+    try:
+        cache.incr(TARIFF_VERSION_KEY)
+    except ValueError:
+        # No version yet: processes compile on first use anyway
+        pass
+    except Exception:
+        logger.warning("Could not bump the tariff version", exc_info=True)
+
+
+def price_trip(company_id, distance_km, at=None):
+    """Price a single trip with the current tariff."""
+    return get_tariff().price(company_id, distance_km, at)
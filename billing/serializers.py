@@ -9,6 +9,8 @@ class InvoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Invoice
         fields = "__all__"
+        # Only archival detaches invoices from trips
+        extra_kwargs = {"trip": {"required": True, "allow_null": False}}
 
 
 class ContractSerializer(serializers.ModelSerializer):
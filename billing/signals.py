@@ -0,0 +1,29 @@
+"""
+Keep the SystemSettings snapshot (billing.system_settings) and the compiled
+tariff (billing.pricing) in step with settings and contracts.
+
+Invalidation waits for the transaction to commit, so other processes never
+reload while the change is still invisible to them.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Contract, SystemSettings
+from .pricing import invalidate_tariff
+from .system_settings import invalidate_system_settings
+
+
+@receiver(post_save, sender=SystemSettings)
+@receiver(post_delete, sender=SystemSettings)
+def system_settings_changed(sender, **kwargs):
+    """Every process reads the new settings, and recompiles its tariff from them, on its next lookup."""
+    transaction.on_commit(invalidate_system_settings)
+
+
+@receiver(post_save, sender=Contract)
+@receiver(post_delete, sender=Contract)
+def contract_changed(sender, **kwargs):
+    """Every process prices with the new rate card from its next lookup."""
+    transaction.on_commit(invalidate_tariff)
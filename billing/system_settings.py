@@ -0,0 +1,187 @@
+"""
+Process-local SystemSettings snapshot.
+
+All active ``SystemSettings`` rows are loaded once per process into an
+immutable snapshot, so reading a setting is a dictionary lookup:
+
+    from billing.system_settings import get_decimal
+    base_fare = get_decimal("base_fare", Decimal("50.00"))
+
+Saving or deleting a setting (through ``SystemSettingsViewSet`` or anywhere
+else that fires model signals) bumps a shared version counter in the Django
+cache once the transaction commits and publishes it on the
+``SYSTEM_SETTINGS_CHANNEL`` Redis channel. Every web and Celery process
+listens on that channel in a daemon thread and drops its snapshot, reloading
+on the next read. Should a message be missed (or pub/sub be unavailable),
+processes also compare their snapshot with the shared version at most every
+``SYSTEM_SETTINGS_RECHECK_INTERVAL`` seconds.
+
+Each process exports the version it has loaded as the
+``atw_system_settings_version`` gauge; once every pod reports the shared
+version (``shared_version()``), they have all converged.
+"""
+
+import logging
+import os
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from prometheus_client import Gauge
+
+from .models import SystemSettings
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_VERSION_KEY = "billing:settings:version"
+
+LOADED_VERSION = Gauge("atw_system_settings_version", "SystemSettings snapshot version loaded by this process")
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+class SettingsSnapshot:
+    """Immutable view of the active settings at ``version``."""
+
+    __slots__ = ("version", "values")
+
+    def __init__(self, version, values):
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "values", MappingProxyType(dict(values)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SettingsSnapshot is immutable")
+
+
+def _channel():
+    return getattr(settings, "SYSTEM_SETTINGS_CHANNEL", "atw:system_settings")
+
+
+def _recheck_interval():
+    return getattr(settings, "SYSTEM_SETTINGS_RECHECK_INTERVAL", 30)
+
+
+def shared_version():
+    """Return the cluster-wide settings version, or None if the cache is unreachable."""
+    try:
+        return cache.get_or_set(SETTINGS_VERSION_KEY, 1, timeout=None)
+    except Exception:
+        logger.warning("SystemSettings version unavailable", exc_info=True)
+        return None
+
+
+class SettingsCache:
+    """Holds this process's snapshot and the listener that invalidates it."""
+
+    def __init__(self):
+        self._snapshot = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def snapshot(self):
+        self.ensure_listening()
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked < _recheck_interval():
+            return snapshot
+        with self._lock:
+            version = shared_version()
+            if self._snapshot is None or (version is not None and self._snapshot.version != version):
+                rows = SystemSettings.objects.filter(is_active=True).values_list("setting_key", "setting_value")
+                self._snapshot = SettingsSnapshot(version, rows)
+                LOADED_VERSION.set(version or 0)
+            self._checked = time.monotonic()
+            return self._snapshot
+
+    def clear(self):
+        self._snapshot = None
+
+    def ensure_listening(self):
+        # Threads do not survive fork, so each worker process starts its own
+        if self._pid == os.getpid() or not getattr(settings, "SYSTEM_SETTINGS_PUBSUB", True):
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._listen, name="system-settings-listener", daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                from django_redis import get_redis_connection
+
+                pubsub = get_redis_connection("default").pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(_channel())
+                # Anything published while we were not subscribed is unknown; start over
+                self.clear()
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.clear()
+            except Exception:
+                logger.warning("SystemSettings listener lost its connection, retrying", exc_info=True)
+            time.sleep(_recheck_interval())
+
+
+settings_cache = SettingsCache()
+
+
+def get_snapshot():
+    return settings_cache.snapshot()
+
+
+def get_setting(key, default=None):
+    return settings_cache.snapshot().values.get(key, default)
+
+
+def get_decimal(key, default=None):
+    value = get_setting(key)
+    if value is None:
+        return default
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        logger.warning("Invalid decimal setting %s=%r, using %s", key, value, default)
+        return default
+
+
+def get_int(key, default=None):
+    value = get_setting(key)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning("Invalid integer setting %s=%r, using %s", key, value, default)
+        return default
+
+
+def get_bool(key, default=False):
+    value = get_setting(key)
+    if value is None:
+        return default
+    return value.strip().lower() in TRUE_VALUES
+
+
+def invalidate_system_settings():
+    """Bump the shared version and tell every process to reload its snapshot."""
+    settings_cache.clear()
+    try:
+        try:
+            version = cache.incr(SETTINGS_VERSION_KEY)
+        except ValueError:
+            cache.set(SETTINGS_VERSION_KEY, 2, timeout=None)
+            version = 2
+    except Exception:
+        logger.warning("Could not bump the SystemSettings version", exc_info=True)
+        return
+    try:
+        from django_redis import get_redis_connection
+
+        get_redis_connection("default").publish(_channel(), version)
+    except Exception:
+        # Other processes still notice the new version on their next recheck
+        logger.warning("Could not publish the SystemSettings invalidation", exc_info=True)
@@ -4,13 +4,15 @@ Celery background tasks for billing operations.
 Handles invoice generation and email notifications.
 """
 
-from decimal import Decimal
-
 from celery import shared_task
+from django.db import transaction
 from django.utils import timezone
 
+from config.idempotency import idempotent_task
+
 
 @shared_task(queue="normal")
+@idempotent_task
 def generate_invoice(trip_id):
     """
     Generate invoice for a completed trip.
@@ -21,39 +23,34 @@ def generate_invoice(trip_id):
     Returns:
         Invoice ID if successful, error message otherwise
     """
+    from billing.invoicing import price_trips
     from billing.models import Invoice
+    from billing.pricing import get_tariff
     from trips.models import Trip
 
     try:
-        trip = Trip.objects.select_related("patient", "driver", "vehicle").get(id=trip_id)
-
-        # Check if invoice already exists
-        if Invoice.objects.filter(trip_id=trip_id).exists():
+        with transaction.atomic():
+            # The batch (billing.invoicing) holds this lock on the trips it is invoicing
+            trip = Trip.objects.select_related("patient").select_for_update(of=("self",)).get(id=trip_id)
+
+            if not trip.patient or not trip.patient.company_id:
+                return f"No company to bill for trip {trip_id}"
+
+            tariff = get_tariff()
+            [(amount, tax)] = price_trips([(trip.patient.company_id, trip.start_odometer, trip.end_odometer)], tariff)
+
+            invoice, created = Invoice.objects.get_or_create(
+                trip=trip,
+                defaults={
+                    "company_id": trip.patient.company_id,
+                    "amount": amount,
+                    "tax": tax,
+                    "due_date": timezone.now() + timezone.timedelta(days=tariff.payment_terms_days),
+                },
+            )
+        if not created:
             return f"Invoice already exists for trip {trip_id}"
 
-        # Calculate invoice amount (placeholder logic - customize as needed)
-        base_rate = Decimal("50.00")  # Base trip rate
-        distance_km = Decimal("10.0")  # TODO: Calculate from GPS data
-        rate_per_km = Decimal("2.50")
-
-        subtotal = base_rate + (distance_km * rate_per_km)
-        tax_rate = Decimal("0.15")  # 15% tax
-        tax_amount = subtotal * tax_rate
-        total_amount = subtotal + tax_amount
-
-        # Create invoice
-        invoice = Invoice.objects.create(
-            trip=trip,
-            patient=trip.patient,
-            invoice_date=timezone.now().date(),
-            due_date=timezone.now().date() + timezone.timedelta(days=30),
-            subtotal=subtotal,
-            tax=tax_amount,
-            total_amount=total_amount,
-            status="pending",
-            notes=f"Invoice for trip #{trip_id}",
-        )
-
         # Send invoice email
         send_invoice_email.delay(invoice.id)
 
@@ -61,14 +58,58 @@ def generate_invoice(trip_id):
 
     except Trip.DoesNotExist:
         return f"Trip {trip_id} not found"
-    except Exception as e:
-        return f"Error generating invoice for trip {trip_id}: {str(e)}"
 
 
-@shared_task(queue="low_priority")
+@shared_task(queue="normal")
+def generate_invoices():
+    """
+    Periodic task invoicing every completed trip that has no invoice yet.
+
+    Runs nightly (configured in config/celery.py). Trips are priced and
+    invoiced in INVOICE_BATCH_SIZE chunks (see billing.invoicing), and each
+    company gets one send_invoice_batch_email for all of its new invoices.
+    Safe to run on several workers at once.
+    """
+    from billing.invoicing import invoice_trips
+
+    by_company = invoice_trips()
+    for company_id, invoice_ids in by_company.items():
+        send_invoice_batch_email.delay(company_id, invoice_ids)
+
+    created = sum(len(invoice_ids) for invoice_ids in by_company.values())
+    return f"Generated {created} invoices for {len(by_company)} companies"
+
+
+def invoice_lines(invoice_ids):
+    """One line per invoice for the billing emails, in id order."""
+    from billing.models import Invoice
+
+    lines = []
+    for invoice in Invoice.objects.filter(pk__in=invoice_ids).order_by("pk"):
+        due = f", due {invoice.due_date:%Y-%m-%d}" if invoice.due_date else ""
+        lines.append(f"- Invoice #{invoice.pk} for trip #{invoice.trip_id}: {invoice.total}{due}")
+    return "\n".join(lines)
+
+
+def email_company(company, subject, body):
+    """
+    Email ``company`` through the notification transport (users.notifications).
+
+    Raises when nothing was sent, so the idempotency key is released and a
+    retry sends again.
+    """
+    from users.notifications import get_transport
+
+    with get_transport() as transport:
+        if not transport.send([(company.email, subject, body)]):
+            raise RuntimeError(f"Email to {company.email} was not sent")
+
+
+@shared_task(queue="low_priority", ignore_result=True)
+@idempotent_task
 def send_invoice_email(invoice_id):
     """
-    Send invoice email to patient.
+    Send invoice email to the billed company.
 
     Args:
         invoice_id: Invoice ID
@@ -79,59 +120,122 @@ def send_invoice_email(invoice_id):
     from billing.models import Invoice
 
     try:
-        invoice = Invoice.objects.select_related("patient", "trip").get(id=invoice_id)
+        invoice = Invoice.objects.select_related("company").get(id=invoice_id)
+    except Invoice.DoesNotExist:
+        return f"Invoice {invoice_id} not found"
 
-        if not invoice.patient or not invoice.patient.email:
-            return f"No email address for invoice {invoice_id}"
+    if not invoice.company.email:
+        return f"No email address for invoice {invoice_id}"
 
-        # TODO: Implement actual email sending
-        # For now, just log the action
-        # Email subject for reference
-        _ = f"Invoice #{invoice.invoice_number} - ATW Transportation"  # noqa: F841
-        recipient = invoice.patient.email
+    email_company(invoice.company, f"Invoice #{invoice.id} - ATW Transportation", invoice_lines([invoice.id]))
+    return f"Invoice email sent to {invoice.company.email} for invoice {invoice_id}"
 
-        # Placeholder - replace with actual email service
-        # send_email(
-        #     subject=subject,
-        #     recipient=recipient,
-        #     template="invoice_email.html",
-        #     context={"invoice": invoice}
-        # )
 
-        return f"Invoice email sent to {recipient} for invoice {invoice_id}"
+@shared_task(queue="low_priority", ignore_result=True)
+@idempotent_task
+def send_invoice_batch_email(company_id, invoice_ids):
+    """
+    Send one email to a company covering a batch of new invoices.
 
-    except Invoice.DoesNotExist:
-        return f"Invoice {invoice_id} not found"
-    except Exception as e:
-        return f"Error sending invoice email: {str(e)}"
+    Args:
+        company_id: Company ID
+        invoice_ids: IDs of the invoices generated for the company
 
+    Returns:
+        Success or error message
+    """
+    from users.models import Company
 
-@shared_task(queue="normal")
-def process_overdue_invoices():
+    try:
+        company = Company.objects.get(id=company_id)
+    except Company.DoesNotExist:
+        return f"Company {company_id} not found"
+
+    if not company.email:
+        return f"No email address for company {company_id}"
+
+    email_company(company, f"{len(invoice_ids)} new invoice(s) - ATW Transportation", invoice_lines(invoice_ids))
+    return f"Invoice email for {len(invoice_ids)} invoices sent to {company.email}"
+
+
+@shared_task(queue="low_priority", ignore_result=True)
+@idempotent_task
+def send_overdue_reminder(company_id, invoice_ids):
+    """
+    Send one overdue reminder to a company covering all of its newly overdue invoices.
+
+    Args:
+        company_id: Company ID
+        invoice_ids: IDs of the invoices that just became overdue
+
+    Returns:
+        Success or error message
+    """
+    from users.models import Company
+
+    try:
+        company = Company.objects.get(id=company_id)
+    except Company.DoesNotExist:
+        return f"Company {company_id} not found"
+
+    if not company.email:
+        return f"No email address for company {company_id}"
+
+    email_company(company, f"{len(invoice_ids)} overdue invoice(s) - ATW Transportation", invoice_lines(invoice_ids))
+    return f"Overdue reminder for {len(invoice_ids)} invoices sent to {company.email}"
+
+
+def mark_overdue_batch(now, batch_size=500):
     """
-    Periodic task to process overdue invoices.
+    Mark the next ``batch_size`` pending invoices due before ``now`` as overdue.
 
-    Sends reminder emails and updates invoice status.
+    Rows locked by a concurrent run are skipped, and the UPDATE only touches
+    invoices still pending, so each invoice is marked by exactly one worker.
+    Returns ``(invoice_id, company_id)`` pairs for the invoices marked.
     """
+    from django.db import transaction
+
     from billing.models import Invoice
 
-    today = timezone.now().date()
+    with transaction.atomic():
+        rows = list(
+            Invoice.objects.filter(status=Invoice.Status.PENDING, due_date__lt=now)
+            .order_by("due_date", "pk")
+            .select_for_update(skip_locked=True)
+            .values_list("pk", "company_id")[:batch_size]
+        )
+        if rows:
+            Invoice.objects.filter(pk__in=[pk for pk, _ in rows], status=Invoice.Status.PENDING).update(
+                status=Invoice.Status.OVERDUE, updated_at=now
+            )
+    return rows
+
+
+@shared_task(queue="normal")
+def process_overdue_invoices():
+    """
+    Periodic task marking pending invoices past their due date as overdue.
+
+    Runs daily (configured in config/celery.py). Invoices are marked in
+    bulk, INVOICE_OVERDUE_BATCH_SIZE per transaction, and each company gets
+    a single reminder listing all of its newly overdue invoices. Safe to run
+    on several workers at once.
+    """
+    from django.conf import settings
 
-    # Find overdue unpaid invoices
-    overdue_invoices = Invoice.objects.filter(
-        status="pending",
-        due_date__lt=today,
-    )
+    now = timezone.now()
+    batch_size = getattr(settings, "INVOICE_OVERDUE_BATCH_SIZE", 500)
 
-    processed_count = 0
-    for invoice in overdue_invoices:
-        # Update status to overdue
-        invoice.status = "overdue"
-        invoice.save(update_fields=["status"])
+    by_company = {}
+    while True:
+        rows = mark_overdue_batch(now, batch_size=batch_size)
+        for invoice_id, company_id in rows:
+            by_company.setdefault(company_id, []).append(invoice_id)
+        if len(rows) < batch_size:
+            break
 
-        # Send reminder email
-        if invoice.patient and invoice.patient.email:
-            # TODO: Implement overdue reminder email
-            processed_count += 1
+    for company_id, invoice_ids in by_company.items():
+        send_overdue_reminder.delay(company_id, invoice_ids)
 
-    return f"Processed {processed_count} overdue invoices"
+    processed = sum(len(invoice_ids) for invoice_ids in by_company.values())
+    return f"Processed {processed} overdue invoices for {len(by_company)} companies"
@@ -2,16 +2,40 @@
 Tests for billing and invoice management - Fixed with correct Trip fields.
 """
 
+import csv
+import datetime
+import io
+import uuid
 from decimal import Decimal
+from unittest import mock
 
-from django.test import TestCase
+from django.core import mail
+from django.db import IntegrityError, OperationalError, connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
-from billing.models import Contract, Invoice
+from billing.filters import InvoiceFilter
+from billing.invoicing import MAX_BATCH_RETRIES, invoice_batch, invoice_trips, price_trips
+from billing.models import Contract, Invoice, SystemSettings
+from billing.pricing import compile_tariff, get_tariff, invalidate_tariff
+from billing.serializers import InvoiceSerializer
+from billing.system_settings import get_bool, get_decimal, get_int, get_setting, settings_cache, shared_version
+from billing.tasks import (
+    generate_invoice,
+    generate_invoices,
+    mark_overdue_batch,
+    process_overdue_invoices,
+    send_invoice_batch_email,
+    send_overdue_reminder,
+)
+from config.renderers import ORJSONParser, ORJSONRenderer
 from patients.models import Patient
 from trips.models import Trip
 from users.models import Company, User
@@ -87,3 +111,433 @@ class ContractTestCase(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(Contract.objects.filter(company=self.company).exists())
+
+
+class ORJSONRendererTestCase(TestCase):
+    """Test the orjson renderer/parser against DRF's stdlib JSON implementation."""
+
+    def setUp(self):
+        """Set up test data."""
+        company = Company.objects.create(company_name="Render Co", company_type=Company.Type.CLIENT)
+        trip = Trip.objects.create(start_location="A", end_location="B")
+        self.invoice = Invoice.objects.create(
+            trip=trip,
+            company=company,
+            amount=Decimal("1234.50"),
+            tax=Decimal("172.83"),
+            due_date=timezone.now(),
+        )
+
+    def assertRendersLikeDRF(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_serializer_payload(self):
+        """Serialized invoices render identically."""
+        self.assertRendersLikeDRF(InvoiceSerializer(Invoice.objects.all(), many=True).data)
+
+    def test_raw_value_types(self):
+        """Decimals, datetimes, dates, UUIDs and lazy strings render identically."""
+        row = Invoice.objects.values().get(pk=self.invoice.pk)
+        self.assertRendersLikeDRF(
+            {
+                **row,
+                "reference": uuid.uuid4(),
+                "issued": datetime.date(2025, 1, 31),
+                "label": Invoice.Status.OVERDUE.label,
+                "separator": "line\u2028break\u2029",
+                1: "non-string key",
+            }
+        )
+
+    def test_indented_output_uses_stdlib(self):
+        """Indented rendering (browsable API) matches DRF."""
+        data = {"amount": Decimal("10.00"), "items": [1, 2]}
+        self.assertEqual(
+            ORJSONRenderer().render(data, "application/json; indent=4"),
+            JSONRenderer().render(data, "application/json; indent=4"),
+        )
+
+    def test_parser(self):
+        """Valid JSON parses; invalid JSON and NaN raise ParseError."""
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(b'{"amount": "1.50"}')), {"amount": "1.50"})
+        for body in (b"{bad json", b'{"amount": NaN}'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(body))
+
+
+class InvoiceExportTestCase(TestCase):
+    """Test invoice exports for finance."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="finance", email="finance@example.com", password="finance123")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.company = Company.objects.create(company_name="Export Client", company_type=Company.Type.CLIENT)
+        other_company = Company.objects.create(company_name="Other Client", company_type=Company.Type.CLIENT)
+        for company, amount in ((self.company, "100.00"), (self.company, "250.50"), (other_company, "75.00")):
+            Invoice.objects.create(
+                trip=Trip.objects.create(start_location="A", end_location="B"),
+                company=company,
+                amount=Decimal(amount),
+                tax=Decimal("15.00"),
+            )
+
+    def test_csv_export_by_company(self):
+        """CSV rows carry amount, tax and total for the requested company."""
+        response = self.client.get("/api/v1/invoices/export/csv/", {"company": self.company.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([(row["amount"], row["total"]) for row in rows], [("100.00", "115.00"), ("250.50", "265.50")])
+
+
+class InvoiceFilterTestCase(TestCase):
+    """Test invoice filtering and the indexes behind it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a realistically sized invoice table: mostly paid, a few pending/overdue."""
+        cls.company = Company.objects.create(company_name="Index Client", company_type=Company.Type.CLIENT)
+        trips = Trip.objects.bulk_create(
+            [Trip(start_location="A", end_location="B") for _ in range(20000)],
+            batch_size=2000,
+        )
+        statuses = [Invoice.Status.PAID] * 90 + [Invoice.Status.PENDING] * 5 + [Invoice.Status.OVERDUE] * 5
+        now = timezone.now()
+        Invoice.objects.bulk_create(
+            [
+                Invoice(
+                    trip=trip,
+                    company=cls.company,
+                    amount=Decimal("100.00"),
+                    status=statuses[i % 100],
+                    due_date=now - timezone.timedelta(days=i % 365),
+                )
+                for i, trip in enumerate(trips)
+            ],
+            batch_size=2000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        """Set up API client."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="billing", email="billing@example.com", password="billing123")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def plan(self, params):
+        return InvoiceFilter(QueryDict(params), queryset=Invoice.objects.all()).qs.explain()
+
+    def test_filter_pending_due_before(self):
+        """status and due_before narrow the list endpoint."""
+        due_before = (timezone.now() - timezone.timedelta(days=300)).isoformat()
+        response = self.client.get(reverse("invoice-list"), {"status": "pending", "due_before": due_before})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = Invoice.objects.filter(status=Invoice.Status.PENDING, due_date__lt=due_before).count()
+        self.assertEqual(len(response.data), expected)
+        self.assertTrue(all(row["status"] == "pending" for row in response.data))
+
+    def test_pending_due_date_uses_index(self):
+        """The overdue sweep query is served by the pending partial or (status, due_date) index."""
+        plan = self.plan("status=pending&due_before=2025-01-01")
+        self.assertTrue("invoice_pending_due_idx" in plan or "invoice_status_due_idx" in plan, plan)
+
+    def test_status_due_range_uses_index(self):
+        """Any status plus a due date range uses (status, due_date)."""
+        self.assertIn("invoice_status_due_idx", self.plan("status=overdue&due_after=2025-01-01"))
+
+
+class OverdueInvoiceTestCase(TestCase):
+    """Test the bulk overdue-invoice sweep."""
+
+    def setUp(self):
+        """Set up pending invoices for two companies."""
+        self.first = Company.objects.create(company_name="First Client", company_type=Company.Type.CLIENT)
+        self.second = Company.objects.create(company_name="Second Client", company_type=Company.Type.CLIENT)
+        self.past = timezone.now() - timezone.timedelta(days=5)
+
+    def make_invoice(self, company, due_date, status=Invoice.Status.PENDING):
+        return Invoice.objects.create(company=company, amount=Decimal("100.00"), status=status, due_date=due_date)
+
+    def test_marks_overdue_and_groups_reminders(self):
+        """Only pending past-due invoices flip; each company gets one reminder."""
+        first = [self.make_invoice(self.first, self.past) for _ in range(3)]
+        second = self.make_invoice(self.second, self.past)
+        upcoming = self.make_invoice(self.first, timezone.now() + timezone.timedelta(days=5))
+        paid = self.make_invoice(self.first, self.past, Invoice.Status.PAID)
+
+        with self.settings(INVOICE_OVERDUE_BATCH_SIZE=2), mock.patch("billing.tasks.send_overdue_reminder.delay") as remind:
+            self.assertEqual(process_overdue_invoices(), "Processed 4 overdue invoices for 2 companies")
+
+        overdue = set(Invoice.objects.filter(status=Invoice.Status.OVERDUE).values_list("pk", flat=True))
+        self.assertEqual(overdue, {invoice.pk for invoice in first} | {second.pk})
+        upcoming.refresh_from_db()
+        paid.refresh_from_db()
+        self.assertEqual((upcoming.status, paid.status), (Invoice.Status.PENDING, Invoice.Status.PAID))
+
+        reminders = {call.args[0]: sorted(call.args[1]) for call in remind.call_args_list}
+        self.assertEqual(reminders, {self.first.pk: sorted(i.pk for i in first), self.second.pk: [second.pk]})
+
+    def test_already_overdue_invoices_are_skipped(self):
+        """A second run finds nothing to mark and sends no reminders."""
+        self.make_invoice(self.first, self.past)
+        with mock.patch("billing.tasks.send_overdue_reminder.delay") as remind:
+            process_overdue_invoices()
+            self.assertEqual(process_overdue_invoices(), "Processed 0 overdue invoices for 0 companies")
+        self.assertEqual(remind.call_count, 1)
+        self.assertEqual(mark_overdue_batch(timezone.now()), [])
+
+
+class BatchInvoicingTestCase(TestCase):
+    """Test the nightly batch invoicing engine."""
+
+    def setUp(self):
+        """Set up completed trips for two client companies."""
+        self.first = Company.objects.create(company_name="First Client", company_type=Company.Type.CLIENT)
+        self.second = Company.objects.create(company_name="Second Client", company_type=Company.Type.CLIENT)
+        self.first_patient = Patient.objects.create(name="First Patient", company=self.first)
+        self.second_patient = Patient.objects.create(name="Second Patient", company=self.second)
+        settings_cache.clear()
+        invalidate_tariff()
+
+    def make_trip(self, patient, status=Trip.Status.COMPLETED, **kwargs):
+        return Trip.objects.create(patient=patient, start_location="A", end_location="B", status=status, **kwargs)
+
+    def test_price_trips(self):
+        """Distance comes from the odometer, falling back to the default."""
+        self.assertEqual(
+            price_trips([(self.first.pk, 100.0, 120.0), (self.first.pk, None, None)]),
+            [(Decimal("100.00"), Decimal("15.00")), (Decimal("75.00"), Decimal("11.25"))],
+        )
+
+    def test_invoices_only_completed_uninvoiced_billable_trips(self):
+        """Active, already invoiced and company-less trips are skipped."""
+        completed = [self.make_trip(self.first_patient) for _ in range(3)] + [self.make_trip(self.second_patient)]
+        self.make_trip(self.first_patient, Trip.Status.IN_TRANSIT)
+        self.make_trip(Patient.objects.create(name="Private Patient"))
+        invoiced = self.make_trip(self.first_patient)
+        Invoice.objects.create(trip=invoiced, company=self.first, amount=Decimal("1.00"))
+
+        by_company = invoice_trips(batch_size=2)
+
+        new_invoices = Invoice.objects.exclude(trip=invoiced)
+        self.assertEqual(set(new_invoices.values_list("trip_id", flat=True)), {trip.pk for trip in completed})
+        self.assertEqual({company: len(ids) for company, ids in by_company.items()}, {self.first.pk: 3, self.second.pk: 1})
+        self.assertEqual(invoice_batch(), (None, []))
+
+    def test_batch_retried_after_a_conflicting_invoice(self):
+        """A batch whose insert hits an invoice created meanwhile rolls back and is retried."""
+        trips = [self.make_trip(self.first_patient) for _ in range(2)]
+        attempts = []
+
+        def conflict_once(rows, tariff, at):
+            attempts.append(rows)
+            if len(attempts) == 1:
+                raise IntegrityError("duplicate key value violates unique constraint")
+            return price_trips(rows, tariff, at)
+
+        with mock.patch("billing.invoicing.price_trips", side_effect=conflict_once):
+            by_company = invoice_trips()
+
+        self.assertEqual(len(attempts), 2)
+        invoices = Invoice.objects.filter(trip__in=trips)
+        self.assertEqual(by_company, {self.first.pk: sorted(invoices.values_list("pk", flat=True))})
+
+    def test_repeated_integrity_error_is_raised(self):
+        """An insert that fails every time is not retried forever."""
+        self.make_trip(self.first_patient)
+        with (
+            mock.patch(
+                "billing.invoicing.price_trips", side_effect=IntegrityError("violates foreign key constraint")
+            ) as price,
+            self.assertRaises(IntegrityError),
+        ):
+            invoice_trips()
+        self.assertEqual(price.call_count, MAX_BATCH_RETRIES + 1)
+
+    def test_billing_emails_are_sent(self):
+        """Batch emails and overdue reminders go out through the notification transport, listing the invoices."""
+        self.first.email = "accounts@first.example.com"
+        self.first.save()
+        trip = self.make_trip(self.first_patient)
+        invoice = Invoice.objects.create(
+            trip=trip, company=self.first, amount=Decimal("100.00"), tax=Decimal("15.00"), due_date=timezone.now()
+        )
+
+        with override_settings(IDEMPOTENCY_KEY_PREFIX=f"test:idempotency:{uuid.uuid4().hex}"):
+            send_invoice_batch_email(self.first.pk, [invoice.pk])
+            send_overdue_reminder(self.first.pk, [invoice.pk])
+            self.assertEqual(
+                send_overdue_reminder(self.second.pk, [invoice.pk]), f"No email address for company {self.second.pk}"
+            )
+
+        self.assertEqual([message.to for message in mail.outbox], [["accounts@first.example.com"]] * 2)
+        self.assertEqual(mail.outbox[0].subject, "1 new invoice(s) - ATW Transportation")
+        self.assertEqual(mail.outbox[1].subject, "1 overdue invoice(s) - ATW Transportation")
+        self.assertIn(f"Invoice #{invoice.pk} for trip #{trip.pk}: 115.00", mail.outbox[1].body)
+
+    def test_unsent_email_is_not_reported_as_sent(self):
+        """A transport that sends nothing fails the task, so a retry sends again."""
+        self.first.email = "accounts@first.example.com"
+        self.first.save()
+        with (
+            override_settings(IDEMPOTENCY_KEY_PREFIX=f"test:idempotency:{uuid.uuid4().hex}"),
+            mock.patch("users.notifications.EmailTransport.send", return_value=0),
+            self.assertRaises(RuntimeError),
+        ):
+            send_invoice_batch_email(self.first.pk, [])
+
+    def test_task_sends_one_email_per_company(self):
+        """generate_invoices queues a single batch email per company."""
+        for _ in range(3):
+            self.make_trip(self.first_patient)
+        self.make_trip(self.second_patient)
+
+        with mock.patch("billing.tasks.send_invoice_batch_email.delay") as email:
+            self.assertEqual(generate_invoices(), "Generated 4 invoices for 2 companies")
+
+        emails = sorted((call.args[0], len(call.args[1])) for call in email.call_args_list)
+        self.assertEqual(emails, [(self.first.pk, 3), (self.second.pk, 1)])
+
+    def test_single_trip_path_does_not_double_bill(self):
+        """generate_invoice and the batch share the unique trip invoice; repeated task calls are skipped."""
+        trip = self.make_trip(self.first_patient, start_odometer=0.0, end_odometer=4.0)
+        with (
+            override_settings(IDEMPOTENCY_KEY_PREFIX=f"test:idempotency:{uuid.uuid4().hex}"),
+            mock.patch("billing.tasks.send_invoice_email.delay") as email,
+        ):
+            result = generate_invoice(trip.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(generate_invoice(trip.pk), result)
+        self.assertEqual(email.call_count, 1)
+        self.assertEqual(invoice_trips(), {})
+        invoice = Invoice.objects.get(trip=trip)
+        self.assertEqual((invoice.company_id, invoice.amount, invoice.tax), (self.first.pk, Decimal("60.00"), Decimal("9.00")))
+
+    def test_failed_task_is_not_cached(self):
+        """A transient error raises and releases the task's key, so the retry invoices the trip."""
+        trip = self.make_trip(self.first_patient)
+        with (
+            override_settings(IDEMPOTENCY_KEY_PREFIX=f"test:idempotency:{uuid.uuid4().hex}"),
+            mock.patch("billing.tasks.send_invoice_email.delay"),
+        ):
+            with mock.patch("billing.invoicing.price_trips", side_effect=OperationalError):
+                self.assertRaises(OperationalError, generate_invoice, trip.pk)
+            self.assertIn("generated", generate_invoice(trip.pk))
+        self.assertTrue(Invoice.objects.filter(trip=trip).exists())
+
+
+class TariffTestCase(TestCase):
+    """Test the compiled pricing tables."""
+
+    def setUp(self):
+        """Set up system rates and a client with a contract rate card."""
+        for key, value in (("base_fare", "500.00"), ("per_km_rate", "10.00"), ("tax_rate", "0.14")):
+            SystemSettings.objects.create(setting_key=key, setting_value=value)
+        self.client_company = Company.objects.create(company_name="Contract Client", company_type=Company.Type.CLIENT)
+        self.other = Company.objects.create(company_name="Walk-in Client", company_type=Company.Type.CLIENT)
+        now = timezone.now()
+        self.contract = Contract.objects.create(
+            company=self.client_company,
+            contract_type=Contract.Type.CLIENT,
+            start_date=now - timezone.timedelta(days=30),
+            end_date=now + timezone.timedelta(days=30),
+            per_km_rate=Decimal("8.00"),
+        )
+        settings_cache.clear()
+        invalidate_tariff()
+
+    def test_settings_and_contract_rates(self):
+        """Contract rates override the system defaults only while the contract runs."""
+        tariff = compile_tariff()
+        now = timezone.now()
+        self.assertEqual(tariff.price(self.other.pk, Decimal("10"), now), (Decimal("600.00"), Decimal("84.00")))
+        self.assertEqual(tariff.price(self.client_company.pk, Decimal("10"), now), (Decimal("580.00"), Decimal("81.20")))
+        later = now + timezone.timedelta(days=60)
+        self.assertEqual(tariff.price(self.client_company.pk, Decimal("10"), later), (Decimal("600.00"), Decimal("84.00")))
+
+    def test_settings_come_from_the_snapshot(self):
+        """Compiling reads the pricing settings from the SystemSettings snapshot, not the table."""
+        snapshot = settings_cache.snapshot()
+        with self.assertNumQueries(1):
+            tariff = compile_tariff()
+        self.assertEqual(tariff.default.base_fare, Decimal(snapshot.values["base_fare"]))
+        self.assertIs(get_tariff(), get_tariff())
+
+    def test_pricing_reads_no_database(self):
+        """Once compiled, pricing a batch costs no queries."""
+        tariff = get_tariff()
+        rows = [(self.client_company.pk, Decimal(i)) for i in range(5000)]
+        with self.assertNumQueries(0):
+            prices = tariff.price_many(rows)
+        self.assertEqual(len(prices), 5000)
+
+    def test_recompiled_only_on_change(self):
+        """Saving a setting or contract swaps in new tables; otherwise the same tariff is reused."""
+        tariff = get_tariff()
+        self.assertIs(get_tariff(), tariff)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SystemSettings.objects.filter(setting_key="base_fare").get().delete()
+        self.assertEqual(get_tariff().default.base_fare, Decimal("50.00"))
+
+        self.contract.per_km_rate = Decimal("5.00")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.contract.save()
+        self.assertEqual(get_tariff().price(self.client_company.pk, Decimal("10")), (Decimal("100.00"), Decimal("14.00")))
+
+    def test_tariff_is_immutable(self):
+        """Compiled tables cannot be modified in place."""
+        tariff = compile_tariff()
+        with self.assertRaises(AttributeError):
+            tariff.default = None
+        with self.assertRaises(TypeError):
+            tariff.contracts[self.other.pk] = ()
+
+
+@override_settings(SYSTEM_SETTINGS_PUBSUB=False)
+class SystemSettingsCacheTestCase(TestCase):
+    """Test the process-local SystemSettings snapshot."""
+
+    def setUp(self):
+        """Set up settings and an API client."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="settings", email="settings@example.com", password="settings123")
+        self.client.force_authenticate(self.user)
+        self.base_fare = SystemSettings.objects.create(setting_key="base_fare", setting_value="500.00")
+        SystemSettings.objects.create(setting_key="payment_terms_days", setting_value="30")
+        SystemSettings.objects.create(setting_key="night_surcharge", setting_value="yes")
+        SystemSettings.objects.create(setting_key="legacy_rate", setting_value="1.00", is_active=False)
+        settings_cache.clear()
+
+    def test_reads_are_served_from_the_snapshot(self):
+        """Only the first read touches the database."""
+        self.assertEqual(get_setting("base_fare"), "500.00")
+        with self.assertNumQueries(0):
+            self.assertEqual(get_decimal("base_fare"), Decimal("500.00"))
+            self.assertEqual(get_int("payment_terms_days"), 30)
+            self.assertTrue(get_bool("night_surcharge"))
+            self.assertIsNone(get_setting("legacy_rate"))
+            self.assertEqual(get_int("base_fare", 7), 7)
+
+    def test_saving_through_the_api_invalidates(self):
+        """An update via SystemSettingsViewSet bumps the version and is read back."""
+        self.assertEqual(get_decimal("base_fare"), Decimal("500.00"))
+        before = shared_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse("systemsettings-detail", args=[self.base_fare.pk]), {"setting_value": "650.00"}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertGreater(shared_version(), before)
+        self.assertEqual(get_decimal("base_fare"), Decimal("650.00"))
+        self.assertEqual(settings_cache.snapshot().version, shared_version())
@@ -1,22 +1,35 @@
-from rest_framework import permissions, viewsets
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters, permissions, viewsets
 
+from config.exports import ExportMixin
+from config.idempotency import IdempotencyMixin
+
+from .filters import InvoiceFilter
 from .models import Contract, Invoice, SystemSettings
 from .serializers import ContractSerializer, InvoiceSerializer, SystemSettingsSerializer
 
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(IdempotencyMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Invoice.objects.all()
     serializer_class = InvoiceSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = InvoiceFilter
+    ordering_fields = ["created_at", "due_date", "amount", "status"]
+    fast_read_annotations = {
+        "total": ExpressionWrapper(F("amount") + F("tax"), output_field=DecimalField(max_digits=11, decimal_places=2))
+    }
+    export_company_field = "company"
 
 
-class ContractViewSet(viewsets.ModelViewSet):
+class ContractViewSet(IdempotencyMixin, viewsets.ModelViewSet):
     queryset = Contract.objects.all()
     serializer_class = ContractSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
-class SystemSettingsViewSet(viewsets.ModelViewSet):
+class SystemSettingsViewSet(IdempotencyMixin, viewsets.ModelViewSet):
     queryset = SystemSettings.objects.all()
     serializer_class = SystemSettingsSerializer
     permission_classes = [permissions.IsAuthenticated]
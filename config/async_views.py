@@ -0,0 +1,142 @@
+"""
+Async-native read path for DRF views under ASGI.
+
+DRF views are synchronous, so under Daphne/Uvicorn each request holds a
+worker thread for its whole duration. The wrappers here serve ``GET``
+requests carrying an ``Authorization: Token`` header from a coroutine
+instead: the token is resolved through the async cache, rows are fetched
+with the async ORM interface and rendered with the compiled fast-read
+converters.
+
+Anything the async path cannot serve exactly like the sync view is handed
+to the sync view unchanged: other methods and authentication schemes,
+invalid tokens, the browsable API, pagination, throttling and permission
+classes that may touch the database. URLs and permissions stay the same.
+
+Set ``ASYNC_READ_VIEWS = False`` to send every request through the sync
+views (e.g. for before/after benchmarks).
+"""
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from rest_framework import permissions
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from users.authentication import aget_token, get_token_key
+
+from .fast_read import FastReadMixin
+
+# Permission classes known to decide without database access
+ASYNC_SAFE_PERMISSIONS = (permissions.AllowAny, permissions.IsAuthenticated)
+
+
+def _can_serve_async(view, request):
+    if getattr(view, "paginator", None) is not None or view.get_throttles():
+        return False
+    if not all(type(permission) in ASYNC_SAFE_PERMISSIONS for permission in view.get_permissions()):
+        return False
+    try:
+        renderer, _ = view.perform_content_negotiation(request)
+    except NotAcceptable:
+        return False
+    return isinstance(renderer, JSONRenderer)
+
+
+async def _serve(sync_view, func, request, args, kwargs):
+    """Serve ``request`` with ``func(view)``, or return None to let the sync view handle it."""
+    key = get_token_key(request)
+    if key is None:
+        return None
+
+    # Same setup the sync view function performs
+    view = sync_view.cls(**sync_view.initkwargs)
+    actions = getattr(sync_view, "actions", None)
+    if actions is not None:
+        view.action_map = actions
+        for method, action in actions.items():
+            setattr(view, method, getattr(view, action))
+    view.setup(request, *args, **kwargs)
+    view.headers = view.default_response_headers
+
+    drf_request = view.initialize_request(request, *args, **kwargs)
+    view.request = drf_request
+    view.format_kwarg = view.get_format_suffix(**kwargs)
+    if not _can_serve_async(view, drf_request):
+        return None
+
+    token = await aget_token(key)
+    if token is None:
+        return None
+    drf_request.user, drf_request.auth = token.user, token
+
+    try:
+        view.initial(drf_request, *args, **kwargs)
+        response = Response(await func(view))
+    except Exception as exc:
+        response = view.handle_exception(exc)
+
+    response = view.finalize_response(drf_request, response, *args, **kwargs)
+    # Rendered here, on the event loop; Django's own render call is then a no-op
+    return response.render()
+
+
+def async_read_view(sync_view):
+    """
+    Decorator turning ``sync_view`` (an ``as_view()`` result) into an async view.
+
+    Token-authenticated JSON ``GET`` requests are answered with the data
+    returned by the decorated coroutine, which receives the initialized DRF
+    view instance; every other request goes to ``sync_view``.
+    """
+    run_sync = sync_to_async(sync_view)
+
+    def decorator(func):
+        async def view(request, *args, **kwargs):
+            if request.method == "GET" and settings.ASYNC_READ_VIEWS:
+                response = await _serve(sync_view, func, request, args, kwargs)
+                if response is not None:
+                    return response
+            return await run_sync(request, *args, **kwargs)
+
+        # Keeps cls/initkwargs/actions/csrf_exempt for routers and schema generation
+        return functools.update_wrapper(view, sync_view)
+
+    return decorator
+
+
+class AsyncReadMixin(FastReadMixin):
+    """
+    ViewSet mixin serving ``list`` and ``retrieve`` natively under ASGI.
+
+    Routes whose ``GET`` maps to list/retrieve get an async view from
+    ``as_view``; all other routes and methods are unchanged.
+    """
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        action = (actions or {}).get("get")
+        if action == "list":
+            return async_read_view(view)(cls.alist)
+        if action == "retrieve":
+            return async_read_view(view)(cls.aretrieve)
+        return view
+
+    async def alist(self):
+        compiled = self.get_fast_representation()
+        queryset = self.filter_queryset(self.get_queryset())
+        converters = compiled.bind()
+        return [compiled.to_representation(values, converters) async for values in queryset.values_list(*compiled.columns)]
+
+    async def aretrieve(self):
+        compiled = self.get_fast_representation()
+        try:
+            rows = [values async for values in self.get_fast_object_rows(compiled)]
+        except (TypeError, ValueError, ValidationError):
+            rows = []
+        return self.get_fast_object(compiled, rows)
@@ -4,7 +4,7 @@ Celery configuration for ATW Backend.
 Handles async tasks like:
 - GPS data processing
 - Email notifications
-- Report generation
+- Report generation and dashboard rollups
 - Background jobs
 """
 
@@ -12,6 +12,9 @@ import os
 
 from celery import Celery
 
+# Task and queue metrics for Prometheus (connects Celery signals)
+from config import celery_metrics  # noqa: F401
+
 # Set default Django settings module
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
@@ -27,21 +30,58 @@ app.autodiscover_tasks()
 # Task routing configuration
 app.conf.task_routes = {
     "trips.tasks.broadcast_gps_update": {"queue": "high_priority"},
+    "trips.tasks.relay_trip_events": {"queue": "high_priority"},
     "trips.tasks.process_trip_completion": {"queue": "normal"},
     "billing.tasks.generate_invoice": {"queue": "normal"},
+    "billing.tasks.generate_invoices": {"queue": "normal"},
+    "billing.tasks.send_invoice_batch_email": {"queue": "low_priority"},
+    "billing.tasks.send_overdue_reminder": {"queue": "low_priority"},
     "users.tasks.send_notification": {"queue": "low_priority"},
+    "users.tasks.flush_notifications": {"queue": "low_priority"},
 }
 
 # Celery beat schedule for periodic tasks
 app.conf.beat_schedule = {
-    "cleanup-old-gps-data": {
-        "task": "trips.tasks.cleanup_old_gps_data",
-        "schedule": 3600.0,  # Every hour
+    "maintain-history-partitions": {
+        "task": "trips.tasks.maintain_partitions",
+        "schedule": 86400.0,  # Daily
+    },
+    "archive-old-trips": {
+        "task": "trips.tasks.archive_old_trips",
+        "schedule": 86400.0,  # Daily
+    },
+    "relay-trip-events": {
+        "task": "trips.tasks.relay_trip_events",
+        "schedule": 5.0,  # Every 5 seconds
+    },
+    "reconcile-availability": {
+        "task": "trips.tasks.reconcile_availability",
+        "schedule": 60.0,  # Every minute
     },
     "check-trip-timeouts": {
         "task": "trips.tasks.check_trip_timeouts",
         "schedule": 300.0,  # Every 5 minutes
     },
+    "generate-invoices": {
+        "task": "billing.tasks.generate_invoices",
+        "schedule": 86400.0,  # Nightly
+    },
+    "process-overdue-invoices": {
+        "task": "billing.tasks.process_overdue_invoices",
+        "schedule": 86400.0,  # Daily
+    },
+    "send-daily-digest": {
+        "task": "users.tasks.send_daily_digest",
+        "schedule": 86400.0,  # Daily
+    },
+    "flush-notifications": {
+        "task": "users.tasks.flush_notifications",
+        "schedule": 10.0,  # Every 10 seconds
+    },
+    "refresh-operational-rollups": {
+        "task": "reports.tasks.refresh_operational_rollups",
+        "schedule": 300.0,  # Every 5 minutes
+    },
 }
 
 
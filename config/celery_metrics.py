@@ -0,0 +1,169 @@
+"""
+Prometheus telemetry for Celery.
+
+Task metrics come from Celery signals, recorded in whichever process runs
+the task:
+
+- ``atw_celery_task_queue_wait_seconds``: publish to start, per task and queue
+  (tasks with an ETA/countdown are left out, their wait is intended)
+- ``atw_celery_task_runtime_seconds``: per task and final state
+- ``atw_celery_task_retries_total`` / ``atw_celery_task_failures_total``
+
+Workers serve them once ready, each on the first free port of the
+``CELERY_METRICS_PORT_RANGE`` ports starting at ``CELERY_METRICS_PORT``, so
+several workers can share a host. With the prefork pool, point
+``PROMETHEUS_MULTIPROC_DIR`` at a shared empty directory so the exporter
+aggregates what the child processes record.
+
+Queue depth is sampled by the beat process (there is exactly one) and served
+on ``CELERY_BEAT_METRICS_PORT`` as ``atw_celery_queue_length``: one passive
+declare per queue, at most every ``CELERY_QUEUE_SAMPLE_INTERVAL`` seconds
+however often Prometheus scrapes.
+"""
+
+import errno
+import logging
+import os
+import threading
+import time
+
+from celery.signals import beat_init, before_task_publish, task_failure, task_postrun, task_prerun, task_retry, worker_ready
+from django.conf import settings
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, start_http_server
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+QUEUES = ("high_priority", "normal", "low_priority", "celery")
+
+QUEUE_WAIT = Histogram(
+    "atw_celery_task_queue_wait_seconds",
+    "Time between publishing a task and a worker starting it",
+    ["task", "queue"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900),
+)
+RUNTIME = Histogram(
+    "atw_celery_task_runtime_seconds",
+    "Task execution time",
+    ["task", "state"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800),
+)
+RETRIES = Counter("atw_celery_task_retries_total", "Task retries", ["task"])
+FAILURES = Counter("atw_celery_task_failures_total", "Tasks that raised", ["task", "exception"])
+
+# task_id -> start time, for tasks running in this process
+_started = {}
+
+
+@before_task_publish.connect
+def stamp_publish_time(headers=None, **kwargs):
+    if headers is not None:
+        headers["published_at"] = time.time()
+
+
+@task_prerun.connect
+def task_started(task_id=None, task=None, **kwargs):
+    now = time.time()
+    _started[task_id] = time.monotonic()
+    request = task.request
+    published_at = getattr(request, "published_at", None)
+    if published_at and not request.eta:
+        queue = (request.delivery_info or {}).get("routing_key") or "unknown"
+        QUEUE_WAIT.labels(task.name, queue).observe(max(now - published_at, 0))
+
+
+@task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is not None:
+        RUNTIME.labels(task.name, state or "UNKNOWN").observe(time.monotonic() - started)
+
+
+@task_retry.connect
+def task_retried(request=None, sender=None, **kwargs):
+    RETRIES.labels(getattr(sender, "name", "unknown")).inc()
+
+
+@task_failure.connect
+def task_failed(sender=None, exception=None, **kwargs):
+    FAILURES.labels(getattr(sender, "name", "unknown"), type(exception).__name__).inc()
+
+
+class QueueDepthCollector:
+    """Samples broker queue lengths when Prometheus scrapes, at most every ``interval`` seconds."""
+
+    def __init__(self, app, queues=QUEUES, interval=15):
+        self.app = app
+        self.queues = queues
+        self.interval = interval
+        self._depths = {}
+        self._sampled = 0.0
+        self._lock = threading.Lock()
+
+    def sample(self):
+        depths = {}
+        with self.app.connection_for_read() as connection:
+            for queue in self.queues:
+                # A failed passive declare closes the channel on AMQP, so each queue gets its own
+                try:
+                    with connection.channel() as channel:
+                        _, depths[queue], _ = channel.queue_declare(queue=queue, passive=True)
+                except Exception:
+                    # Never declared yet: nothing has been routed there
+                    depths[queue] = 0
+        return depths
+
+    def depths(self):
+        with self._lock:
+            if time.monotonic() - self._sampled >= self.interval:
+                try:
+                    self._depths = self.sample()
+                except Exception:
+                    logger.warning("Could not sample Celery queue lengths", exc_info=True)
+                self._sampled = time.monotonic()
+            return dict(self._depths)
+
+    def collect(self):
+        family = GaugeMetricFamily("atw_celery_queue_length", "Messages waiting in the broker queue", labels=["queue"])
+        for queue, depth in self.depths().items():
+            family.add_metric([queue], depth)
+        yield family
+
+
+def start_exporter(registry=None, port=None, tries=1):
+    """
+    Serve metrics on the first free port of ``port`` .. ``port + tries - 1``.
+
+    Returns the port bound, or None when disabled or every port is taken.
+    """
+    if not port:
+        return None
+    if registry is None and "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    for candidate in range(port, port + max(tries, 1)):
+        try:
+            start_http_server(candidate, registry=registry or REGISTRY)
+        except OSError as e:
+            if e.errno != errno.EADDRINUSE:
+                raise
+            continue
+        logger.info("Serving Celery metrics on port %d", candidate)
+        return candidate
+    logger.error("Ports %d-%d are all in use; this process serves no Celery metrics", port, port + max(tries, 1) - 1)
+    return None
+
+
+@worker_ready.connect
+def serve_worker_metrics(**kwargs):
+    port, tries = getattr(settings, "CELERY_METRICS_PORT", 9808), getattr(settings, "CELERY_METRICS_PORT_RANGE", 10)
+    start_exporter(port=port, tries=tries)
+
+
+@beat_init.connect
+def serve_queue_metrics(sender=None, **kwargs):
+    registry = CollectorRegistry()
+    registry.register(QueueDepthCollector(sender.app, interval=getattr(settings, "CELERY_QUEUE_SAMPLE_INTERVAL", 15)))
+    start_exporter(registry, port=getattr(settings, "CELERY_BEAT_METRICS_PORT", 9807))
@@ -0,0 +1,86 @@
+"""
+Pooled PostgreSQL backend.
+
+``ENGINE = "config.db_pool"`` wraps django-db-connection-pool's PostgreSQL
+backend: each process keeps one SQLAlchemy ``QueuePool`` per database alias
+(primary and replicas alike), sized by ``POOL_OPTIONS`` in settings.
+Django "closing" a connection returns it to the pool, so the number of
+Postgres connections a process holds is bounded by ``POOL_SIZE +
+MAX_OVERFLOW`` instead of by its thread count.
+
+Pools are recreated after a fork (gunicorn/Celery prefork children never
+share the parent's sockets) and exported as Prometheus metrics:
+
+- ``atw_db_pool_checkout_wait_seconds``: time spent getting a connection
+- ``atw_db_pool_checkout_timeouts_total``: checkouts that gave up waiting
+- ``atw_db_pool_size`` / ``atw_db_pool_in_use`` / ``atw_db_pool_idle`` /
+  ``atw_db_pool_overflow``: pool state at scrape time
+"""
+
+import os
+
+from dj_db_conn_pool.core import pool_container
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+CHECKOUT_WAIT = Histogram(
+    "atw_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["alias"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+CHECKOUT_TIMEOUTS = Counter("atw_db_pool_checkout_timeouts_total", "Pooled connection checkouts that timed out", ["alias"])
+
+_pool_pid = os.getpid()
+
+
+def reset_after_fork():
+    """
+    Give a forked child fresh, empty pools.
+
+    The inherited pools hold the parent's sockets; they are dropped without
+    closing those connections, which the parent still uses.
+    """
+    global _pool_pid
+    if _pool_pid == os.getpid():
+        return
+    with pool_container.lock:
+        if _pool_pid != os.getpid():
+            for alias, pool in list(pool_container.items()):
+                pool_container[alias] = pool.recreate()
+            _pool_pid = os.getpid()
+
+
+def pool_stats():
+    """Return ``{alias: {"size", "in_use", "idle", "overflow"}}`` for this process's pools."""
+    return {
+        alias: {
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+        }
+        for alias, pool in list(pool_container.items())
+    }
+
+
+class PoolCollector:
+    """Reads pool state when Prometheus scrapes, so there is nothing to keep in sync."""
+
+    METRICS = {
+        "size": "Configured persistent connections per pool",
+        "in_use": "Connections checked out of the pool",
+        "idle": "Open connections waiting in the pool",
+        "overflow": "Connections opened beyond the pool size",
+    }
+
+    def collect(self):
+        stats = pool_stats()
+        for name, documentation in self.METRICS.items():
+            family = GaugeMetricFamily(f"atw_db_pool_{name}", documentation, labels=["alias"])
+            for alias, values in stats.items():
+                family.add_metric([alias], values[name])
+            yield family
+
+
+REGISTRY.register(PoolCollector())
@@ -0,0 +1,19 @@
+import time
+
+from dj_db_conn_pool.backends.postgresql import base
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+from . import CHECKOUT_TIMEOUTS, CHECKOUT_WAIT, reset_after_fork
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        reset_after_fork()
+        start = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        except PoolTimeout:
+            CHECKOUT_TIMEOUTS.labels(self.alias).inc()
+            raise
+        finally:
+            CHECKOUT_WAIT.labels(self.alias).observe(time.perf_counter() - start)
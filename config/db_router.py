@@ -2,42 +2,229 @@
 Database router for read replica support.
 
 Routes read queries to replica databases and write queries to primary.
-Optimizes database load distribution for better performance.
+
+- A background monitor probes every configured replica (any alias other than
+  ``default``) for health and replication lag.
+- Reads go to a healthy replica whose lag is within
+  ``DATABASE_REPLICA_MAX_LAG`` seconds, picking the one with the fewest
+  outstanding queries relative to its ``DATABASE_REPLICA_WEIGHTS`` weight.
+- Reads fall back to the primary when no replica qualifies, inside
+  transactions on the primary, and after a write (read-your-writes): for the
+  rest of the request and, via ``ReplicaStickinessMiddleware``, for the same
+  client's requests during ``DATABASE_REPLICA_STICKY_SECONDS``.
+
+Routing decisions, lag and health are exported as Prometheus metrics.
 """
 
+import contextlib
+import contextvars
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "default"
+
+READ_ROUTES = Counter("atw_db_read_routes_total", "Read queries routed, by database alias and reason", ["alias", "reason"])
+REPLICA_LAG = Gauge("atw_db_replica_lag_seconds", "Replication lag seen by the last probe", ["alias"])
+REPLICA_HEALTHY = Gauge("atw_db_replica_healthy", "1 if the replica passed its last probe", ["alias"])
+OUTSTANDING_QUERIES = Gauge("atw_db_outstanding_queries", "Queries currently executing on a replica", ["alias"])
+
+LAG_SQL = {
+    "postgresql": (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+}
+
+# Per-request routing state set up by ``read_your_writes``; None outside a request
+_scope = contextvars.ContextVar("db_routing_scope", default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+@contextlib.contextmanager
+def read_your_writes(pinned=False):
+    """
+    Route reads to the primary once anything has been written inside the block.
+
+    Yields the scope; ``scope["wrote"]`` tells whether a write happened.
+    """
+    scope = {"pinned": pinned, "wrote": False}
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+class ReplicaState:
+    def __init__(self, weight):
+        self.weight = weight
+        self.healthy = False
+        self.lag = None
+        self.outstanding = 0
+
+
+class ReplicaMonitor:
+    """
+    Tracks replica health, lag and outstanding queries.
+
+    Probes run in a daemon thread every ``interval`` seconds; the first probe
+    runs synchronously so routing decisions never use unknown state.
+    """
+
+    def __init__(self, aliases, weights=None, interval=2.0, max_lag=5.0):
+        weights = weights or {}
+        self.replicas = {alias: ReplicaState(weights.get(alias, 1)) for alias in aliases}
+        self.interval = interval
+        self.max_lag = max_lag
+        self._start_lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self._pid = None
+
+    def ensure_started(self):
+        # Threads do not survive fork, so each worker process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.probe_all()
+            threading.Thread(target=self._run, name="replica-monitor", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.probe_all()
+
+    def probe_all(self):
+        for alias in self.replicas:
+            self.probe(alias)
+
+    def probe(self, alias):
+        state = self.replicas[alias]
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_SQL.get(connection.vendor, "SELECT 0"))
+                lag = float(cursor.fetchone()[0] or 0)
+        except Exception:
+            logger.warning("Read replica %s failed its health probe", alias, exc_info=True)
+            state.healthy, state.lag = False, None
+            connection.close()
+        else:
+            state.healthy, state.lag = True, lag
+            REPLICA_LAG.labels(alias).set(lag)
+            if "POOL_OPTIONS" in connection.settings_dict and not connection.in_atomic_block:
+                # Hand the connection back so the monitor thread does not hold a pool slot
+                connection.close()
+        REPLICA_HEALTHY.labels(alias).set(int(state.healthy))
+
+    def choose(self):
+        """Return the least loaded eligible replica, or None."""
+        best, best_score = [], None
+        for alias, state in self.replicas.items():
+            if not state.healthy or state.lag is None or state.lag > self.max_lag or state.weight <= 0:
+                continue
+            score = (state.outstanding + 1) / state.weight
+            if best_score is None or score < best_score:
+                best, best_score = [alias], score
+            elif score == best_score:
+                best.append(alias)
+        return random.choice(best) if best else None
+
+    def track(self, alias):
+        """Return an execute wrapper counting outstanding queries on ``alias``."""
+        state = self.replicas[alias]
+        gauge = OUTSTANDING_QUERIES.labels(alias)
+
+        def wrapper(execute, sql, params, many, context):
+            with self._count_lock:
+                state.outstanding += 1
+            gauge.inc()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                with self._count_lock:
+                    state.outstanding -= 1
+                gauge.dec()
+
+        wrapper.replica_alias = alias
+        return wrapper
+
 
 class ReadReplicaRouter:
     """
     A router to control database operations for read replica support.
 
     - All write operations go to the primary database
-    - Read operations are distributed across read replicas
+    - Read operations go to the least loaded healthy, caught-up replica
     """
 
+    def __init__(self):
+        self.monitor = ReplicaMonitor(
+            replica_aliases(),
+            weights=getattr(settings, "DATABASE_REPLICA_WEIGHTS", {}),
+            interval=getattr(settings, "DATABASE_REPLICA_CHECK_INTERVAL", 2.0),
+            max_lag=getattr(settings, "DATABASE_REPLICA_MAX_LAG", 5.0),
+        )
+        connection_created.connect(self._connection_created, weak=False)
+
+    def _connection_created(self, sender, connection, **kwargs):
+        if connection.alias in self.monitor.replicas and not any(
+            getattr(wrapper, "replica_alias", None) == connection.alias for wrapper in connection.execute_wrappers
+        ):
+            connection.execute_wrappers.append(self.monitor.track(connection.alias))
+
     def db_for_read(self, model, **hints):
         """
         Route read queries to read replicas.
-        Uses round-robin or random selection if multiple replicas exist.
         """
-        import random
-
-        # List of available read replicas
-        replicas = ["replica1", "replica2"]
+        scope = _scope.get()
+        if scope is not None and (scope["pinned"] or scope["wrote"]):
+            alias, reason = PRIMARY, "read_your_writes"
+        elif connections[PRIMARY].in_atomic_block:
+            alias, reason = PRIMARY, "transaction"
+        else:
+            self.monitor.ensure_started()
+            alias = self.monitor.choose()
+            reason = "replica" if alias else "no_replica_available"
+            alias = alias or PRIMARY
 
-        # Randomly select a replica (can be improved with round-robin)
-        return random.choice(replicas)
+        READ_ROUTES.labels(alias, reason).inc()
+        return alias
 
     def db_for_write(self, model, **hints):
         """
         Route all write operations to the primary database.
         """
-        return "default"
+        scope = _scope.get()
+        if scope is not None:
+            scope["wrote"] = True
+        return PRIMARY
 
     def allow_relation(self, obj1, obj2, **hints):
         """
         Allow relations between objects in the same database.
         """
-        db_set = {"default", "replica1", "replica2"}
+        db_set = {PRIMARY, *replica_aliases()}
         if obj1._state.db in db_set and obj2._state.db in db_set:
             return True
         return None
@@ -46,4 +233,51 @@ class ReadReplicaRouter:
         """
         Ensure migrations only run on the primary database.
         """
-        return db == "default"
+        return db == PRIMARY
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Keeps a client's reads on the primary right after it writes.
+
+    Writes during a request pin the rest of that request to the primary and
+    mark the client (by ``Authorization`` header or session cookie) in the
+    cache for ``DATABASE_REPLICA_STICKY_SECONDS``, so its next requests read
+    their own writes even while replicas lag. Unused without replicas.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, "DATABASE_REPLICA_STICKY_SECONDS", 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def sticky_key(self, request):
+        identity = request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not identity:
+            return None
+        return "db:sticky:" + hashlib.sha256(identity.encode()).hexdigest()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        key = self.sticky_key(request)
+        with read_your_writes(pinned=bool(key and cache.get(key))) as scope:
+            response = self.get_response(request)
+        if key and scope["wrote"]:
+            cache.set(key, 1, self.sticky_seconds)
+        return response
+
+    async def __acall__(self, request):
+        key = self.sticky_key(request)
+        with read_your_writes(pinned=bool(key and await cache.aget(key))) as scope:
+            response = await self.get_response(request)
+        if key and scope["wrote"]:
+            await cache.aset(key, 1, self.sticky_seconds)
+        return response
@@ -0,0 +1,224 @@
+"""
+Read-optimized serialization fast path.
+
+Builds list/retrieve payloads straight from ``values_list()`` rows using
+per-field converters compiled once per serializer class. Model instances,
+``get_attribute`` lookups and serializer instantiation are skipped entirely,
+while the output stays identical to the serializer's own ``to_representation``.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import models
+from django.http import Http404
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Field types whose DRF representation is a plain builtin cast of the DB value
+_BUILTIN_CONVERTERS = (
+    (serializers.BooleanField, bool),
+    (serializers.IntegerField, int),
+    (serializers.FloatField, float),
+    (serializers.CharField, str),
+)
+
+
+class _IsoDateTimeConverter:
+    """
+    ``DateTimeField`` converter for ISO 8601 output.
+
+    The active timezone is bound once per response instead of being looked up
+    for every value; anything unusual is handed back to the field itself.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def bind(self, current_timezone):
+        fallback = self.field.to_representation
+
+        def convert(value):
+            if value.tzinfo is None:
+                return fallback(value)
+            try:
+                value = value.astimezone(current_timezone).isoformat()
+            except OverflowError:
+                return fallback(value)
+            if value.endswith("+00:00"):
+                return value[:-6] + "Z"
+            return value
+
+        return convert
+
+
+class CompiledRepresentation:
+    """
+    Precompiled row converter for a ``ModelSerializer`` class.
+
+    ``annotations`` maps read-only serializer fields that are not model
+    columns (e.g. properties) to query expressions computing the same value
+    in SQL.
+    """
+
+    def __init__(self, serializer_class, annotations=None):
+        annotations = annotations or {}
+        model = serializer_class.Meta.model
+
+        self.keys = []
+        self.columns = []
+        self.converters = []
+
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+
+            if name in annotations:
+                column = annotations[name]
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                column = field.source
+            elif isinstance(field, serializers.ReadOnlyField) or field.source == "*" or "." in field.source:
+                raise ImproperlyConfigured(
+                    f"{serializer_class.__name__}.{name} is not a model column; "
+                    "provide a query expression for it in the fast read annotations."
+                )
+            else:
+                model._meta.get_field(field.source)
+                column = field.source
+
+            self.keys.append(name)
+            self.columns.append(column)
+            if name in annotations:
+                self.converters.append(self._compile_annotation_converter(column))
+            else:
+                self.converters.append(self._compile_converter(field))
+
+    @staticmethod
+    def _compile_annotation_converter(expression):
+        """Quantize decimal expressions, which some backends (SQLite) return unscaled."""
+        if isinstance(expression, models.ExpressionWrapper):
+            output_field = expression.output_field
+            if isinstance(output_field, models.DecimalField) and output_field.decimal_places is not None:
+                exponent = Decimal(1).scaleb(-output_field.decimal_places)
+                return lambda value: value.quantize(exponent)
+        return None
+
+    @staticmethod
+    def _compile_converter(field):
+        """Return a callable for non-null values, or None when the value passes through unchanged."""
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            return field.pk_field.to_representation if field.pk_field is not None else None
+        if isinstance(field, serializers.ReadOnlyField):
+            return None
+        if isinstance(field, serializers.ChoiceField):
+            choices = field.choice_strings_to_values
+            return lambda value: value if value == "" else choices.get(str(value), value)
+        if isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+            if settings.USE_TZ and not hasattr(field, "timezone") and output_format and output_format.lower() == ISO_8601:
+                return _IsoDateTimeConverter(field)
+        for field_class, converter in _BUILTIN_CONVERTERS:
+            if isinstance(field, field_class):
+                return converter
+        return field.to_representation
+
+    def bind(self):
+        """Resolve per-request converter state, such as the active timezone."""
+        current_timezone = timezone.get_current_timezone()
+        return [
+            convert.bind(current_timezone) if isinstance(convert, _IsoDateTimeConverter) else convert
+            for convert in self.converters
+        ]
+
+    def rows(self, queryset, chunk_size=None):
+        """
+        Yield representations for every row in ``queryset``.
+
+        With ``chunk_size`` rows are streamed through ``iterator()`` (a
+        server-side cursor on Postgres) instead of being fetched up front.
+        """
+        converters = self.bind()
+        values_list = queryset.values_list(*self.columns)
+        if chunk_size:
+            values_list = values_list.iterator(chunk_size=chunk_size)
+        for values in values_list:
+            yield self.to_representation(values, converters)
+
+    def to_representation(self, values, converters):
+        return {
+            key: value if value is None or convert is None else convert(value)
+            for key, convert, value in zip(self.keys, converters, values)
+        }
+
+
+class CompiledRepresentationMixin:
+    """
+    ViewSet mixin caching a ``CompiledRepresentation`` per serializer class.
+
+    Set ``fast_read_annotations`` for serializer fields backed by model
+    properties.
+    """
+
+    fast_read_annotations = {}
+
+    def get_fast_representation(self):
+        cls = type(self)
+        serializer_class = self.get_serializer_class()
+        cache = cls.__dict__.get("_fast_read_cache")
+        if cache is None:
+            cache = cls._fast_read_cache = {}
+        if serializer_class not in cache:
+            cache[serializer_class] = CompiledRepresentation(serializer_class, self.fast_read_annotations)
+        return cache[serializer_class]
+
+
+class FastReadMixin(CompiledRepresentationMixin):
+    """
+    ViewSet mixin serving ``list`` and ``retrieve`` from compiled value rows.
+
+    Retrieve falls back to the regular path when any permission class
+    implements object-level checks, since those need a model instance.
+    """
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_fast_representation()
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(queryset.values_list(*compiled.columns))
+        if page is not None:
+            converters = compiled.bind()
+            return self.get_paginated_response([compiled.to_representation(values, converters) for values in page])
+
+        return Response(list(compiled.rows(queryset)))
+
+    def retrieve(self, request, *args, **kwargs):
+        if self._has_object_permissions():
+            return super().retrieve(request, *args, **kwargs)
+
+        compiled = self.get_fast_representation()
+        try:
+            rows = list(self.get_fast_object_rows(compiled))
+        except (TypeError, ValueError, ValidationError):
+            rows = []
+        return Response(self.get_fast_object(compiled, rows))
+
+    def get_fast_object_rows(self, compiled):
+        """Value rows matching the URL lookup; at most two, enough to tell "exactly one" apart."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]}).values_list(*compiled.columns)[:2]
+
+    def get_fast_object(self, compiled, rows):
+        if len(rows) != 1:
+            raise Http404(f"No {self.get_queryset().model._meta.object_name} matches the given query.")
+        return compiled.to_representation(rows[0], compiled.bind())
+
+    def _has_object_permissions(self):
+        return any(
+            type(permission).has_object_permission is not BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
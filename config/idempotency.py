@@ -0,0 +1,182 @@
+"""
+Idempotency keys for API creates and Celery tasks.
+
+Clients that may retry a ``POST`` send an ``Idempotency-Key`` header. The
+first request with a key claims it in the Django cache (Redis) together with
+a fingerprint of the request; its response is stored for
+``IDEMPOTENCY_TTL`` seconds and replayed, with an ``Idempotent-Replayed``
+header, for every retry carrying the same key:
+
+- same key, same request, first one still running: 409 Conflict;
+- same key, different request body or endpoint: 422 Unprocessable Entity;
+- the first request failed with a server error: the key is released, so
+  the retry runs again.
+
+Keys are scoped per user. Requests without the header behave as before, and
+so does everything when the cache is unreachable.
+
+``idempotent_task`` does the same for Celery tasks: a task called again with
+the same arguments within ``IDEMPOTENCY_TASK_TTL`` seconds (a retry, a
+duplicate ``delay``) returns the first call's result without running.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Longest time a claimed key may stay in flight before another request can take it over
+IN_FLIGHT_TTL = 60
+
+_PENDING = "pending"
+_DONE = "done"
+
+
+def _ttl():
+    return getattr(settings, "IDEMPOTENCY_TTL", 24 * 60 * 60)
+
+
+def _task_ttl():
+    return getattr(settings, "IDEMPOTENCY_TASK_TTL", 60 * 60)
+
+
+def _prefix():
+    return getattr(settings, "IDEMPOTENCY_KEY_PREFIX", "idempotency")
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def request_fingerprint(request):
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    return _digest(f"{request.method} {request.path} " + json.dumps(data, sort_keys=True, default=str))
+
+
+def _claim(cache_key, value, ttl=IN_FLIGHT_TTL):
+    """Claim ``cache_key``; returns ``(claimed, stored)`` where ``stored`` is the existing entry, if any."""
+    if cache.add(cache_key, value, ttl):
+        return True, None
+    return False, cache.get(cache_key)
+
+
+class IdempotencyMixin:
+    """Replays the stored response for ``create`` requests that repeat an ``Idempotency-Key``."""
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+
+        cache_key = f"{_prefix()}:{request.user.pk}:{_digest(key)}"
+        fingerprint = request_fingerprint(request)
+        try:
+            claimed, stored = _claim(cache_key, {"state": _PENDING, "fingerprint": fingerprint})
+        except Exception:
+            logger.warning("Idempotency store unavailable, processing request without it", exc_info=True)
+            return super().create(request, *args, **kwargs)
+
+        if stored is not None:
+            return self._replay(stored, fingerprint)
+        if not claimed:
+            # The claim expired between add() and get(); process without protection rather than fail
+            return super().create(request, *args, **kwargs)
+
+        try:
+            response = super().create(request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+        self._store(cache_key, fingerprint, response)
+        return response
+
+    def _replay(self, stored, fingerprint):
+        if stored["fingerprint"] != fingerprint:
+            return Response(
+                {"detail": f"{IDEMPOTENCY_HEADER} was already used for a different request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if stored["state"] == _PENDING:
+            return Response(
+                {"detail": f"A request with this {IDEMPOTENCY_HEADER} is still being processed."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(stored["data"], status=stored["status"], headers={**stored["headers"], REPLAYED_HEADER: "true"})
+
+    def _store(self, cache_key, fingerprint, response):
+        """Keep the response for replay; server errors release the key instead."""
+        try:
+            if response.status_code >= 500:
+                cache.delete(cache_key)
+                return
+            headers = {name: value for name, value in response.items() if name == "Location"}
+            cache.set(
+                cache_key,
+                {
+                    "state": _DONE,
+                    "fingerprint": fingerprint,
+                    "status": response.status_code,
+                    "data": response.data,
+                    "headers": headers,
+                },
+                _ttl(),
+            )
+        except Exception:
+            logger.warning("Could not store idempotent response", exc_info=True)
+
+
+def _store_result(cache_key, name, result):
+    try:
+        cache.set(cache_key, {"state": _DONE, "result": result}, _task_ttl())
+    except Exception:
+        logger.warning("Could not store result of %s", name, exc_info=True)
+
+
+def idempotent_task(func=None, *, key=None):
+    """
+    Skip repeated calls of a task with the same arguments.
+
+    ``key(*args, **kwargs)`` may narrow what counts as the same call
+    (default: all arguments). A call that raises releases its key, so Celery
+    retries run again; whatever a call returns is replayed, so tasks should
+    let unexpected errors raise rather than return them.
+    """
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call = key(*args, **kwargs) if key else json.dumps([args, kwargs], sort_keys=True, default=str)
+            cache_key = f"{_prefix()}:task:{name}:{_digest(str(call))}"
+            try:
+                claimed, stored = _claim(cache_key, {"state": _PENDING})
+            except Exception:
+                logger.warning("Idempotency store unavailable, running %s without it", name, exc_info=True)
+                return func(*args, **kwargs)
+            if not claimed and stored is not None:
+                return stored.get("result", f"Duplicate {name} call skipped")
+
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                cache.delete(cache_key)
+                raise
+            _store_result(cache_key, name, result)
+            return result
+
+        return wrapper
+
+    return decorator(func) if func else decorator
@@ -0,0 +1,84 @@
+"""
+orjson-backed JSON renderer and parser.
+
+Drop-in replacements for DRF's ``JSONRenderer``/``JSONParser`` that produce
+the same bytes for compact UTF-8 output. ``datetime``, ``date``, ``time`` and
+``UUID`` are serialized natively by orjson; ``Decimal``, lazy translation
+strings and the other types DRF knows about go through DRF's own encoder, so
+values render exactly as before.
+
+The module-level ``dumps``/``loads`` helpers use the same encoder for code
+outside the request cycle (WebSocket consumers, Celery payloads).
+"""
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+_default = JSONEncoder().default
+
+
+def dumps(data):
+    """Serialize ``data`` to JSON bytes."""
+    ret = orjson.dumps(data, default=_default, option=OPTIONS)
+
+    # Match DRF: always escape \u2028 and \u2029 so output stays a strict javascript subset
+    if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+        ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return ret
+
+
+def dumps_text(data):
+    """Serialize ``data`` to a JSON string, e.g. for WebSocket text frames."""
+    return dumps(data).decode()
+
+
+def loads(data):
+    """Parse JSON from ``bytes`` or ``str``."""
+    return orjson.loads(data)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renderer which serializes to JSON using orjson.
+
+    Indented output (``; indent=N`` or the browsable API) and non-default
+    ``UNICODE_JSON``/``COMPACT_JSON`` settings use the stdlib renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        if self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return dumps(data)
+
+
+class ORJSONParser(JSONParser):
+    """
+    Parses JSON-serialized data using orjson.
+
+    orjson only accepts UTF-8 and rejects ``NaN``/``Infinity``, matching DRF's
+    strict mode; other encodings use the stdlib parser.
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if not self.strict or encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -31,6 +31,7 @@ ALLOWED_HOSTS = []
 # Application definition
 
 import os  # noqa: E402
+import sys  # noqa: E402
 
 import dj_database_url  # noqa: E402
 from dotenv import load_dotenv  # noqa: E402
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
     # Third-party
     "rest_framework",
     "rest_framework.authtoken",  # For token authentication
+    "django_filters",
     "corsheaders",
     "channels",
     "django_prometheus",
@@ -60,15 +62,19 @@ INSTALLED_APPS = [
     "trips",
     "ems",
     "billing",
+    "reports",
+    "audit",
 ]
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "config.db_router.ReplicaStickinessMiddleware",  # Read-your-writes; inactive without replicas
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "audit.middleware.AuditMiddleware",  # Patient data access trail (see audit/log.py)
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -114,24 +120,159 @@ if os.environ.get("DATABASE_REPLICA2_URL"):
 if len(DATABASES) > 1:
     DATABASE_ROUTERS = ["config.db_router.ReadReplicaRouter"]
 
+# Replica routing (see config/db_router.py)
+# Replicas lagging more than this many seconds get no reads
+DATABASE_REPLICA_MAX_LAG = float(os.environ.get("DATABASE_REPLICA_MAX_LAG", 5))
+# Seconds between background health/lag probes
+DATABASE_REPLICA_CHECK_INTERVAL = float(os.environ.get("DATABASE_REPLICA_CHECK_INTERVAL", 2))
+# After a write, the client reads from the primary for this many seconds
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get("DATABASE_REPLICA_STICKY_SECONDS", 10))
+# Relative read share per replica, e.g. "replica1:2,replica2:1" (default 1 each)
+DATABASE_REPLICA_WEIGHTS = {
+    alias: int(weight)
+    for alias, weight in (
+        item.strip().split(":") for item in os.environ.get("DATABASE_REPLICA_WEIGHTS", "").split(",") if item.strip()
+    )
+}
+
+# Connection pooling (see config/db_pool)
+# Pools are per process, so they are sized by what the process runs:
+# web workers serve concurrent requests from a thread pool, Celery prefork
+# children run one task at a time and beat only schedules.
+PROCESS_TYPE = os.environ.get("PROCESS_TYPE") or (
+    "beat" if "beat" in sys.argv else "celery" if os.path.basename(sys.argv[0]) == "celery" else "web"
+)
+DATABASE_POOL_ENABLED = os.environ.get("DATABASE_POOL_ENABLED", "True").lower() == "true"
+DATABASE_POOL_PROFILES = {
+    "web": {"POOL_SIZE": 10, "MAX_OVERFLOW": 10},
+    "celery": {"POOL_SIZE": 2, "MAX_OVERFLOW": 2},
+    "beat": {"POOL_SIZE": 1, "MAX_OVERFLOW": 1},
+}
+DATABASE_POOL_OPTIONS = {
+    **DATABASE_POOL_PROFILES.get(PROCESS_TYPE, DATABASE_POOL_PROFILES["web"]),
+    # Seconds to wait for a free connection before failing the request
+    "TIMEOUT": float(os.environ.get("DATABASE_POOL_TIMEOUT", 10)),
+    # Reopen connections older than this many seconds
+    "RECYCLE": int(os.environ.get("DATABASE_POOL_RECYCLE", 900)),
+    "PRE_PING": True,
+}
+if os.environ.get("DATABASE_POOL_SIZE"):
+    DATABASE_POOL_OPTIONS["POOL_SIZE"] = int(os.environ["DATABASE_POOL_SIZE"])
+if os.environ.get("DATABASE_POOL_MAX_OVERFLOW"):
+    DATABASE_POOL_OPTIONS["MAX_OVERFLOW"] = int(os.environ["DATABASE_POOL_MAX_OVERFLOW"])
+
 # Database connection settings
 for db in DATABASES.values():
-    db["CONN_MAX_AGE"] = 600  # Keep connections alive for 10 minutes
     db["OPTIONS"] = db.get("OPTIONS", {})
     db["OPTIONS"]["connect_timeout"] = 10
+    if DATABASE_POOL_ENABLED and db.get("ENGINE") == "django.db.backends.postgresql":
+        db["ENGINE"] = "config.db_pool"
+        db["POOL_OPTIONS"] = dict(DATABASE_POOL_OPTIONS)
+        # Django hands the connection back to the pool after each request/task
+        db["CONN_MAX_AGE"] = 0
+    else:
+        db["CONN_MAX_AGE"] = 600  # Keep connections alive for 10 minutes
 
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",  # For mobile/API clients
+        "users.authentication.CachedTokenAuthentication",  # For mobile/API clients
         "rest_framework.authentication.SessionAuthentication",  # For browsable API
-        "rest_framework.authentication.BasicAuthentication",  # For testing
+    ],
+    # orjson-backed JSON (see config/renderers.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "config.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "config.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# Basic auth hashes the password (PBKDF2) on every request; only enable it for local testing
+if os.environ.get("API_BASIC_AUTH", "False").lower() == "true":
+    REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"].append("rest_framework.authentication.BasicAuthentication")
+
+# Token -> user cache (see users/authentication.py): shared cache TTL and per-process LRU TTL, in seconds
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get("AUTH_TOKEN_CACHE_TTL", 60))
+AUTH_TOKEN_LOCAL_CACHE_TTL = int(os.environ.get("AUTH_TOKEN_LOCAL_CACHE_TTL", 5))
+
+# Serve token-authenticated trip/vehicle/profile reads from async views under ASGI (see config/async_views.py)
+ASYNC_READ_VIEWS = os.environ.get("ASYNC_READ_VIEWS", "True").lower() == "true"
+
+# Retention of partitioned trip history in days, 0 keeps everything (see trips/partitions.py)
+GPS_HISTORY_RETENTION_DAYS = int(os.environ.get("GPS_HISTORY_RETENTION_DAYS", 30))
+CHAT_MESSAGE_RETENTION_DAYS = int(os.environ.get("CHAT_MESSAGE_RETENTION_DAYS", 365))
+# HIPAA asks for six years of access records
+AUDIT_RETENTION_DAYS = int(os.environ.get("AUDIT_RETENTION_DAYS", 6 * 365))
+
+# Audit trail (audit.log): events buffered per process and written in batches by a background thread
+AUDIT_BUFFER_SIZE = int(os.environ.get("AUDIT_BUFFER_SIZE", 10000))
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", 500))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", 2.0))
+# Off under the test runner: tests write the buffer inside their own transaction with audit_log.flush()
+RUNNING_TESTS = "test" in sys.argv or "pytest" in sys.modules
+AUDIT_BACKGROUND_FLUSH = os.environ.get("AUDIT_BACKGROUND_FLUSH", str(not RUNNING_TESTS)).lower() == "true"
+
+# Archival of completed/cancelled trips to ArchivedTrip (see trips/archive.py)
+TRIP_ARCHIVE_AFTER_DAYS = int(os.environ.get("TRIP_ARCHIVE_AFTER_DAYS", 180))
+TRIP_ARCHIVE_BATCH_SIZE = int(os.environ.get("TRIP_ARCHIVE_BATCH_SIZE", 500))
+# Seconds to sleep between batches, on top of waiting for replicas to catch up
+TRIP_ARCHIVE_BATCH_PAUSE = float(os.environ.get("TRIP_ARCHIVE_BATCH_PAUSE", 1.0))
+
+# Active trips running longer than this many seconds are flagged by check_trip_timeouts
+MAX_TRIP_DURATION = int(os.environ.get("MAX_TRIP_DURATION", 6 * 60 * 60))
+# Trips listed per dispatcher notification when the timeout sweep flags many at once
+TRIP_TIMEOUT_NOTIFICATION_BATCH = int(os.environ.get("TRIP_TIMEOUT_NOTIFICATION_BATCH", 50))
+
+# Dispatch availability registry (trips.availability): RedisRegistry, or MemoryRegistry within one process
+AVAILABILITY_REGISTRY = os.environ.get("AVAILABILITY_REGISTRY", "trips.availability.RedisRegistry")
+AVAILABILITY_REDIS_PREFIX = os.environ.get("AVAILABILITY_REDIS_PREFIX", "atw:availability")
+
+# Trip events (trips.outbox) published and deleted per transaction by relay_trip_events
+TRIP_EVENT_RELAY_BATCH_SIZE = int(os.environ.get("TRIP_EVENT_RELAY_BATCH_SIZE", 500))
+
+# Invoice completed trips one by one from process_trip_completion; when off, only the nightly batch invoices them
+INVOICE_TRIPS_ON_COMPLETION = os.environ.get("INVOICE_TRIPS_ON_COMPLETION", "True").lower() == "true"
+# Trips invoiced per transaction by the nightly generate_invoices batch
+INVOICE_BATCH_SIZE = int(os.environ.get("INVOICE_BATCH_SIZE", 1000))
+# Invoices marked overdue per transaction by process_overdue_invoices
+INVOICE_OVERDUE_BATCH_SIZE = int(os.environ.get("INVOICE_OVERDUE_BATCH_SIZE", 500))
+
+# Email delivery; the console and file backends stand in for SMTP locally
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend")
+EMAIL_HOST = os.environ.get("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.environ.get("EMAIL_PORT", 25))
+EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "False").lower() == "true"
+EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "")
+EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", "")
+EMAIL_FILE_PATH = os.environ.get("EMAIL_FILE_PATH", str(BASE_DIR / "sent_emails"))
+DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", "noreply@atw.local")
+
+# Notifications (users.notifications): events per user within the window are merged into one message
+NOTIFICATION_TRANSPORT = os.environ.get("NOTIFICATION_TRANSPORT", "users.notifications.EmailTransport")
+NOTIFICATION_COALESCE_WINDOW = float(os.environ.get("NOTIFICATION_COALESCE_WINDOW", 60))
+# Users delivered per transport connection by flush_notifications
+NOTIFICATION_BATCH_SIZE = int(os.environ.get("NOTIFICATION_BATCH_SIZE", 500))
+# Crew digests rendered and sent per transport connection by send_daily_digest
+DIGEST_CHUNK_SIZE = int(os.environ.get("DIGEST_CHUNK_SIZE", 1000))
+
+# Idempotency-Key responses (config.idempotency) are replayed for this many seconds
+IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL", 24 * 60 * 60))
+# Repeated task calls with the same arguments are skipped within this window
+IDEMPOTENCY_TASK_TTL = int(os.environ.get("IDEMPOTENCY_TASK_TTL", 60 * 60))
+
+# SystemSettings snapshot (billing.system_settings): invalidations are published on this Redis channel
+SYSTEM_SETTINGS_PUBSUB = os.environ.get("SYSTEM_SETTINGS_PUBSUB", "True").lower() == "true"
+SYSTEM_SETTINGS_CHANNEL = os.environ.get("SYSTEM_SETTINGS_CHANNEL", "atw:system_settings")
+# Seconds between checks of the shared version, in case an invalidation message is missed
+SYSTEM_SETTINGS_RECHECK_INTERVAL = float(os.environ.get("SYSTEM_SETTINGS_RECHECK_INTERVAL", 30))
+
 # drf-spectacular settings for API documentation
 SPECTACULAR_SETTINGS = {
     "TITLE": "ATW Backend API",
@@ -248,6 +389,14 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
+# Workers serve Prometheus task metrics on the first free port of the CELERY_METRICS_PORT_RANGE ports
+# from CELERY_METRICS_PORT, so several workers can share a host; 0 disables
+CELERY_METRICS_PORT = int(os.environ.get("CELERY_METRICS_PORT", 9808))
+CELERY_METRICS_PORT_RANGE = int(os.environ.get("CELERY_METRICS_PORT_RANGE", 10))
+# Beat serves queue lengths on its own port; 0 disables
+CELERY_BEAT_METRICS_PORT = int(os.environ.get("CELERY_BEAT_METRICS_PORT", 9807))
+# Seconds between broker queue length samples
+CELERY_QUEUE_SAMPLE_INTERVAL = float(os.environ.get("CELERY_QUEUE_SAMPLE_INTERVAL", 15))
 
 # Performance Optimizations
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
@@ -0,0 +1,240 @@
+"""
+Tests for the replica-aware database router, the pooled database backend and Celery telemetry.
+"""
+
+import errno
+import time
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from dj_db_conn_pool.core import pool_container
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from prometheus_client import REGISTRY
+from sqlalchemy.pool import QueuePool
+
+from config import celery_metrics
+from config.db_pool import pool_stats, reset_after_fork
+from config.db_router import PRIMARY, ReadReplicaRouter, ReplicaMonitor, ReplicaStickinessMiddleware, _scope, read_your_writes
+from users.models import User
+
+
+def make_monitor(**replicas):
+    """Build a monitor with preset ``(healthy, lag, outstanding, weight)`` state per replica."""
+    monitor = ReplicaMonitor(list(replicas), weights={alias: state[3] for alias, state in replicas.items()}, max_lag=5)
+    for alias, (healthy, lag, outstanding, _) in replicas.items():
+        state = monitor.replicas[alias]
+        state.healthy, state.lag, state.outstanding = healthy, lag, outstanding
+    return monitor
+
+
+class ReplicaMonitorTestCase(SimpleTestCase):
+    """Test replica selection."""
+
+    def test_skips_unhealthy_and_lagging_replicas(self):
+        """Only healthy replicas within the lag budget are eligible."""
+        monitor = make_monitor(replica1=(False, 0, 0, 1), replica2=(True, 30, 0, 1), replica3=(True, 1, 5, 1))
+        self.assertEqual(monitor.choose(), "replica3")
+
+        monitor.replicas["replica3"].lag = None
+        self.assertIsNone(monitor.choose())
+
+    def test_least_outstanding_by_weight(self):
+        """Outstanding queries are compared relative to each replica's weight."""
+        monitor = make_monitor(replica1=(True, 0, 3, 1), replica2=(True, 0, 3, 4))
+        self.assertEqual(monitor.choose(), "replica2")
+
+        monitor.replicas["replica2"].outstanding = 20
+        self.assertEqual(monitor.choose(), "replica1")
+
+    def test_tracks_outstanding_queries(self):
+        """The execute wrapper counts queries while they run."""
+        monitor = make_monitor(replica1=(True, 0, 0, 1))
+        seen = []
+        monitor.track("replica1")(
+            lambda *args: seen.append(monitor.replicas["replica1"].outstanding), "SELECT 1", None, False, {}
+        )
+        self.assertEqual(seen, [1])
+        self.assertEqual(monitor.replicas["replica1"].outstanding, 0)
+
+
+class ReadReplicaRouterTestCase(SimpleTestCase):
+    """Test read routing decisions."""
+
+    def setUp(self):
+        """Set up a router with two preset replicas."""
+        self.router = ReadReplicaRouter()
+        self.router.monitor = make_monitor(replica1=(True, 0, 0, 1), replica2=(True, 0, 2, 1))
+        self.router.monitor.ensure_started = lambda: None
+
+    def routed(self, alias, reason):
+        return REGISTRY.get_sample_value("atw_db_read_routes_total", {"alias": alias, "reason": reason}) or 0
+
+    def test_reads_go_to_least_loaded_replica(self):
+        """Reads use replicas and are counted by reason."""
+        before = self.routed("replica1", "replica")
+        self.assertEqual(self.router.db_for_read(None), "replica1")
+        self.assertEqual(self.routed("replica1", "replica"), before + 1)
+
+    def test_falls_back_to_primary(self):
+        """Without an eligible replica reads use the primary."""
+        for state in self.router.monitor.replicas.values():
+            state.healthy = False
+        before = self.routed(PRIMARY, "no_replica_available")
+        self.assertEqual(self.router.db_for_read(None), PRIMARY)
+        self.assertEqual(self.routed(PRIMARY, "no_replica_available"), before + 1)
+
+    def test_read_your_writes(self):
+        """After a write the rest of the scope reads from the primary."""
+        with read_your_writes() as scope:
+            self.assertEqual(self.router.db_for_read(None), "replica1")
+            self.assertEqual(self.router.db_for_write(None), PRIMARY)
+            self.assertTrue(scope["wrote"])
+            self.assertEqual(self.router.db_for_read(None), PRIMARY)
+        self.assertEqual(self.router.db_for_read(None), "replica1")
+
+        with read_your_writes(pinned=True):
+            self.assertEqual(self.router.db_for_read(None), PRIMARY)
+
+
+class ReplicaProbeTestCase(TestCase):
+    """Test the health/lag probe against a real database."""
+
+    def test_probe(self):
+        """A reachable database is healthy with no lag."""
+        monitor = ReplicaMonitor([PRIMARY])
+        monitor.probe(PRIMARY)
+        self.assertTrue(monitor.replicas[PRIMARY].healthy)
+        self.assertEqual(monitor.replicas[PRIMARY].lag, 0)
+
+    def test_metrics_endpoint(self):
+        """Routing metrics are exposed to Prometheus."""
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"atw_db_read_routes_total", response.content)
+
+
+@mock.patch("config.db_router.replica_aliases", return_value=["replica1"])
+class ReplicaStickinessMiddlewareTestCase(SimpleTestCase):
+    """Test cross-request read-your-writes stickiness."""
+
+    def test_client_sticks_to_primary_after_write(self, replica_aliases):
+        """A client that wrote reads from the primary on its next request; others do not."""
+        router = ReadReplicaRouter()
+        pinned = []
+
+        def view(request):
+            pinned.append(_scope.get()["pinned"])
+            if request.method == "POST":
+                router.db_for_write(None)
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(view)
+        factory = RequestFactory()
+        middleware(factory.post("/", HTTP_AUTHORIZATION="Token writer"))
+        middleware(factory.get("/", HTTP_AUTHORIZATION="Token writer"))
+        middleware(factory.get("/", HTTP_AUTHORIZATION="Token reader"))
+
+        self.assertEqual(pinned, [False, True, False])
+
+
+class DatabasePoolTestCase(TestCase):
+    """Test the pooled database backend."""
+
+    def test_reset_after_fork(self):
+        """A forked child replaces inherited pools without closing the parent's connections."""
+        inherited = QueuePool(creator=mock.Mock())
+        with (
+            mock.patch.dict(pool_container, {"replica1": inherited}, clear=True),
+            mock.patch("config.db_pool._pool_pid", -1),
+            mock.patch.object(inherited, "dispose") as dispose,
+        ):
+            reset_after_fork()
+
+            self.assertIsNot(pool_container["replica1"], inherited)
+            self.assertIsInstance(pool_container["replica1"], QueuePool)
+            dispose.assert_not_called()
+
+    @skipUnless(connection.settings_dict["ENGINE"] == "config.db_pool", "Connection pooling is not enabled")
+    def test_pool_metrics(self):
+        """Pool state and checkout wait time are exposed to Prometheus."""
+        User.objects.exists()
+        self.assertGreaterEqual(pool_stats()[connection.alias]["in_use"], 1)
+
+        response = self.client.get("/metrics")
+        self.assertIn(b'atw_db_pool_in_use{alias="default"}', response.content)
+        self.assertIn(b"atw_db_pool_checkout_wait_seconds_count", response.content)
+
+
+class CeleryMetricsTestCase(SimpleTestCase):
+    """Test task telemetry from Celery signals and the queue depth sampler."""
+
+    def sample(self, name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def fake_task(self, **request):
+        defaults = {"published_at": None, "eta": None, "delivery_info": {"routing_key": "normal"}}
+        return SimpleNamespace(name="tests.fake_task", request=SimpleNamespace(**{**defaults, **request}))
+
+    def test_publish_stamp_wait_and_runtime(self):
+        """Queue wait is measured from the publish stamp; runtime is recorded per final state."""
+        headers = {}
+        celery_metrics.stamp_publish_time(headers=headers)
+        task = self.fake_task(published_at=headers["published_at"] - 2)
+
+        wait = {"task": "tests.fake_task", "queue": "normal"}
+        runtime = {"task": "tests.fake_task", "state": "SUCCESS"}
+        waits, runs = self.sample("atw_celery_task_queue_wait_seconds_count", wait), self.sample(
+            "atw_celery_task_runtime_seconds_count", runtime
+        )
+        celery_metrics.task_started(task_id="t1", task=task)
+        celery_metrics.task_finished(task_id="t1", task=task, state="SUCCESS")
+
+        self.assertEqual(self.sample("atw_celery_task_queue_wait_seconds_count", wait), waits + 1)
+        self.assertGreaterEqual(self.sample("atw_celery_task_queue_wait_seconds_sum", wait), 2)
+        self.assertEqual(self.sample("atw_celery_task_runtime_seconds_count", runtime), runs + 1)
+
+    def test_scheduled_tasks_report_no_wait(self):
+        """Tasks with an ETA waited on purpose and are left out of the wait histogram."""
+        wait = {"task": "tests.fake_task", "queue": "normal"}
+        before = self.sample("atw_celery_task_queue_wait_seconds_count", wait)
+        task = self.fake_task(published_at=time.time() - 60, eta="2030-01-01T00:00:00")
+        celery_metrics.task_started(task_id="t2", task=task)
+        celery_metrics.task_finished(task_id="t2", task=task, state="SUCCESS")
+        self.assertEqual(self.sample("atw_celery_task_queue_wait_seconds_count", wait), before)
+
+    def test_failures_and_retries(self):
+        """Failures are counted per exception type, retries per task."""
+        sender = SimpleNamespace(name="tests.fake_task")
+        failures = self.sample("atw_celery_task_failures_total", {"task": "tests.fake_task", "exception": "ValueError"})
+        retries = self.sample("atw_celery_task_retries_total", {"task": "tests.fake_task"})
+        celery_metrics.task_failed(sender=sender, exception=ValueError())
+        celery_metrics.task_retried(sender=sender)
+        self.assertEqual(
+            self.sample("atw_celery_task_failures_total", {"task": "tests.fake_task", "exception": "ValueError"}), failures + 1
+        )
+        self.assertEqual(self.sample("atw_celery_task_retries_total", {"task": "tests.fake_task"}), retries + 1)
+
+    def test_queue_depth_is_sampled_at_most_once_per_interval(self):
+        """Scrapes within the interval reuse the last sample."""
+        collector = celery_metrics.QueueDepthCollector(app=None, queues=("normal",), interval=60)
+        with mock.patch.object(collector, "sample", return_value={"normal": 7}) as sample:
+            for _ in range(3):
+                [family] = collector.collect()
+        self.assertEqual(sample.call_count, 1)
+        self.assertEqual([(s.labels["queue"], s.value) for s in family.samples], [("normal", 7)])
+
+    def test_exporter_takes_the_next_free_port(self):
+        """Processes sharing a host bind successive ports; with none left the exporter is skipped and logged."""
+        in_use = OSError(errno.EADDRINUSE, "Address already in use")
+        with mock.patch.object(celery_metrics, "start_http_server", side_effect=[in_use, None]) as serve:
+            self.assertEqual(celery_metrics.start_exporter(port=9808, tries=3), 9809)
+        self.assertEqual([call.args[0] for call in serve.call_args_list], [9808, 9809])
+
+        with (
+            mock.patch.object(celery_metrics, "start_http_server", side_effect=in_use),
+            self.assertLogs("config.celery_metrics", "ERROR"),
+        ):
+            self.assertIsNone(celery_metrics.start_exporter(port=9808, tries=2))
+        self.assertIsNone(celery_metrics.start_exporter(port=0))
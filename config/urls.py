@@ -32,6 +32,8 @@ urlpatterns = [
     # Health check endpoints for Kubernetes
     path("api/v1/health/", health_check, name="health"),
     path("api/v1/ready/", readiness_check, name="readiness"),
+    # Prometheus metrics (scraped per k8s/deployments/django.yaml)
+    path("", include("django_prometheus.urls")),
     # API Documentation
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
@@ -43,6 +45,8 @@ urlpatterns = [
     path("api/v1/", include("trips.urls")),
     path("api/v1/", include("ems.urls")),
     path("api/v1/", include("billing.urls")),
+    path("api/v1/", include("reports.urls")),
+    path("api/v1/", include("audit.urls")),
 ]
 
 # Serve static files in development
@@ -1,10 +1,12 @@
 from rest_framework import permissions, viewsets
 
+from config.idempotency import IdempotencyMixin
+
 from .models import EMSReport
 from .serializers import EMSReportSerializer
 
 
-class EMSReportViewSet(viewsets.ModelViewSet):
+class EMSReportViewSet(IdempotencyMixin, viewsets.ModelViewSet):
     queryset = EMSReport.objects.all()
     serializer_class = EMSReportSerializer
     permission_classes = [permissions.IsAuthenticated]
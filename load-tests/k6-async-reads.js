@@ -0,0 +1,45 @@
+// k6 concurrency test for the async read endpoints against a single ASGI worker
+//
+// Run once with ASYNC_READ_VIEWS=False and once with ASYNC_READ_VIEWS=True on the server:
+//   uvicorn config.asgi:application --workers 1
+//   k6 run -e BASE_URL=http://localhost:8000 -e API_TOKEN=<token> load-tests/k6-async-reads.js
+//
+// The concurrency at which p95 latency or the error rate crosses the thresholds is
+// how many concurrent requests one worker can handle.
+
+import http from 'k6/http';
+import { check } from 'k6';
+
+export const options = {
+  stages: [
+    { duration: '30s', target: 10 },
+    { duration: '30s', target: 50 },
+    { duration: '30s', target: 100 },
+    { duration: '30s', target: 200 },
+    { duration: '30s', target: 400 },
+    { duration: '10s', target: 0 },
+  ],
+
+  thresholds: {
+    http_req_duration: ['p(95)<500'],
+    http_req_failed: ['rate<0.01'],
+  },
+};
+
+const BASE_URL = __ENV.BASE_URL || 'http://localhost:8000';
+const PATHS = ['/api/v1/trips/', '/api/v1/vehicles/', '/api/v1/auth/profile/'];
+
+export default function () {
+  const path = PATHS[Math.floor(Math.random() * PATHS.length)];
+  const response = http.get(`${BASE_URL}${path}`, {
+    headers: {
+      Accept: 'application/json',
+      Authorization: `Token ${__ENV.API_TOKEN}`,
+    },
+    tags: { name: path },
+  });
+
+  check(response, {
+    'status is 200': (r) => r.status === 200,
+  });
+}
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:22
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+# SQLite (local/test): external-content FTS5 table with the trigram tokenizer, kept in sync by triggers.
+# Note that SQLite table rebuilds from later AlterField migrations drop these triggers.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS patients_patient_fts USING fts5("
+    "name, medical_record_number, content='patients_patient', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS patients_patient_fts_ai AFTER INSERT ON patients_patient BEGIN "
+    "INSERT INTO patients_patient_fts(rowid, name, medical_record_number) "
+    "VALUES (new.id, new.name, new.medical_record_number); END",
+    "CREATE TRIGGER IF NOT EXISTS patients_patient_fts_ad AFTER DELETE ON patients_patient BEGIN "
+    "INSERT INTO patients_patient_fts(patients_patient_fts, rowid, name, medical_record_number) "
+    "VALUES ('delete', old.id, old.name, old.medical_record_number); END",
+    "CREATE TRIGGER IF NOT EXISTS patients_patient_fts_au AFTER UPDATE ON patients_patient BEGIN "
+    "INSERT INTO patients_patient_fts(patients_patient_fts, rowid, name, medical_record_number) "
+    "VALUES ('delete', old.id, old.name, old.medical_record_number); "
+    "INSERT INTO patients_patient_fts(rowid, name, medical_record_number) "
+    "VALUES (new.id, new.name, new.medical_record_number); END",
+    "INSERT INTO patients_patient_fts(patients_patient_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS patients_patient_fts_au",
+    "DROP TRIGGER IF EXISTS patients_patient_fts_ad",
+    "DROP TRIGGER IF EXISTS patients_patient_fts_ai",
+    "DROP TABLE IF EXISTS patients_patient_fts",
+]
+
+
+def search_index():
+    # Postgres: GIN index over the same expression patients.search queries, built
+    # concurrently so intake keeps writing while millions of rows are indexed.
+    return GinIndex(SearchVector("name", "medical_record_number", config="simple"), name="patient_search_vector_idx")
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.add_index(apps.get_model("patients", "Patient"), search_index(), concurrently=True)
+    elif vendor == "sqlite":
+        for statement in SQLITE_FORWARD:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.remove_index(apps.get_model("patients", "Patient"), search_index(), concurrently=True)
+    elif vendor == "sqlite":
+        for statement in SQLITE_BACKWARD:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("patients", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="patient",
+            index=models.Index(fields=["company", "dob"], name="patient_company_dob_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="patient",
+            index=models.Index(fields=["dob"], name="patient_dob_idx"),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -19,5 +19,12 @@ class Patient(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Name/MRN search indexes are backend specific; see migration 0003_patient_search_index
+        indexes = [
+            models.Index(fields=["company", "dob"], name="patient_company_dob_idx"),
+            models.Index(fields=["dob"], name="patient_dob_idx"),
+        ]
+
     def __str__(self):
         return self.name
@@ -0,0 +1,85 @@
+"""
+Patient search for intake.
+
+Dispatchers look patients up by partial name, MRN and DOB while the caller is
+on the phone. On Postgres the text part of the query is a prefix full-text
+match against the GIN index created in migration 0003_patient_search_index
+(so "jo smi" finds "John Smith"); on SQLite it runs against the FTS5 trigram
+table created by the same migration. Either way results are ranked by match
+quality and scoped to a company in SQL.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Patient
+
+# Trigram matching needs at least one full trigram
+MIN_TERM_LENGTH = 3
+
+# Must match the expression indexed by patient_search_vector_idx
+SEARCH_VECTOR = SearchVector("name", "medical_record_number", config="simple")
+
+
+def search_patients(text="", dob=None, company_id=None, limit=20):
+    """
+    Return up to ``limit`` patients matching ``text`` (name or MRN) and ``dob``.
+
+    An exact MRN match always ranks first. ``company_id`` restricts results to
+    one client company.
+    """
+    text = " ".join(text.split())
+    if connection.vendor == "sqlite" and text:
+        return _search_sqlite(text, dob, company_id, limit)
+
+    queryset = Patient.objects.all()
+    if company_id is not None:
+        queryset = queryset.filter(company_id=company_id)
+    if dob is not None:
+        queryset = queryset.filter(dob=dob)
+    if not text:
+        return list(queryset.order_by("name", "pk")[:limit])
+
+    # Every word of the input must prefix a word of the name or MRN
+    words = re.findall(r"\w+", text.lower())
+    query = SearchQuery(" & ".join(f"{word}:*" for word in words), config="simple", search_type="raw")
+
+    queryset = (
+        queryset.annotate(search=SEARCH_VECTOR)
+        .filter(Q(medical_record_number=text) | Q(search=query))
+        .annotate(
+            exact_mrn=Case(When(medical_record_number=text, then=Value(1)), default=Value(0), output_field=IntegerField()),
+            rank=SearchRank(SEARCH_VECTOR, query),
+        )
+    )
+    return list(queryset.order_by("-exact_mrn", "-rank", "name", "pk")[:limit])
+
+
+def _search_sqlite(text, dob, company_id, limit):
+    """FTS5 fallback: every term must appear as a substring of the name or MRN, ranked by bm25."""
+    terms = [term for term in text.split() if len(term) >= MIN_TERM_LENGTH] or [text]
+    match = " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+    sql = [
+        "SELECT p.id FROM patients_patient_fts JOIN patients_patient p ON p.id = patients_patient_fts.rowid",
+        "WHERE patients_patient_fts MATCH %s",
+    ]
+    params = [match]
+    if company_id is not None:
+        sql.append("AND p.company_id = %s")
+        params.append(company_id)
+    if dob is not None:
+        sql.append("AND p.dob = %s")
+        params.append(dob)
+    sql.append("ORDER BY p.medical_record_number = %s DESC, bm25(patients_patient_fts), p.name, p.id LIMIT %s")
+    params.extend([text, limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(" ".join(sql), params)
+        ids = [row[0] for row in cursor.fetchall()]
+
+    patients = Patient.objects.in_bulk(ids)
+    return [patients[pk] for pk in ids if pk in patients]
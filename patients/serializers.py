@@ -1,9 +1,25 @@
 from rest_framework import serializers
 
 from .models import Patient
+from .search import MIN_TERM_LENGTH
 
 
 class PatientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Patient
         fields = "__all__"
+
+
+class PatientSearchSerializer(serializers.Serializer):
+    """Query parameters for patient search."""
+
+    q = serializers.CharField(required=False, allow_blank=True, max_length=255)
+    dob = serializers.DateField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=50, default=20)
+
+    def validate(self, attrs):
+        q = " ".join(attrs.get("q", "").split())
+        if len(q) < MIN_TERM_LENGTH and "dob" not in attrs:
+            raise serializers.ValidationError(f"Provide at least {MIN_TERM_LENGTH} characters of name/MRN, or a dob.")
+        attrs["q"] = q
+        return attrs
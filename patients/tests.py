@@ -2,6 +2,10 @@
 Tests for patient management - Fixed to match actual Patient model.
 """
 
+from unittest import skipUnless
+
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
@@ -9,7 +13,8 @@ from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
 from patients.models import Patient
-from users.models import User
+from patients.search import SEARCH_VECTOR
+from users.models import Company, User
 
 
 class PatientViewSetTestCase(TestCase):
@@ -87,3 +92,80 @@ class PatientViewSetTestCase(TestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PatientSearchTestCase(TestCase):
+    """Test ranked patient search for intake."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.company = Company.objects.create(company_name="Metro Healthcare", company_type=Company.Type.CLIENT)
+        self.other_company = Company.objects.create(company_name="City General", company_type=Company.Type.CLIENT)
+
+        self.user = User.objects.create_user(
+            username="dispatcher", email="dispatcher@example.com", password="dispatch123", company=self.company
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.john = Patient.objects.create(
+            name="John Smith", medical_record_number="2021-MRN-001", dob="1965-03-15", company=self.company
+        )
+        self.joanna = Patient.objects.create(
+            name="Joanna Smithers", medical_record_number="2021-MRN-002", dob="1978-07-22", company=self.company
+        )
+        self.other_john = Patient.objects.create(
+            name="John Smith", medical_record_number="2021-MRN-003", dob="1965-03-15", company=self.other_company
+        )
+
+    def search(self, **params):
+        response = self.client.get("/api/v1/patients/search/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["id"] for row in response.data]
+
+    def test_partial_name(self):
+        """Partial names match and stay within the caller's company."""
+        results = self.search(q="john smi")
+        self.assertEqual(results[0], self.john.pk)
+        self.assertNotIn(self.other_john.pk, results)
+
+    def test_exact_mrn_ranks_first(self):
+        """An exact MRN match is the top result."""
+        self.assertEqual(self.search(q="2021-MRN-002")[0], self.joanna.pk)
+
+    def test_dob_only(self):
+        """DOB alone is enough to search."""
+        self.assertEqual(self.search(dob="1965-03-15"), [self.john.pk])
+
+    def test_name_and_dob(self):
+        """Name and DOB combine."""
+        self.assertEqual(self.search(q="smith", dob="1978-07-22"), [self.joanna.pk])
+
+    def test_staff_without_company_search_all_companies(self):
+        """ATW staff without a company see every client's patients."""
+        self.user.company = None
+        self.user.save(update_fields=["company"])
+
+        self.assertCountEqual(self.search(dob="1965-03-15"), [self.john.pk, self.other_john.pk])
+
+    def test_search_picks_up_updates(self):
+        """Renamed patients are found under their new name."""
+        self.john.name = "Jonathan Smythe"
+        self.john.save()
+
+        self.assertEqual(self.search(q="smythe"), [self.john.pk])
+
+    def test_query_too_short(self):
+        """Queries without a DOB need at least three characters."""
+        response = self.client.get("/api/v1/patients/search/", {"q": "jo"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(connection.vendor == "postgresql", "GIN indexes are Postgres-only")
+    def test_name_search_uses_search_index(self):
+        """The name/MRN filter is answerable from the full-text GIN index."""
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        query = SearchQuery("john:* & smi:*", config="simple", search_type="raw")
+        queryset = Patient.objects.annotate(search=SEARCH_VECTOR).filter(search=query)
+        self.assertIn("patient_search_vector_idx", queryset.explain())
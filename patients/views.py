@@ -1,10 +1,35 @@
 from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from config.idempotency import IdempotencyMixin
 
 from .models import Patient
-from .serializers import PatientSerializer
+from .search import search_patients
+from .serializers import PatientSearchSerializer, PatientSerializer
 
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(IdempotencyMixin, viewsets.ModelViewSet):
     queryset = Patient.objects.all()
     serializer_class = PatientSerializer
     permission_classes = [permissions.IsAuthenticated]
+
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """
+        Ranked patient lookup by partial name, MRN and/or DOB.
+
+        GET /api/v1/patients/search/?q=john smi&dob=1965-03-15&limit=20
+
+        Results are limited to the caller's company when they belong to one.
+        """
+        params = PatientSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        patients = search_patients(
+            text=params.validated_data["q"],
+            dob=params.validated_data.get("dob"),
+            company_id=request.user.company_id,
+            limit=params.validated_data["limit"],
+        )
+        return Response(PatientSerializer(patients, many=True).data)
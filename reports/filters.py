@@ -0,0 +1,37 @@
+from django_filters import rest_framework as filters
+
+from .models import Granularity, InvoiceRollup, TripRollup
+
+
+class RollupFilter(filters.FilterSet):
+    """
+    Query parameter filters shared by the rollup endpoints.
+
+    GET /api/v1/reports/trips/?granularity=hour&start=2025-01-01&end=2025-01-02&company=3
+    """
+
+    granularity = filters.ChoiceFilter(choices=Granularity.choices, empty_label=None)
+    company = filters.NumberFilter(field_name="company")
+    status = filters.CharFilter(field_name="status")
+    start = filters.DateTimeFilter(field_name="bucket", lookup_expr="gte")
+    end = filters.DateTimeFilter(field_name="bucket", lookup_expr="lt")
+
+    def filter_queryset(self, queryset):
+        # Day rows unless asked otherwise, so hour and day rows are never mixed
+        if not self.form.cleaned_data.get("granularity"):
+            queryset = queryset.filter(granularity=Granularity.DAY)
+        return super().filter_queryset(queryset)
+
+
+class TripRollupFilter(RollupFilter):
+    request_source = filters.CharFilter(field_name="request_source")
+
+    class Meta:
+        model = TripRollup
+        fields = ["granularity", "company", "status", "request_source", "start", "end"]
+
+
+class InvoiceRollupFilter(RollupFilter):
+    class Meta:
+        model = InvoiceRollup
+        fields = ["granularity", "company", "status", "start", "end"]
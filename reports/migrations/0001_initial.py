@@ -0,0 +1,81 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:28
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("users", "0002_user_company"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("updated_through", models.DateTimeField(blank=True, null=True)),
+                ("last_run_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TripRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("granularity", models.CharField(choices=[("hour", "Hour"), ("day", "Day")], max_length=10)),
+                ("bucket", models.DateTimeField()),
+                ("status", models.CharField(max_length=20)),
+                ("request_source", models.CharField(blank=True, max_length=20, null=True)),
+                ("trip_count", models.PositiveIntegerField(default=0)),
+                ("completed_distance", models.FloatField(default=0.0)),
+                ("pickup_delay_total", models.DurationField(default=datetime.timedelta(0))),
+                ("pickup_delay_count", models.PositiveIntegerField(default=0)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trip_rollups",
+                        to="users.company",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["granularity", "bucket"], name="triprollup_bucket_idx"),
+                    models.Index(fields=["company", "granularity", "bucket"], name="triprollup_company_bucket_idx"),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="InvoiceRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("granularity", models.CharField(choices=[("hour", "Hour"), ("day", "Day")], max_length=10)),
+                ("bucket", models.DateTimeField()),
+                ("status", models.CharField(max_length=20)),
+                ("invoice_count", models.PositiveIntegerField(default=0)),
+                ("revenue", models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ("tax", models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="invoice_rollups", to="users.company"
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["granularity", "bucket"], name="invrollup_bucket_idx"),
+                    models.Index(fields=["company", "granularity", "bucket"], name="invrollup_company_bucket_idx"),
+                ],
+            },
+        ),
+    ]
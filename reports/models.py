@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class Granularity(models.TextChoices):
+    HOUR = "hour", _("Hour")
+    DAY = "day", _("Day")
+
+
+class RollupWatermark(models.Model):
+    """How far (by source ``updated_at``) a rollup has been folded in."""
+
+    name = models.CharField(max_length=50, unique=True)
+    updated_through = models.DateTimeField(blank=True, null=True)
+    last_run_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.name} through {self.updated_through}"
+
+
+class TripRollup(models.Model):
+    granularity = models.CharField(max_length=10, choices=Granularity.choices)
+    bucket = models.DateTimeField()
+
+    company = models.ForeignKey("users.Company", on_delete=models.CASCADE, related_name="trip_rollups", blank=True, null=True)
+    status = models.CharField(max_length=20)
+    request_source = models.CharField(max_length=20, blank=True, null=True)
+
+    trip_count = models.PositiveIntegerField(default=0)
+    completed_distance = models.FloatField(default=0.0)
+    pickup_delay_total = models.DurationField(default=timedelta(0))
+    pickup_delay_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["granularity", "bucket"], name="triprollup_bucket_idx"),
+            models.Index(fields=["company", "granularity", "bucket"], name="triprollup_company_bucket_idx"),
+        ]
+
+    @property
+    def avg_pickup_delay(self):
+        if self.pickup_delay_count:
+            return self.pickup_delay_total / self.pickup_delay_count
+        return None
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:%M} {self.status}: {self.trip_count}"
+
+
+class InvoiceRollup(models.Model):
+    granularity = models.CharField(max_length=10, choices=Granularity.choices)
+    bucket = models.DateTimeField()
+
+    company = models.ForeignKey("users.Company", on_delete=models.CASCADE, related_name="invoice_rollups")
+    status = models.CharField(max_length=20)
+
+    invoice_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["granularity", "bucket"], name="invrollup_bucket_idx"),
+            models.Index(fields=["company", "granularity", "bucket"], name="invrollup_company_bucket_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:%M} {self.status}: {self.invoice_count}"
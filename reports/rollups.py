@@ -0,0 +1,190 @@
+"""
+Incrementally maintained operational rollups.
+
+Each run folds in only the ``Trip``/``Invoice`` rows whose ``updated_at`` is
+past the stored watermark: the hour buckets those rows fall in (by
+``created_at``) are recomputed from source, then the affected day buckets are
+re-summed from the hour rows. Dashboards read the rollup tables instead of
+aggregating the source tables.
+
+Recomputing whole buckets (rather than adding deltas) keeps rows that change
+status after creation correct. Hard deletes do not bump ``updated_at``; use
+``rebuild_rollups`` to repair a range after bulk deletes.
+"""
+
+import operator
+from datetime import datetime, time, timedelta
+from functools import reduce
+
+from django.db import router, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from .models import Granularity, InvoiceRollup, RollupWatermark, TripRollup
+
+# Rows updated within this window are left for the next run, so transactions
+# still in flight when the watermark advances are not skipped.
+SETTLE_TIME = timedelta(minutes=2)
+
+# Hour buckets recomputed per query
+BUCKET_BATCH_SIZE = 200
+
+
+class RollupSpec:
+    """
+    Describes one rollup table.
+
+    ``dimensions`` maps rollup columns to source lookups; ``metrics`` maps
+    rollup columns to aggregates over the source rows. Day rows are the sum
+    of each metric over the day's hour rows.
+    """
+
+    def __init__(self, name, source, rollup, dimensions, metrics):
+        self.name = name
+        self.source = source
+        self.rollup = rollup
+        self.dimensions = dimensions
+        self.metrics = metrics
+
+    def values_args(self):
+        names = [name for name, lookup in self.dimensions.items() if name == lookup]
+        expressions = {name: F(lookup) for name, lookup in self.dimensions.items() if name != lookup}
+        return names, expressions
+
+
+def _trip_spec():
+    from trips.models import Trip
+
+    started = Q(start_time__isnull=False)
+    return RollupSpec(
+        name="trips",
+        source=Trip,
+        rollup=TripRollup,
+        dimensions={"company_id": "patient__company", "status": "status", "request_source": "request_source"},
+        metrics={
+            "trip_count": Count("pk"),
+            "completed_distance": Sum(
+                F("end_odometer") - F("start_odometer"),
+                filter=Q(status=Trip.Status.COMPLETED, start_odometer__isnull=False, end_odometer__isnull=False),
+                default=0.0,
+            ),
+            "pickup_delay_total": Sum(
+                ExpressionWrapper(F("start_time") - F("created_at"), output_field=DurationField()),
+                filter=started,
+                default=timedelta(0),
+            ),
+            "pickup_delay_count": Count("pk", filter=started),
+        },
+    )
+
+
+def _invoice_spec():
+    from billing.models import Invoice
+
+    return RollupSpec(
+        name="invoices",
+        source=Invoice,
+        rollup=InvoiceRollup,
+        dimensions={"company_id": "company_id", "status": "status"},
+        metrics={
+            "invoice_count": Count("pk"),
+            "revenue": Sum("amount"),
+            "tax": Sum("tax"),
+        },
+    )
+
+
+def get_specs():
+    return [_trip_spec(), _invoice_spec()]
+
+
+def _ranges(starts, width, field):
+    return reduce(operator.or_, (Q(**{f"{field}__gte": start, f"{field}__lt": start + width}) for start in starts))
+
+
+def _day_starts(hours):
+    days = {timezone.localtime(hour).date() for hour in hours}
+    return sorted(timezone.make_aware(datetime.combine(day, time.min)) for day in days)
+
+
+def _rebuild_buckets(spec, hours, using):
+    """Recompute the given hour buckets from source, then their days from the hour rows."""
+    names, expressions = spec.values_args()
+    rollups = spec.rollup.objects.using(using)
+    hour = timedelta(hours=1)
+
+    for i in range(0, len(hours), BUCKET_BATCH_SIZE):
+        batch = hours[i : i + BUCKET_BATCH_SIZE]
+        rows = (
+            spec.source.objects.using(using)
+            .filter(_ranges(batch, hour, "created_at"))
+            .annotate(bucket=TruncHour("created_at"))
+            .values("bucket", *names, **expressions)
+            .annotate(**spec.metrics)
+            .order_by()
+        )
+        rollups.filter(granularity=Granularity.HOUR, bucket__in=batch).delete()
+        rollups.bulk_create(spec.rollup(granularity=Granularity.HOUR, **row) for row in rows)
+
+    dimensions = list(spec.dimensions)
+    day_metrics = {name: Sum(name) for name in spec.metrics}
+    days = _day_starts(hours)
+    for i in range(0, len(days), BUCKET_BATCH_SIZE):
+        batch = days[i : i + BUCKET_BATCH_SIZE]
+        rows = (
+            rollups.filter(granularity=Granularity.HOUR)
+            .filter(_ranges(batch, timedelta(days=1), "bucket"))
+            .values(*dimensions, day=TruncDay("bucket"))
+            .annotate(**day_metrics)
+            .order_by()
+        )
+        rollups.filter(granularity=Granularity.DAY, bucket__in=batch).delete()
+        rollups.bulk_create(spec.rollup(granularity=Granularity.DAY, bucket=row.pop("day"), **row) for row in rows)
+
+
+def refresh_rollup(spec, now=None):
+    """
+    Fold rows changed since the last run into ``spec``'s rollup table.
+
+    Returns the number of hour buckets recomputed.
+    """
+    now = now or timezone.now()
+    upper = now - SETTLE_TIME
+    using = router.db_for_write(spec.rollup)
+
+    with transaction.atomic(using=using):
+        # The row lock also keeps overlapping runs from interleaving
+        watermark, _ = RollupWatermark.objects.using(using).select_for_update().get_or_create(name=spec.name)
+
+        changed = spec.source.objects.using(using).filter(updated_at__lte=upper)
+        if watermark.updated_through is not None:
+            changed = changed.filter(updated_at__gt=watermark.updated_through)
+        hours = sorted(changed.annotate(hour=TruncHour("created_at")).values_list("hour", flat=True).order_by().distinct())
+
+        _rebuild_buckets(spec, hours, using)
+
+        watermark.updated_through = upper
+        watermark.last_run_at = now
+        watermark.save(using=using)
+
+    return len(hours)
+
+
+def refresh_rollups(now=None):
+    """Refresh every rollup table; returns ``{name: hour buckets recomputed}``."""
+    return {spec.name: refresh_rollup(spec, now) for spec in get_specs()}
+
+
+def rebuild_rollups(start, end):
+    """Recompute every hour bucket between ``start`` and ``end`` regardless of the watermark."""
+    start = start.replace(minute=0, second=0, microsecond=0)
+    hours = []
+    while start < end:
+        hours.append(start)
+        start += timedelta(hours=1)
+
+    for spec in get_specs():
+        using = router.db_for_write(spec.rollup)
+        with transaction.atomic(using=using):
+            _rebuild_buckets(spec, hours, using)
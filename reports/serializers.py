@@ -0,0 +1,31 @@
+from rest_framework import serializers
+
+from .models import InvoiceRollup, TripRollup
+
+
+class TripRollupSerializer(serializers.ModelSerializer):
+    avg_pickup_delay_seconds = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TripRollup
+        fields = [
+            "granularity",
+            "bucket",
+            "company",
+            "status",
+            "request_source",
+            "trip_count",
+            "completed_distance",
+            "pickup_delay_count",
+            "avg_pickup_delay_seconds",
+        ]
+
+    def get_avg_pickup_delay_seconds(self, obj):
+        delay = obj.avg_pickup_delay
+        return round(delay.total_seconds(), 1) if delay is not None else None
+
+
+class InvoiceRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InvoiceRollup
+        fields = ["granularity", "bucket", "company", "status", "invoice_count", "revenue", "tax"]
@@ -0,0 +1,21 @@
+"""
+Celery background tasks for operational reporting.
+
+Keeps the rollup tables behind the dashboard endpoints current.
+"""
+
+from celery import shared_task
+
+
+@shared_task(queue="normal")
+def refresh_operational_rollups():
+    """
+    Periodic task folding changed trips and invoices into the rollup tables.
+
+    Runs every 5 minutes (configured in config/celery.py).
+    """
+    from reports.rollups import refresh_rollups
+
+    refreshed = refresh_rollups()
+    summary = ", ".join(f"{name}: {count} hour buckets" for name, count in refreshed.items())
+    return f"Refreshed rollups ({summary})"
@@ -0,0 +1,164 @@
+"""
+Tests for the incrementally maintained operational rollups.
+"""
+
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from billing.models import Invoice
+from patients.models import Patient
+from reports.models import Granularity, InvoiceRollup, RollupWatermark, TripRollup
+from reports.rollups import refresh_rollups
+from trips.models import Trip
+from users.models import Company, User
+
+DAY = datetime(2025, 3, 10, tzinfo=dt_timezone.utc)
+
+
+class RollupRefreshTestCase(TestCase):
+    """Test watermark-driven rollup refreshes."""
+
+    def setUp(self):
+        """Set up trips across two hours of one day and one hour of the next."""
+        self.company = Company.objects.create(company_name="Metro Healthcare", company_type=Company.Type.CLIENT)
+        self.patient = Patient.objects.create(name="John Smith", company=self.company)
+
+        self.completed = self.create_trip(DAY + timedelta(hours=9, minutes=5), status="completed", odometer=(100, 112.5))
+        self.create_trip(DAY + timedelta(hours=9, minutes=40), status="completed", odometer=(200, 207.5))
+        self.pending = self.create_trip(DAY + timedelta(hours=14), status="pending")
+        self.create_trip(DAY + timedelta(days=1, hours=8), status="cancelled")
+
+        self.invoice = Invoice.objects.create(
+            trip=self.completed, company=self.company, amount=Decimal("100.00"), tax=Decimal("15.00")
+        )
+        Invoice.objects.filter(pk=self.invoice.pk).update(
+            created_at=DAY + timedelta(hours=11), updated_at=DAY + timedelta(hours=11)
+        )
+        self.invoice.refresh_from_db()
+
+        self.now = DAY + timedelta(days=2)
+
+    def create_trip(self, created_at, status, odometer=(None, None)):
+        trip = Trip.objects.create(
+            patient=self.patient,
+            start_location="A",
+            end_location="B",
+            status=status,
+            request_source="phone",
+            start_odometer=odometer[0],
+            end_odometer=odometer[1],
+        )
+        start_time = created_at + timedelta(minutes=20) if status == "completed" else None
+        Trip.objects.filter(pk=trip.pk).update(created_at=created_at, start_time=start_time, updated_at=created_at)
+        trip.refresh_from_db()
+        return trip
+
+    def rollup(self, granularity, bucket, status):
+        return TripRollup.objects.get(granularity=granularity, bucket=bucket, status=status)
+
+    def test_initial_refresh_backfills(self):
+        """The first run aggregates every hour and day."""
+        self.assertEqual(refresh_rollups(now=self.now), {"trips": 3, "invoices": 1})
+
+        completed = self.rollup(Granularity.HOUR, DAY + timedelta(hours=9), "completed")
+        self.assertEqual(completed.trip_count, 2)
+        self.assertEqual(completed.completed_distance, 20.0)
+        self.assertEqual(completed.avg_pickup_delay, timedelta(minutes=20))
+        self.assertEqual(completed.company, self.company)
+
+        day = TripRollup.objects.filter(granularity=Granularity.DAY, bucket=DAY)
+        self.assertEqual({row.status: row.trip_count for row in day}, {"completed": 2, "pending": 1})
+        self.assertEqual(self.rollup(Granularity.DAY, DAY + timedelta(days=1), "cancelled").trip_count, 1)
+
+        invoices = InvoiceRollup.objects.get(granularity=Granularity.DAY, bucket=DAY)
+        self.assertEqual((invoices.invoice_count, invoices.revenue, invoices.tax), (1, Decimal("100.00"), Decimal("15.00")))
+
+    def test_refresh_only_recomputes_changed_buckets(self):
+        """A status change re-buckets its hour and day; untouched buckets are left alone."""
+        refresh_rollups(now=self.now)
+        untouched = self.rollup(Granularity.HOUR, DAY + timedelta(hours=9), "completed")
+
+        self.pending.status = "completed"
+        self.pending.save()
+        self.assertEqual(refresh_rollups(now=self.pending.updated_at + timedelta(minutes=5)), {"trips": 1, "invoices": 0})
+
+        self.assertFalse(TripRollup.objects.filter(status="pending").exists())
+        self.assertEqual(self.rollup(Granularity.HOUR, DAY + timedelta(hours=14), "completed").trip_count, 1)
+        self.assertEqual(self.rollup(Granularity.DAY, DAY, "completed").trip_count, 3)
+        self.assertEqual(self.rollup(Granularity.HOUR, DAY + timedelta(hours=9), "completed").pk, untouched.pk)
+
+    def test_recent_changes_wait_to_settle(self):
+        """Rows updated within the settle window are picked up by the next run."""
+        refresh_rollups(now=self.now)
+
+        self.invoice.status = Invoice.Status.PAID
+        self.invoice.save()
+        self.assertEqual(refresh_rollups(now=self.invoice.updated_at)["invoices"], 0)
+        self.assertEqual(refresh_rollups(now=self.invoice.updated_at + timedelta(minutes=5))["invoices"], 1)
+
+        self.assertEqual(InvoiceRollup.objects.get(granularity=Granularity.DAY).status, Invoice.Status.PAID)
+        self.assertEqual(RollupWatermark.objects.count(), 2)
+
+    def test_no_changes(self):
+        """A run with nothing new recomputes nothing and keeps the rows."""
+        refresh_rollups(now=self.now)
+        count = TripRollup.objects.count()
+
+        self.assertEqual(refresh_rollups(now=self.now + timedelta(minutes=5)), {"trips": 0, "invoices": 0})
+        self.assertEqual(TripRollup.objects.count(), count)
+
+
+class RollupEndpointTestCase(TestCase):
+    """Test the dashboard rollup endpoints."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="ops", email="ops@example.com", password="ops12345")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.company = Company.objects.create(company_name="Metro Healthcare", company_type=Company.Type.CLIENT)
+        for granularity, bucket in ((Granularity.DAY, DAY), (Granularity.HOUR, DAY + timedelta(hours=9))):
+            TripRollup.objects.create(
+                granularity=granularity,
+                bucket=bucket,
+                company=self.company,
+                status="completed",
+                trip_count=4,
+                completed_distance=42.0,
+                pickup_delay_total=timedelta(minutes=60),
+                pickup_delay_count=4,
+            )
+        InvoiceRollup.objects.create(
+            granularity=Granularity.DAY,
+            bucket=DAY,
+            company=self.company,
+            status="paid",
+            invoice_count=2,
+            revenue=Decimal("200.00"),
+            tax=Decimal("30.00"),
+        )
+
+    def test_trip_rollups_default_to_days(self):
+        """Day rows are returned unless hours are requested."""
+        response = self.client.get("/api/v1/reports/trips/", {"company": self.company.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["trip_count"], 4)
+        self.assertEqual(response.data[0]["avg_pickup_delay_seconds"], 900.0)
+
+        response = self.client.get("/api/v1/reports/trips/", {"granularity": "hour"})
+        self.assertEqual([row["granularity"] for row in response.data], ["hour"])
+
+    def test_invoice_rollups(self):
+        """Invoice rollups report revenue and tax."""
+        response = self.client.get("/api/v1/reports/invoices/", {"start": "2025-03-01", "end": "2025-04-01"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data[0]["revenue"], response.data[0]["tax"]), ("200.00", "30.00"))
@@ -0,0 +1,12 @@
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from . import views
+
+router = DefaultRouter()
+router.register(r"reports/trips", views.TripRollupViewSet)
+router.register(r"reports/invoices", views.InvoiceRollupViewSet)
+
+urlpatterns = [
+    path("", include(router.urls)),
+]
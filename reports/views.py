@@ -0,0 +1,26 @@
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import permissions, viewsets
+
+from .filters import InvoiceRollupFilter, TripRollupFilter
+from .models import InvoiceRollup, TripRollup
+from .serializers import InvoiceRollupSerializer, TripRollupSerializer
+
+
+class TripRollupViewSet(viewsets.ReadOnlyModelViewSet):
+    """Trip counts, completed distance and pickup delay per hour/day, status, source and company."""
+
+    queryset = TripRollup.objects.order_by("bucket", "pk")
+    serializer_class = TripRollupSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = TripRollupFilter
+
+
+class InvoiceRollupViewSet(viewsets.ReadOnlyModelViewSet):
+    """Invoice counts, revenue and tax per hour/day, status and company."""
+
+    queryset = InvoiceRollup.objects.order_by("bucket", "pk")
+    serializer_class = InvoiceRollupSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = InvoiceRollupFilter
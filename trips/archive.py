@@ -0,0 +1,152 @@
+"""
+Archival of old completed and cancelled trips.
+
+Completed and cancelled trips created more than ``TRIP_ARCHIVE_AFTER_DAYS``
+days ago are moved from ``Trip`` to ``ArchivedTrip`` in fixed-size batches,
+walking the primary key (keyset pagination) so no batch rescans what the
+previous one covered. Each batch is one transaction that:
+
+- copies the trips, folding in their EMS reports;
+- copies their chat messages to ``ArchivedChatMessage``;
+- detaches their invoices, which stay in billing (the archived trip keeps
+  ``invoice_id``);
+- deletes the trips, cascading to chat, EMS and any GPS history still
+  within retention.
+
+Between batches the engine sleeps ``TRIP_ARCHIVE_BATCH_PAUSE`` seconds and
+waits for read replicas to catch up, so archiving never outruns replication.
+An interrupted run loses at most the batch in flight, which rolls back;
+the next run simply picks up the trips still in ``Trip``. Concurrent runs
+skip each other's locked rows.
+
+Archived trips leave the trip rollups as they were when archived; running
+``reports.rollups.rebuild_rollups`` over an archived range would drop them.
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from billing.models import Invoice
+
+from .models import ArchivedChatMessage, ArchivedTrip, ChatMessage, Trip
+
+ARCHIVABLE_STATUSES = (Trip.Status.COMPLETED, Trip.Status.CANCELLED)
+
+# Trip columns copied verbatim to ArchivedTrip
+TRIP_FIELDS = [
+    "id",
+    "patient_id",
+    "vehicle_id",
+    "driver_id",
+    "paramedic_id",
+    "start_location",
+    "end_location",
+    "status",
+    "start_time",
+    "end_time",
+    "start_odometer",
+    "end_odometer",
+    "request_source",
+    "created_at",
+    "updated_at",
+]
+CHAT_FIELDS = ["id", "trip_id", "sender_id", "receiver_id", "message_content", "message_type", "timestamp"]
+
+# Longest wait for replicas to catch up between two batches, in seconds
+MAX_REPLICA_WAIT = 60
+
+
+def archive_cutoff(now=None):
+    return (now or timezone.now()) - timedelta(days=getattr(settings, "TRIP_ARCHIVE_AFTER_DAYS", 180))
+
+
+def archivable_trips(cutoff):
+    return Trip.objects.filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff)
+
+
+def archive_batch(cutoff, after_id=0, batch_size=500):
+    """
+    Archive the next ``batch_size`` eligible trips with ids above ``after_id``.
+
+    Returns the ids archived, in order; an empty list means nothing is left.
+    """
+    with transaction.atomic():
+        ids = list(
+            archivable_trips(cutoff)
+            .filter(pk__gt=after_id)
+            .order_by("pk")
+            .select_for_update(skip_locked=True)
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+
+        trips = list(Trip.objects.filter(pk__in=ids).select_related("ems_report", "invoice").order_by("pk"))
+        ArchivedTrip.objects.bulk_create(
+            [
+                ArchivedTrip(
+                    **{field: getattr(trip, field) for field in TRIP_FIELDS},
+                    invoice_id=getattr(getattr(trip, "invoice", None), "pk", None),
+                    ems_medical_data=getattr(getattr(trip, "ems_report", None), "medical_data", None),
+                    ems_timestamp=getattr(getattr(trip, "ems_report", None), "timestamp", None),
+                )
+                for trip in trips
+            ]
+        )
+
+        # Messages never predate their trip; the bound lets Postgres prune chat partitions
+        messages = ChatMessage.objects.filter(trip_id__in=ids, timestamp__gte=min(trip.created_at for trip in trips))
+        ArchivedChatMessage.objects.bulk_create(
+            ArchivedChatMessage(**dict(zip(CHAT_FIELDS, values))) for values in messages.values_list(*CHAT_FIELDS)
+        )
+
+        # Leaves updated_at alone: the invoice itself did not change, so the rollups need no refresh
+        Invoice.objects.filter(trip_id__in=ids).update(trip=None)
+        Trip.objects.filter(pk__in=ids).delete()
+    return ids
+
+
+def wait_for_replicas(max_wait=MAX_REPLICA_WAIT):
+    """Block until every healthy read replica is within ``DATABASE_REPLICA_MAX_LAG``, or ``max_wait`` passes."""
+    monitors = [r.monitor for r in router.routers if hasattr(r, "monitor") and r.monitor.replicas]
+    deadline = time.monotonic() + max_wait
+    for monitor in monitors:
+        monitor.ensure_started()
+        while time.monotonic() < deadline and any(
+            state.healthy and state.lag is not None and state.lag > monitor.max_lag for state in monitor.replicas.values()
+        ):
+            time.sleep(monitor.interval)
+
+
+def archive_trips(now=None, batch_size=None, pause=None, max_batches=None, time_budget=None):
+    """
+    Archive every eligible trip, batch by batch.
+
+    Stops early after ``max_batches`` batches or ``time_budget`` seconds;
+    the next run continues where this one stopped. Returns the number of
+    trips archived.
+    """
+    batch_size = batch_size or getattr(settings, "TRIP_ARCHIVE_BATCH_SIZE", 500)
+    pause = getattr(settings, "TRIP_ARCHIVE_BATCH_PAUSE", 1.0) if pause is None else pause
+    cutoff = archive_cutoff(now)
+    deadline = time.monotonic() + time_budget if time_budget else None
+
+    archived = batches = 0
+    last_id = 0
+    while True:
+        ids = archive_batch(cutoff, after_id=last_id, batch_size=batch_size)
+        if not ids:
+            break
+        archived += len(ids)
+        batches += 1
+        last_id = ids[-1]
+        if (max_batches and batches >= max_batches) or (deadline and time.monotonic() >= deadline):
+            break
+        if pause:
+            time.sleep(pause)
+        wait_for_replicas()
+    return archived
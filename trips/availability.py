@@ -0,0 +1,246 @@
+"""
+Registry of the drivers, paramedics and vehicles available for dispatch.
+
+Crew members are available when they are active and on no active trip;
+vehicles when their status is ``available``. The registry keeps one sorted
+set per crew role and per vehicle type, scored by when the member became
+available, so dispatch asks it instead of scanning ``User`` and ``Vehicle``:
+
+    registry = get_registry()
+    registry.count(CREW, User.Role.DRIVER)                # ZCARD, O(1)
+    registry.is_available(VEHICLES, "ICU", vehicle_id)   # ZSCORE, O(1)
+    registry.available(CREW, User.Role.PARAMEDIC, 10)    # longest idle first
+
+Trip transitions (trips.lifecycle) update it once their transaction
+commits: assigning takes the crew and vehicle out, completing, cancelling or
+unassigning puts them back. ``reconcile`` rebuilds every set from the
+database and corrects drift (a missed update, a user deactivated, a vehicle
+sent to maintenance); ``reconcile_availability`` runs it every minute.
+
+``AVAILABILITY_REGISTRY`` picks the implementation: ``RedisRegistry`` (the
+default) shares the sets between processes, ``MemoryRegistry`` keeps them in
+the process for tests and local development.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.module_loading import import_string
+from prometheus_client import Counter
+
+from users.models import User
+from vehicles.models import Vehicle
+
+from .models import ACTIVE_TRIP_STATUSES, Trip
+
+logger = logging.getLogger(__name__)
+
+CREW = "crew"
+VEHICLES = "vehicles"
+
+CREW_ROLES = (User.Role.DRIVER, User.Role.PARAMEDIC)
+
+# Transitions that hand the trip's crew and vehicle back
+RELEASING_STATUSES = (Trip.Status.PENDING, Trip.Status.COMPLETED, Trip.Status.CANCELLED)
+
+DRIFT = Counter("atw_availability_drift_total", "Registry entries corrected by reconciliation", ["kind", "change"])
+
+
+def groups(kind):
+    return CREW_ROLES if kind == CREW else Vehicle.Type.values
+
+
+class MemoryRegistry:
+    """In-process registry with the same interface as ``RedisRegistry``."""
+
+    def __init__(self):
+        self._sets = {}
+        self._lock = threading.Lock()
+
+    def apply(self, changes):
+        """Apply ``(kind, group, member_id, since)`` changes; ``since=None`` removes the member."""
+        with self._lock:
+            for kind, group, member_id, since in changes:
+                members = self._sets.setdefault((kind, group), {})
+                if since is None:
+                    members.pop(member_id, None)
+                else:
+                    members.setdefault(member_id, since)
+
+    def members(self, kind, group):
+        return dict(self._sets.get((kind, group), {}))
+
+    def is_available(self, kind, group, member_id):
+        return member_id in self._sets.get((kind, group), {})
+
+    def count(self, kind, group):
+        return len(self._sets.get((kind, group), {}))
+
+    def available(self, kind, group, limit=None):
+        members = sorted(self._sets.get((kind, group), {}).items(), key=lambda item: (item[1], item[0]))
+        return [member_id for member_id, _ in members[:limit]]
+
+    def clear(self):
+        with self._lock:
+            self._sets.clear()
+
+
+class RedisRegistry:
+    """One Redis sorted set per crew role and vehicle type, scored by availability time."""
+
+    def _redis(self):
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+
+    def key(self, kind, group):
+        return f"{getattr(settings, 'AVAILABILITY_REDIS_PREFIX', 'atw:availability')}:{kind}:{group}"
+
+    def apply(self, changes):
+        """Apply ``(kind, group, member_id, since)`` changes atomically; ``since=None`` removes the member."""
+        pipe = self._redis().pipeline(transaction=True)
+        for kind, group, member_id, since in changes:
+            if since is None:
+                pipe.zrem(self.key(kind, group), member_id)
+            else:
+                # NX keeps the original time for members already available
+                pipe.zadd(self.key(kind, group), {member_id: since}, nx=True)
+        pipe.execute()
+
+    def members(self, kind, group):
+        return {int(member): score for member, score in self._redis().zrange(self.key(kind, group), 0, -1, withscores=True)}
+
+    def is_available(self, kind, group, member_id):
+        return self._redis().zscore(self.key(kind, group), member_id) is not None
+
+    def count(self, kind, group):
+        return self._redis().zcard(self.key(kind, group))
+
+    def available(self, kind, group, limit=None):
+        end = limit - 1 if limit else -1
+        return [int(member) for member in self._redis().zrange(self.key(kind, group), 0, end)]
+
+    def clear(self):
+        keys = [self.key(kind, group) for kind in (CREW, VEHICLES) for group in groups(kind)]
+        self._redis().delete(*keys)
+
+
+_registries = {}
+
+
+def get_registry():
+    path = getattr(settings, "AVAILABILITY_REGISTRY", "trips.availability.RedisRegistry")
+    if path not in _registries:
+        _registries[path] = import_string(path)()
+    return _registries[path]
+
+
+def busy(crew=(), vehicles=()):
+    """Changes taking crew members (ids) and vehicles (ids) out of every group."""
+    changes = [(CREW, role, member_id, None) for member_id in crew if member_id for role in CREW_ROLES]
+    changes += [(VEHICLES, type_, vehicle_id, None) for vehicle_id in vehicles if vehicle_id for type_ in groups(VEHICLES)]
+    return changes
+
+
+def freed(crew=(), vehicles=(), since=None):
+    """Changes putting ``(id, role)`` crew members and ``(id, type)`` vehicles back, available since ``since``."""
+    since = since or time.time()
+    changes = [(CREW, role, member_id, since) for member_id, role in crew if member_id and role in CREW_ROLES]
+    changes += [(VEHICLES, type_, vehicle_id, since) for vehicle_id, type_ in vehicles if vehicle_id]
+    return changes
+
+
+def on_active_trips(crew, exclude_trip=None):
+    """Return the crew member ids among ``crew`` that are on an active trip other than ``exclude_trip``."""
+    crew = [member_id for member_id in crew if member_id]
+    if not crew:
+        return set()
+    trips = Trip.objects.filter(status__in=ACTIVE_TRIP_STATUSES).exclude(pk=exclude_trip)
+    rows = trips.filter(Q(driver_id__in=crew) | Q(paramedic_id__in=crew)).values_list("driver_id", "paramedic_id")
+    return {member_id for row in rows for member_id in row if member_id in crew}
+
+
+def apply(changes):
+    """Apply ``changes`` to the registry; errors are logged, reconciliation repairs what was missed."""
+    if not changes:
+        return
+    try:
+        get_registry().apply(changes)
+    except Exception:
+        logger.warning("Could not update the availability registry", exc_info=True)
+
+
+def expected_members():
+    """Return ``{(kind, group): {member ids}}`` as the database has it, in two queries."""
+    on_trips = Trip.objects.filter(status__in=ACTIVE_TRIP_STATUSES)
+    crew = (
+        User.objects.filter(role__in=CREW_ROLES, is_active=True, status=User.Status.ACTIVE)
+        .exclude(pk__in=on_trips.filter(driver__isnull=False).values("driver_id"))
+        .exclude(pk__in=on_trips.filter(paramedic__isnull=False).values("paramedic_id"))
+        .values_list("pk", "role")
+    )
+    vehicles = (
+        Vehicle.objects.filter(status=Vehicle.Status.AVAILABLE)
+        .exclude(pk__in=on_trips.filter(vehicle__isnull=False).values("vehicle_id"))
+        .values_list("pk", "type")
+    )
+
+    expected = {(kind, group): set() for kind in (CREW, VEHICLES) for group in groups(kind)}
+    for kind, rows in ((CREW, crew), (VEHICLES, vehicles)):
+        for member_id, group in rows:
+            expected.setdefault((kind, group), set()).add(member_id)
+    return expected
+
+
+def reconcile(registry=None):
+    """
+    Bring the registry in line with the database; returns ``(added, removed)``.
+
+    Members already registered keep their availability time. A transition
+    committing while this runs can be overwritten; the next run repairs it.
+    """
+    registry = registry or get_registry()
+    now = time.time()
+    changes = []
+    added = removed = 0
+    for (kind, group), members in expected_members().items():
+        current = set(registry.members(kind, group))
+        missing, stale = members - current, current - members
+        changes += [(kind, group, member_id, now) for member_id in missing]
+        changes += [(kind, group, member_id, None) for member_id in stale]
+        if missing:
+            DRIFT.labels(kind, "added").inc(len(missing))
+        if stale:
+            DRIFT.labels(kind, "removed").inc(len(stale))
+        added += len(missing)
+        removed += len(stale)
+    if changes:
+        registry.apply(changes)
+    return added, removed
+
+
+def trip_changes(status, previous, fields, vehicle_released=False):
+    """
+    Registry changes for a transition to ``status``.
+
+    ``previous`` holds the trip's crew and vehicle before it (``driver_id``,
+    ``driver__role``, ``paramedic_id``, ``paramedic__role``, ``vehicle_id``,
+    ``vehicle__type``), ``fields`` what the transition assigns. A released
+    vehicle only comes back when the transition set it available again, and
+    released crew only when they are on no other active trip; called after
+    the trip's own update, in its transaction.
+    """
+    if status == Trip.Status.ASSIGNED:
+        crew = [getattr(fields.get(field), "pk", fields.get(field)) for field in ("driver", "paramedic")]
+        vehicle = fields.get("vehicle")
+        return busy(crew, [getattr(vehicle, "pk", vehicle)])
+    if status in RELEASING_STATUSES:
+        crew = [(previous["driver_id"], previous["driver__role"]), (previous["paramedic_id"], previous["paramedic__role"])]
+        engaged = on_active_trips([member_id for member_id, _ in crew])
+        crew = [(member_id, role) for member_id, role in crew if member_id not in engaged]
+        vehicles = [(previous["vehicle_id"], previous["vehicle__type"])] if vehicle_released else []
+        return freed(crew, vehicles)
+    return []
@@ -10,6 +10,8 @@ from asgiref.sync import sync_to_async  # noqa: F401
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from config.renderers import dumps_text, loads
+
 
 class GPSTrackingConsumer(AsyncWebsocketConsumer):
     """
@@ -31,7 +33,7 @@ class GPSTrackingConsumer(AsyncWebsocketConsumer):
 
         # Send initial trip data
         trip_data = await self.get_trip_data()
-        await self.send(text_data=json.dumps({"type": "connection_established", "trip_id": self.trip_id, "data": trip_data}))
+        await self.send(text_data=dumps_text({"type": "connection_established", "trip_id": self.trip_id, "data": trip_data}))
 
     async def disconnect(self, close_code):
         """Leave trip group on disconnect."""
@@ -43,7 +45,7 @@ class GPSTrackingConsumer(AsyncWebsocketConsumer):
         Broadcast to all clients tracking this trip.
         """
         try:
-            data = json.loads(text_data)
+            data = loads(text_data)
 
             if data.get("type") == "gps_update":
                 # Validate and save GPS data
@@ -69,9 +71,9 @@ class GPSTrackingConsumer(AsyncWebsocketConsumer):
                     },
                 )
         except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({"type": "error", "message": "Invalid JSON data"}))
+            await self.send(text_data=dumps_text({"type": "error", "message": "Invalid JSON data"}))
         except Exception as e:
-            await self.send(text_data=json.dumps({"type": "error", "message": str(e)}))
+            await self.send(text_data=dumps_text({"type": "error", "message": str(e)}))
 
     async def gps_location_update(self, event):
         """
@@ -79,7 +81,7 @@ class GPSTrackingConsumer(AsyncWebsocketConsumer):
         Sends GPS data to WebSocket client.
         """
         await self.send(
-            text_data=json.dumps(
+            text_data=dumps_text(
                 {
                     "type": "gps_update",
                     "trip_id": self.trip_id,
@@ -118,25 +120,26 @@ class GPSTrackingConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def save_gps_location(self, trip_id, latitude, longitude, speed=None, heading=None, timestamp=None):
-        """Save GPS location to database."""
+        """Append the GPS fix to the trip's tracking history."""
         from django.utils import timezone
-
-        from trips.models import Trip
-
-        try:
-            trip = Trip.objects.get(id=trip_id)
-
-            # Update trip's current location
-            trip.current_latitude = latitude
-            trip.current_longitude = longitude
-            trip.last_gps_update = timestamp or timezone.now()
-            trip.save(update_fields=["current_latitude", "current_longitude", "last_gps_update"])
-
-            # Optionally: Save to GPS tracking history table
-            # GPSTrackingHistory.objects.create(...)
-
-        except Trip.DoesNotExist:
-            pass
+        from django.utils.dateparse import parse_datetime
+
+        from trips.models import GPSTrackingHistory, Trip
+
+        if not Trip.objects.filter(id=trip_id).exists():
+            return
+
+        recorded_at = (parse_datetime(timestamp) if timestamp else None) or timezone.now()
+        if timezone.is_naive(recorded_at):
+            recorded_at = timezone.make_aware(recorded_at)
+        GPSTrackingHistory.objects.create(
+            trip_id=trip_id,
+            latitude=latitude,
+            longitude=longitude,
+            speed=speed,
+            heading=heading,
+            recorded_at=recorded_at,
+        )
 
 
 class TripStatusConsumer(AsyncWebsocketConsumer):
@@ -162,11 +165,12 @@ class TripStatusConsumer(AsyncWebsocketConsumer):
     async def trip_status_change(self, event):
         """Send trip status change to WebSocket client."""
         await self.send(
-            text_data=json.dumps(
+            text_data=dumps_text(
                 {
                     "type": "status_update",
                     "trip_id": self.trip_id,
                     "status": event["status"],
+                    "version": event.get("version"),
                     "timestamp": event["timestamp"],
                     "message": event.get("message"),
                 }
@@ -0,0 +1,71 @@
+from django_filters import rest_framework as filters
+
+from .models import ArchivedTrip, ChatMessage, Trip
+
+
+class TripFilter(filters.FilterSet):
+    """
+    Query parameter filters for trips.
+
+    GET /api/v1/trips/?status=en_route&status=at_pickup&driver=4&start=2025-01-01&ordering=-created_at
+    """
+
+    status = filters.MultipleChoiceFilter(choices=Trip.Status.choices, distinct=False)
+    active = filters.BooleanFilter(method="filter_active")
+    driver = filters.NumberFilter(field_name="driver")
+    paramedic = filters.NumberFilter(field_name="paramedic")
+    vehicle = filters.NumberFilter(field_name="vehicle")
+    company = filters.NumberFilter(field_name="patient__company")
+    request_source = filters.ChoiceFilter(choices=Trip.Source.choices)
+    start = filters.DateTimeFilter(field_name="created_at", lookup_expr="gte")
+    end = filters.DateTimeFilter(field_name="created_at", lookup_expr="lt")
+
+    class Meta:
+        model = Trip
+        fields = ["status", "active", "driver", "paramedic", "vehicle", "company", "request_source", "start", "end"]
+
+    def filter_active(self, queryset, name, value):
+        # Matches the trip_active_created_idx predicate exactly so the partial index applies
+        if value:
+            return queryset.filter(status__in=Trip.ACTIVE_STATUSES)
+        return queryset.exclude(status__in=Trip.ACTIVE_STATUSES)
+
+
+class ChatMessageFilter(filters.FilterSet):
+    """
+    Query parameter filters for chat messages.
+
+    ``start``/``end`` bound the partition column, so Postgres only scans the
+    matching monthly partitions.
+
+    GET /api/v1/messages/?trip=12&start=2025-01-01
+    """
+
+    trip = filters.NumberFilter(field_name="trip")
+    start = filters.DateTimeFilter(field_name="timestamp", lookup_expr="gte")
+    end = filters.DateTimeFilter(field_name="timestamp", lookup_expr="lt")
+
+    class Meta:
+        model = ChatMessage
+        fields = ["trip", "start", "end"]
+
+
+class ArchivedTripFilter(filters.FilterSet):
+    """
+    Query parameter filters for archived trips.
+
+    GET /api/v1/archived-trips/?driver=4&start=2024-01-01&end=2024-02-01
+    """
+
+    status = filters.MultipleChoiceFilter(choices=Trip.Status.choices, distinct=False)
+    driver = filters.NumberFilter(field_name="driver")
+    vehicle = filters.NumberFilter(field_name="vehicle")
+    patient = filters.NumberFilter(field_name="patient")
+    company = filters.NumberFilter(field_name="patient__company")
+    invoice = filters.NumberFilter(field_name="invoice_id")
+    start = filters.DateTimeFilter(field_name="created_at", lookup_expr="gte")
+    end = filters.DateTimeFilter(field_name="created_at", lookup_expr="lt")
+
+    class Meta:
+        model = ArchivedTrip
+        fields = ["status", "driver", "vehicle", "patient", "company", "invoice", "start", "end"]
@@ -0,0 +1,155 @@
+"""
+Trip lifecycle: the allowed status transitions, applied with compare-and-swap.
+
+A transition names the status to move to and the ``Trip.version`` the caller
+last saw. It reads the trip's current status and version, then applies one
+conditional UPDATE that only matches while the version is unchanged, bumping
+it. No row is locked before the write, so drivers and dispatchers updating
+the same trip at peak never queue behind each other's ``SELECT FOR UPDATE``;
+whoever loses the race gets ``StaleTrip`` with the current state and can
+retry from there.
+
+Each transition writes one status event to the outbox (trips.outbox) in the
+same transaction; the relay broadcasts it and queues the downstream work
+(completion processing, driver notification). The conditional UPDATE sends
+no model signals, so transitions record their own audit event (audit.log).
+
+Assigning rejects a driver or paramedic already on another active trip.
+Assigning a vehicle marks it ``in_trip`` (it must be ``available``);
+completing, cancelling or unassigning the trip marks it ``available`` again.
+Once the transaction commits the availability registry (trips.availability)
+takes the crew and vehicle out or puts them back.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from audit.log import record_on_commit
+from audit.models import AuditEvent
+from users.models import User
+from vehicles.models import Vehicle
+
+from . import availability, outbox
+from .models import Trip
+
+Status = Trip.Status
+
+TRANSITIONS = {
+    Status.PENDING: (Status.ASSIGNED, Status.CANCELLED),
+    # Back to pending unassigns the crew and vehicle
+    Status.ASSIGNED: (Status.EN_ROUTE, Status.PENDING, Status.CANCELLED),
+    Status.EN_ROUTE: (Status.AT_PICKUP, Status.CANCELLED),
+    Status.AT_PICKUP: (Status.IN_TRANSIT, Status.CANCELLED),
+    Status.IN_TRANSIT: (Status.ARRIVED,),
+    Status.ARRIVED: (Status.COMPLETED,),
+    Status.COMPLETED: (),
+    Status.CANCELLED: (),
+}
+
+# The trip's crew and vehicle as read before a transition, for the availability registry
+CREW_COLUMNS = ("driver_id", "driver__role", "paramedic_id", "paramedic__role", "vehicle_id", "vehicle__type")
+
+# Crew and vehicle can be set together with these statuses; assigning requires a driver
+TRANSITION_FIELDS = {
+    Status.ASSIGNED: ("driver", "paramedic", "vehicle"),
+}
+
+
+class TransitionError(Exception):
+    """The requested transition is not allowed from the trip's current status."""
+
+
+class StaleTrip(TransitionError):
+    """The trip changed since the caller read it."""
+
+    def __init__(self, status, version):
+        super().__init__(f"Trip is at version {version} ({status}); reload it and retry.")
+        self.status = status
+        self.version = version
+
+
+def allowed_transitions(status):
+    return TRANSITIONS.get(status, ())
+
+
+def take(trip_id, fields, now):
+    """
+    Take the crew and vehicle that ``fields`` assign to trip ``trip_id``.
+
+    Raises ``TransitionError`` when one of them is on another active trip.
+    Locking the crew rows makes a concurrent assignment of the same member
+    wait for this transaction and then see the trip it assigned.
+    """
+    crew = [getattr(fields.get(field), "pk", fields.get(field)) for field in ("driver", "paramedic")]
+    crew = sorted({member_id for member_id in crew if member_id})
+    if crew:
+        list(User.objects.select_for_update().filter(pk__in=crew).order_by("pk").values_list("pk"))
+        if availability.on_active_trips(crew, exclude_trip=trip_id):
+            raise TransitionError("The driver or paramedic is already on an active trip.")
+
+    vehicle = fields.get("vehicle")
+    vehicle_id = getattr(vehicle, "pk", vehicle)
+    if vehicle_id and not Vehicle.objects.filter(pk=vehicle_id, status=Vehicle.Status.AVAILABLE).update(
+        status=Vehicle.Status.IN_TRIP, updated_at=now
+    ):
+        raise TransitionError("The vehicle is not available.")
+
+
+def transition(trip_id, status, version=None, message=None, **fields):
+    """
+    Move trip ``trip_id`` to ``status`` if it is still at ``version``.
+
+    ``version`` defaults to the version read here, which still protects the
+    update against concurrent transitions between read and write. ``fields``
+    may set the crew and vehicle where TRANSITION_FIELDS allows. Returns the
+    new version; raises ``StaleTrip``, ``TransitionError`` or
+    ``Trip.DoesNotExist``.
+    """
+    unexpected = set(fields) - set(TRANSITION_FIELDS.get(status, ()))
+    if unexpected:
+        raise TransitionError(f"{', '.join(sorted(unexpected))} cannot be set when moving to {status}.")
+    if status == Status.ASSIGNED and not fields.get("driver"):
+        raise TransitionError("A driver is required to assign a trip.")
+    if status == Status.PENDING:
+        fields.update(driver=None, paramedic=None, vehicle=None)
+
+    with transaction.atomic():
+        current = Trip.objects.values("status", "version", *CREW_COLUMNS).get(pk=trip_id)
+        expected = current["version"] if version is None else version
+        if current["version"] != expected:
+            raise StaleTrip(current["status"], current["version"])
+        if status not in allowed_transitions(current["status"]):
+            raise TransitionError(f"Cannot move a trip from {current['status']} to {status}.")
+
+        now = timezone.now()
+        updated = Trip.objects.filter(pk=trip_id, version=expected).update(
+            status=status, version=F("version") + 1, updated_at=now, **fields
+        )
+        if not updated:
+            current = Trip.objects.values("status", "version").get(pk=trip_id)
+            raise StaleTrip(current["status"], current["version"])
+
+        take(trip_id, fields, now)
+        vehicle_released = False
+        if status in availability.RELEASING_STATUSES and current["vehicle_id"]:
+            released = Vehicle.objects.filter(pk=current["vehicle_id"], status=Vehicle.Status.IN_TRIP)
+            vehicle_released = bool(released.update(status=Vehicle.Status.AVAILABLE, updated_at=now))
+        changes = availability.trip_changes(status, current, fields, vehicle_released)
+        transaction.on_commit(lambda: availability.apply(changes))
+
+        driver = fields.get("driver")
+        outbox.record(
+            [
+                outbox.status_event(
+                    trip_id,
+                    status,
+                    current["status"],
+                    version=expected + 1,
+                    driver_id=getattr(driver, "pk", driver),
+                    message=message,
+                )
+            ]
+        )
+        record_on_commit(AuditEvent.Action.UPDATE, "trip", trip_id, sorted(["status", "version", *fields]))
+    return expected + 1
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from trips.archive import archivable_trips, archive_cutoff, archive_trips
+
+
+class Command(BaseCommand):
+    help = "Moves old completed and cancelled trips to the archive tables in throttled batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Trips per batch (default TRIP_ARCHIVE_BATCH_SIZE)")
+        parser.add_argument("--pause", type=float, help="Seconds between batches (default TRIP_ARCHIVE_BATCH_PAUSE)")
+        parser.add_argument("--max-batches", type=int, help="Stop after this many batches")
+        parser.add_argument("--dry-run", action="store_true", help="Only count the trips that would be archived")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            count = archivable_trips(archive_cutoff()).count()
+            self.stdout.write(f"{count} trips would be archived")
+            return
+
+        archived = archive_trips(batch_size=options["batch_size"], pause=options["pause"], max_batches=options["max_batches"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} trips"))
@@ -0,0 +1,107 @@
+import asyncio
+import statistics
+import threading
+import time
+import uuid
+
+import httpx
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+
+from trips.models import Trip
+from users.models import Company, User
+from vehicles.models import Vehicle
+
+ENDPOINTS = ["/api/v1/trips/", "/api/v1/vehicles/", "/api/v1/auth/profile/"]
+
+
+class Command(BaseCommand):
+    help = "Drives one in-process ASGI worker at rising concurrency with async reads off and on"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+        parser.add_argument("--requests", type=int, default=1000, help="Requests per concurrency level")
+        parser.add_argument("--trips", type=int, default=50, help="Trips returned by each list request")
+
+    def handle(self, *args, **options):
+        # The worker's threads need committed rows, so the data is created and removed explicitly
+        marker = uuid.uuid4().hex[:8]
+        token = self.create_data(marker, options["trips"])
+        try:
+            app = get_asgi_application()
+            results = {}
+            for mode, enabled in (("sync views", False), ("async reads", True)):
+                with override_settings(ASYNC_READ_VIEWS=enabled):
+                    results[mode] = [
+                        asyncio.run(self.run_level(app, token.key, level, options["requests"]))
+                        for level in options["concurrency"]
+                    ]
+        finally:
+            self.delete_data(marker)
+
+        self.stdout.write("=" * 72)
+        self.stdout.write(
+            f"{'mode':<12} {'concurrency':>11} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'threads':>8} {'errors':>7}"
+        )
+        for mode, levels in results.items():
+            for level in levels:
+                self.stdout.write(
+                    f"{mode:<12} {level['concurrency']:>11} {level['throughput']:>9,.0f} {level['p50']:>8.1f} "
+                    f"{level['p95']:>8.1f} {level['threads']:>8} {level['errors']:>7}"
+                )
+        self.stdout.write("=" * 72)
+
+    async def run_level(self, app, key, concurrency, total):
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Token {key}", "Accept": "application/json"}
+        latencies = []
+        errors = 0
+        peak_threads = threading.active_count()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://localhost", headers=headers) as client:
+
+            async def request(i):
+                nonlocal errors, peak_threads
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(ENDPOINTS[i % len(ENDPOINTS)])
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    errors += response.status_code != 200
+                    peak_threads = max(peak_threads, threading.active_count())
+
+            await asyncio.gather(*(request(i) for i in range(concurrency)))  # warm up
+            latencies.clear()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(request(i) for i in range(total)))
+            elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            "concurrency": concurrency,
+            "throughput": total / elapsed,
+            "p50": statistics.median(latencies),
+            "p95": latencies[int(len(latencies) * 0.95) - 1],
+            "threads": peak_threads,
+            "errors": errors,
+        }
+
+    def create_data(self, marker, trips):
+        user = User.objects.create_user(username=f"bench-{marker}", password=uuid.uuid4().hex)
+        company = Company.objects.create(company_name=f"bench-{marker}", company_type=Company.Type.VENDOR)
+        Vehicle.objects.bulk_create(
+            Vehicle(plate_number=f"B{marker}{i}", type=Vehicle.Type.BASIC, vendor_company=company) for i in range(20)
+        )
+        Trip.objects.bulk_create(
+            Trip(start_location=f"bench-{marker}", end_location="Hospital", start_odometer=100.0, end_odometer=112.5)
+            for _ in range(trips)
+        )
+        return Token.objects.create(user=user)
+
+    def delete_data(self, marker):
+        Trip.objects.filter(start_location=f"bench-{marker}").delete()
+        Company.objects.filter(company_name=f"bench-{marker}").delete()
+        User.objects.filter(username=f"bench-{marker}").delete()
@@ -0,0 +1,105 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from billing.models import Invoice
+from billing.serializers import InvoiceSerializer
+from config.renderers import ORJSONRenderer
+from trips.models import Trip
+from trips.serializers import TripSerializer
+
+
+class Command(BaseCommand):
+    help = "Benchmarks DRF's JSONRenderer against ORJSONRenderer on real payload shapes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Rows per list payload")
+        parser.add_argument("--repeat", type=int, default=5, help="Best-of-N timing runs per renderer")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"{'Payload':<28}{'stdlib':>10}{'orjson':>10}{'speedup':>10}")
+        for name, payload in self.build_payloads(rows).items():
+            stdlib_time = self.best_of(repeat, JSONRenderer().render, payload)
+            orjson_time = self.best_of(repeat, ORJSONRenderer().render, payload)
+            self.stdout.write(
+                f"{name:<28}{stdlib_time * 1000:>8.1f}ms{orjson_time * 1000:>8.1f}ms{stdlib_time / orjson_time:>9.1f}x"
+            )
+        self.stdout.write("=" * 60)
+
+    def build_payloads(self, rows):
+        """Unsaved model instances in the shapes our endpoints and consumers return."""
+        now = timezone.now()
+        trips = [
+            Trip(
+                id=i,
+                patient_id=i,
+                driver_id=i % 50,
+                vehicle_id=i % 20,
+                start_location=f"Pickup {i}",
+                end_location=f"Dropoff {i}",
+                status=Trip.Status.COMPLETED,
+                start_time=now - timedelta(hours=1),
+                end_time=now,
+                start_odometer=15100.0 + i,
+                end_odometer=15125.5 + i,
+                request_source=Trip.Source.APP,
+                created_at=now,
+                updated_at=now,
+            )
+            for i in range(rows)
+        ]
+        invoices = [
+            Invoice(
+                id=i,
+                trip_id=i,
+                company_id=i % 10,
+                amount=Decimal("755.00") + i,
+                tax=Decimal("105.70"),
+                status=Invoice.Status.PENDING,
+                created_at=now,
+                due_date=now + timedelta(days=30),
+            )
+            for i in range(rows)
+        ]
+        return {
+            "trip list": TripSerializer(trips, many=True).data,
+            "invoice list": InvoiceSerializer(invoices, many=True).data,
+            "invoice rows (Decimal/dt)": [
+                {
+                    "id": invoice.id,
+                    "amount": invoice.amount,
+                    "tax": invoice.tax,
+                    "created_at": invoice.created_at,
+                    "due_date": invoice.due_date,
+                }
+                for invoice in invoices
+            ],
+            "gps updates": [
+                {
+                    "type": "gps_update",
+                    "trip_id": i,
+                    "latitude": 30.0444 + i / 1e6,
+                    "longitude": 31.2357 - i / 1e6,
+                    "speed": 42.5,
+                    "heading": 180,
+                    "timestamp": now.isoformat(),
+                }
+                for i in range(rows)
+            ],
+        }
+
+    def best_of(self, repeat, func, payload):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(payload)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
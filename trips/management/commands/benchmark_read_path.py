@@ -0,0 +1,68 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from trips.models import Trip
+from trips.serializers import TripSerializer
+from trips.views import TripViewSet
+
+
+class Command(BaseCommand):
+    help = "Benchmarks TripSerializer against the compiled fast read path (rows/sec)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20000, help="Number of synthetic trips to serialize")
+        parser.add_argument("--repeat", type=int, default=3, help="Best-of-N timing runs per path")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        repeat = options["repeat"]
+
+        # Synthetic rows are rolled back so the benchmark never leaves data behind
+        with transaction.atomic():
+            self.create_trips(rows)
+            queryset = Trip.objects.all()
+
+            compiled = TripViewSet().get_fast_representation()
+            serializer_time = self.best_of(repeat, lambda: TripSerializer(queryset.all(), many=True).data)
+            fast_time = self.best_of(repeat, lambda: list(compiled.rows(queryset.all())))
+
+            transaction.set_rollback(True)
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"Rows: {rows}")
+        self.stdout.write(f"TripSerializer: {rows / serializer_time:,.0f} rows/sec ({serializer_time:.3f}s)")
+        self.stdout.write(f"Fast read path: {rows / fast_time:,.0f} rows/sec ({fast_time:.3f}s)")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {serializer_time / fast_time:.1f}x"))
+        self.stdout.write("=" * 60)
+
+    def create_trips(self, rows):
+        now = timezone.now()
+        statuses = [choice for choice, _ in Trip.Status.choices]
+        Trip.objects.bulk_create(
+            [
+                Trip(
+                    start_location=f"Pickup {i}",
+                    end_location=f"Dropoff {i}",
+                    status=statuses[i % len(statuses)],
+                    start_time=now - timedelta(minutes=i),
+                    end_time=now,
+                    start_odometer=10000.0 + i,
+                    end_odometer=10025.5 + i,
+                    request_source=Trip.Source.APP,
+                )
+                for i in range(rows)
+            ],
+            batch_size=1000,
+        )
+
+    def best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0003_export_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["status", "created_at"], name="trip_status_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["driver", "created_at"], name="trip_driver_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["vehicle", "created_at"], name="trip_vehicle_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(
+                condition=models.Q(("status__in", ("assigned", "en_route", "at_pickup", "in_transit", "arrived"))),
+                fields=["created_at"],
+                name="trip_active_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0004_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["updated_at"], name="trip_updated_idx"),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0005_rollup_watermark_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GPSTrackingHistory",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("latitude", models.FloatField()),
+                ("longitude", models.FloatField()),
+                ("speed", models.FloatField(blank=True, null=True)),
+                ("heading", models.FloatField(blank=True, null=True)),
+                ("recorded_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "trip",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="gps_history",
+                        to="trips.trip",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "GPS tracking history",
+                "indexes": [models.Index(fields=["trip", "recorded_at"], name="gps_trip_recorded_idx")],
+            },
+        ),
+    ]
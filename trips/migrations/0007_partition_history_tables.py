@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from trips.partitions import partition_table
+
+
+def partition_history_tables(apps, schema_editor):
+    # Postgres only: other databases keep plain tables (see trips.partitions).
+    # Existing chat messages are copied into the new monthly partitions.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    partition_table(schema_editor, apps.get_model("trips", "ChatMessage"), "timestamp")
+    partition_table(schema_editor, apps.get_model("trips", "GPSTrackingHistory"), "recorded_at")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0006_gpstrackinghistory"),
+    ]
+
+    operations = [
+        # Reversing leaves the tables partitioned, which the earlier model state reads and writes unchanged
+        migrations.RunPython(partition_history_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,153 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("patients", "0003_patient_search_index"),
+        ("vehicles", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("trips", "0007_partition_history_tables"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedTrip",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("start_location", models.CharField(max_length=255)),
+                ("end_location", models.CharField(max_length=255)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("assigned", "Assigned"),
+                            ("en_route", "En Route"),
+                            ("at_pickup", "At Pickup"),
+                            ("in_transit", "In Transit"),
+                            ("arrived", "Arrived"),
+                            ("completed", "Completed"),
+                            ("cancelled", "Cancelled"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("start_time", models.DateTimeField(blank=True, null=True)),
+                ("end_time", models.DateTimeField(blank=True, null=True)),
+                ("start_odometer", models.FloatField(blank=True, null=True)),
+                ("end_odometer", models.FloatField(blank=True, null=True)),
+                (
+                    "request_source",
+                    models.CharField(
+                        blank=True,
+                        choices=[("phone", "Phone"), ("online", "Online"), ("app", "App"), ("contract", "Contract")],
+                        max_length=20,
+                        null=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                ("invoice_id", models.BigIntegerField(blank=True, null=True)),
+                ("ems_medical_data", models.TextField(blank=True, null=True)),
+                ("ems_timestamp", models.DateTimeField(blank=True, null=True)),
+                (
+                    "driver",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "paramedic",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="patients.patient",
+                    ),
+                ),
+                (
+                    "vehicle",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="vehicles.vehicle",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArchivedChatMessage",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("message_content", models.TextField()),
+                (
+                    "message_type",
+                    models.CharField(choices=[("text", "Text"), ("image", "Image"), ("system", "System")], max_length=10),
+                ),
+                ("timestamp", models.DateTimeField()),
+                (
+                    "receiver",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "sender",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "trip",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="chat_messages", to="trips.archivedtrip"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="archivedtrip",
+            index=models.Index(fields=["created_at"], name="archtrip_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="archivedtrip",
+            index=models.Index(fields=["driver", "created_at"], name="archtrip_driver_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="archivedtrip",
+            index=models.Index(fields=["invoice_id"], name="archtrip_invoice_idx"),
+        ),
+    ]
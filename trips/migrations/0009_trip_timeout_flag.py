@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0008_archived_trips"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="timeout_flagged_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(
+                condition=models.Q(
+                    ("status__in", ("assigned", "en_route", "at_pickup", "in_transit", "arrived")),
+                    ("timeout_flagged_at__isnull", True),
+                ),
+                fields=["start_time"],
+                name="trip_timeout_sweep_idx",
+            ),
+        ),
+    ]
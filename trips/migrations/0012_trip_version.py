@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("trips", "0011_tripevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="tripevent",
+            name="kind",
+            field=models.CharField(choices=[("status", "Status changed"), ("assigned", "Driver assigned")], max_length=20),
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+# Statuses of a dispatched trip that is still in progress
+ACTIVE_TRIP_STATUSES = ("assigned", "en_route", "at_pickup", "in_transit", "arrived")
+
 
 class Trip(models.Model):
     class Status(models.TextChoices):
@@ -20,6 +24,8 @@ class Trip(models.Model):
         APP = "app", _("App")
         CONTRACT = "contract", _("Contract")
 
+    ACTIVE_STATUSES = ACTIVE_TRIP_STATUSES
+
     patient = models.ForeignKey("patients.Patient", on_delete=models.CASCADE, related_name="trips", blank=True, null=True)
     vehicle = models.ForeignKey("vehicles.Vehicle", on_delete=models.SET_NULL, related_name="trips", blank=True, null=True)
 
@@ -44,6 +50,8 @@ class Trip(models.Model):
     start_location = models.CharField(max_length=255)
     end_location = models.CharField(max_length=255)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    # Bumped by every lifecycle transition (trips.lifecycle); transitions compare and swap on it
+    version = models.PositiveIntegerField(default=0)
 
     start_time = models.DateTimeField(blank=True, null=True)
     end_time = models.DateTimeField(blank=True, null=True)
@@ -53,9 +61,35 @@ class Trip(models.Model):
 
     request_source = models.CharField(max_length=20, choices=Source.choices, blank=True, null=True)
 
+    # Set by the check_trip_timeouts sweep when the trip runs past MAX_TRIP_DURATION
+    timeout_flagged_at = models.DateTimeField(blank=True, null=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], name="trip_created_idx"),
+            models.Index(fields=["status", "created_at"], name="trip_status_created_idx"),
+            models.Index(fields=["driver", "created_at"], name="trip_driver_created_idx"),
+            models.Index(fields=["vehicle", "created_at"], name="trip_vehicle_created_idx"),
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(status__in=ACTIVE_TRIP_STATUSES),
+                name="trip_active_created_idx",
+            ),
+            # Watermark scans for the operational rollups (reports.rollups)
+            models.Index(fields=["updated_at"], name="trip_updated_idx"),
+            # Daily crew digest (users.digest)
+            models.Index(fields=["start_time"], name="trip_start_time_idx"),
+            # Timeout sweep (trips.tasks.check_trip_timeouts); flagged trips leave the index
+            models.Index(
+                fields=["start_time"],
+                condition=models.Q(status__in=ACTIVE_TRIP_STATUSES, timeout_flagged_at__isnull=True),
+                name="trip_timeout_sweep_idx",
+            ),
+        ]
+
     @property
     def total_distance(self):
         if self.end_odometer is not None and self.start_odometer is not None:
@@ -66,7 +100,36 @@ class Trip(models.Model):
         return f"Trip {self.id} - {self.status}"
 
 
+class TripEvent(models.Model):
+    """
+    Outbox row for a trip change, written in the transaction that made it.
+
+    Drained in id order by trips.outbox.relay, which publishes the events and
+    deletes them. ``trip_id`` is not a foreign key so archiving a trip never
+    waits on, or drops, its unpublished events.
+    """
+
+    class Kind(models.TextChoices):
+        STATUS = "status", _("Status changed")
+        ASSIGNED = "assigned", _("Driver assigned")
+
+    trip_id = models.BigIntegerField()
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    payload = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.kind} event for trip {self.trip_id}"
+
+
 class ChatMessage(models.Model):
+    """
+    A message exchanged during a trip.
+
+    On Postgres the table is range partitioned by month on ``timestamp`` (see
+    trips.partitions); bound ``timestamp`` in queries so partitions are pruned.
+    """
+
     class Type(models.TextChoices):
         TEXT = "text", _("Text")
         IMAGE = "image", _("Image")
@@ -80,5 +143,114 @@ class ChatMessage(models.Model):
     message_type = models.CharField(max_length=10, choices=Type.choices, default=Type.TEXT)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["timestamp"], name="chatmsg_timestamp_idx"),
+        ]
+
     def __str__(self):
         return f"Msg {self.id} from {self.sender}"
+
+
+class GPSTrackingHistory(models.Model):
+    """
+    One GPS fix reported by a vehicle during a trip.
+
+    Append-only. On Postgres the table is range partitioned by month on
+    ``recorded_at`` (see trips.partitions); bound ``recorded_at`` in queries
+    so partitions are pruned.
+    """
+
+    # Covered by gps_trip_recorded_idx
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name="gps_history", db_index=False)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    speed = models.FloatField(blank=True, null=True)
+    heading = models.FloatField(blank=True, null=True)
+    recorded_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "GPS tracking history"
+        indexes = [
+            models.Index(fields=["trip", "recorded_at"], name="gps_trip_recorded_idx"),
+        ]
+
+    def __str__(self):
+        return f"GPS {self.latitude}, {self.longitude} for trip {self.trip_id}"
+
+
+class ArchivedTrip(models.Model):
+    """
+    A completed or cancelled trip moved out of ``Trip`` by trips.archive.
+
+    Keeps the original id and columns. The EMS report is folded in, the
+    invoice stays in billing and is referenced by ``invoice_id``. Related
+    users, patients and vehicles are not constrained, so archived rows never
+    block deletes in the hot tables.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    patient = models.ForeignKey(
+        "patients.Patient", on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", blank=True, null=True
+    )
+    vehicle = models.ForeignKey(
+        "vehicles.Vehicle", on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", blank=True, null=True
+    )
+    driver = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", blank=True, null=True
+    )
+    paramedic = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", blank=True, null=True
+    )
+
+    start_location = models.CharField(max_length=255)
+    end_location = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=Trip.Status.choices)
+
+    start_time = models.DateTimeField(blank=True, null=True)
+    end_time = models.DateTimeField(blank=True, null=True)
+
+    start_odometer = models.FloatField(blank=True, null=True)
+    end_odometer = models.FloatField(blank=True, null=True)
+
+    request_source = models.CharField(max_length=20, choices=Trip.Source.choices, blank=True, null=True)
+
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    invoice_id = models.BigIntegerField(blank=True, null=True)
+    ems_medical_data = models.TextField(blank=True, null=True)
+    ems_timestamp = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], name="archtrip_created_idx"),
+            models.Index(fields=["driver", "created_at"], name="archtrip_driver_created_idx"),
+            models.Index(fields=["invoice_id"], name="archtrip_invoice_idx"),
+        ]
+
+    @property
+    def total_distance(self):
+        if self.end_odometer is not None and self.start_odometer is not None:
+            return self.end_odometer - self.start_odometer
+        return None
+
+    def __str__(self):
+        return f"Archived trip {self.id} - {self.status}"
+
+
+class ArchivedChatMessage(models.Model):
+    """A chat message of an archived trip, with its original id."""
+
+    id = models.BigIntegerField(primary_key=True)
+    trip = models.ForeignKey(ArchivedTrip, on_delete=models.CASCADE, related_name="chat_messages")
+    sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    receiver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+
+    message_content = models.TextField()
+    message_type = models.CharField(max_length=10, choices=ChatMessage.Type.choices)
+    timestamp = models.DateTimeField()
+
+    def __str__(self):
+        return f"Archived msg {self.id} from {self.sender_id}"
@@ -0,0 +1,171 @@
+"""
+Transactional outbox for trip events.
+
+Code that changes a trip writes ``TripEvent`` rows inside the same
+transaction (``record`` / ``record_changes``; lifecycle transitions in
+trips.lifecycle write one status event each): the events exist exactly when
+the change commits, and nothing is published for a change that rolls back.
+
+``relay`` drains the outbox oldest first, ``TRIP_EVENT_RELAY_BATCH_SIZE``
+events per transaction:
+
+- status events go to the trip's ``trip_status_{id}`` channel group, all
+  sends of a batch on one event loop;
+- transitions to ``completed`` queue ``process_trip_completion`` and driver
+  assignments ``send_trip_assignment_notification``, all publishes of a
+  batch over one broker connection.
+
+Published events are deleted in the transaction that locked them. A relay
+that fails mid-batch rolls back and the whole batch is published again, so
+delivery is at least once; the tasks are idempotent (config.idempotency) and
+a repeated status broadcast is harmless. Relays take the oldest rows with
+plain row locks, so a second relay waits for the first instead of
+overtaking it, and each trip's events are delivered in the order they were
+written.
+
+The ``relay_trip_events`` task runs from beat as a fallback; after each
+commit that wrote events a relay run is also kicked, at most once per
+``KICK_INTERVAL`` seconds however many trips change.
+"""
+
+import asyncio
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Trip, TripEvent
+
+logger = logging.getLogger(__name__)
+
+KICK_KEY = "trips:outbox:kick"
+KICK_INTERVAL = 1
+
+
+def status_event(trip_id, status, previous_status, **payload):
+    """Build the event for a trip moving from ``previous_status`` to ``status``."""
+    return TripEvent(
+        trip_id=trip_id,
+        kind=TripEvent.Kind.STATUS,
+        payload={"status": status, "previous_status": previous_status, **payload},
+    )
+
+
+def record(events):
+    """Write ``events`` in the current transaction and kick the relay once it commits."""
+    if events:
+        TripEvent.objects.bulk_create(events)
+        transaction.on_commit(kick)
+    return events
+
+
+def record_changes(trip, previous_status=None, previous_driver_id=None):
+    """
+    Write the outbox event for ``trip`` given its status and driver before the change.
+
+    Pass ``None`` for both when the trip was just created. A status change is
+    one event, carrying the driver; a driver change alone is an assignment
+    event. Must run in the transaction that saved the trip; returns the
+    events written.
+    """
+    events = []
+    if trip.status != previous_status:
+        events.append(status_event(trip.pk, trip.status, previous_status, version=trip.version, driver_id=trip.driver_id))
+    elif trip.driver_id and trip.driver_id != previous_driver_id:
+        events.append(TripEvent(trip_id=trip.pk, kind=TripEvent.Kind.ASSIGNED, payload={"driver_id": trip.driver_id}))
+    return record(events)
+
+
+def kick():
+    """Queue a relay run unless one was queued within the last ``KICK_INTERVAL`` seconds."""
+    from trips.tasks import relay_trip_events
+
+    try:
+        if cache.add(KICK_KEY, 1, KICK_INTERVAL):
+            relay_trip_events.delay()
+    except Exception:
+        # The beat schedule relays the events anyway
+        logger.warning("Could not kick the trip event relay", exc_info=True)
+
+
+def broadcast(events):
+    """Send the status events to their channel groups, in order per trip, on one event loop."""
+    by_trip = {}
+    for event in events:
+        by_trip.setdefault(event.trip_id, []).append(event)
+    if not by_trip:
+        return
+
+    channel_layer = get_channel_layer()
+
+    async def send_trip(trip_id, trip_events):
+        for event in trip_events:
+            await channel_layer.group_send(
+                f"trip_status_{trip_id}",
+                {
+                    "type": "trip_status_change",
+                    "status": event.payload["status"],
+                    "version": event.payload.get("version"),
+                    "timestamp": event.created_at.isoformat(),
+                    "message": event.payload.get("message"),
+                },
+            )
+
+    async def send_all():
+        await asyncio.gather(*(send_trip(trip_id, trip_events) for trip_id, trip_events in by_trip.items()))
+
+    async_to_sync(send_all)()
+
+
+def enqueue(events):
+    """Queue the tasks for completions and driver assignments over one broker connection."""
+    from config.celery import app
+    from trips.tasks import process_trip_completion
+    from users.tasks import send_trip_assignment_notification
+
+    calls = []
+    for event in events:
+        status = event.payload.get("status") if event.kind == TripEvent.Kind.STATUS else None
+        driver_id = event.payload.get("driver_id")
+        if status == Trip.Status.COMPLETED:
+            calls.append((process_trip_completion, (event.trip_id,)))
+        elif driver_id and (event.kind == TripEvent.Kind.ASSIGNED or status == Trip.Status.ASSIGNED):
+            calls.append((send_trip_assignment_notification, (event.trip_id, driver_id, event.pk)))
+    if not calls:
+        return
+
+    with app.producer_or_acquire() as producer:
+        for task, args in calls:
+            task.apply_async(args, producer=producer)
+
+
+def publish(events):
+    broadcast([event for event in events if event.kind == TripEvent.Kind.STATUS])
+    enqueue(events)
+
+
+def relay_batch(batch_size=None):
+    """Publish and delete the oldest ``batch_size`` events; returns how many were relayed."""
+    batch_size = batch_size or getattr(settings, "TRIP_EVENT_RELAY_BATCH_SIZE", 500)
+    with transaction.atomic():
+        events = list(TripEvent.objects.order_by("pk").select_for_update()[:batch_size])
+        if not events:
+            return 0
+        publish(events)
+        TripEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+    return len(events)
+
+
+def relay(batch_size=None, time_budget=None):
+    """Relay batches until the outbox is empty or ``time_budget`` seconds pass; returns the events relayed."""
+    deadline = time.monotonic() + time_budget if time_budget else None
+    relayed = 0
+    while True:
+        count = relay_batch(batch_size)
+        relayed += count
+        if not count or (deadline and time.monotonic() >= deadline):
+            return relayed
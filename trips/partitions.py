@@ -0,0 +1,237 @@
+"""
+Monthly range partitioning for append-only trip history and the audit trail.
+
+On Postgres ``ChatMessage`` (by ``timestamp``), ``GPSTrackingHistory``
+(by ``recorded_at``) and ``audit.AuditEvent`` (by ``occurred_at``) are
+declaratively partitioned by month. Each table has
+one partition per month named ``<table>_pYYYYMM``, plus a ``<table>_default``
+partition that only catches rows outside the prepared months. The primary key
+is ``(id, <partition column>)``, as Postgres requires; ids still come from a
+single sequence, so Django keeps treating ``id`` as unique.
+
+``maintain_partitions`` (Celery beat, see trips.tasks) creates partitions
+``PARTITION_MONTHS_AHEAD`` months ahead and detaches and drops partitions
+that are entirely past retention, so retention is a metadata operation and
+index sizes stay bounded by the retention window. Queries should bound the
+partition column so the planner prunes partitions.
+
+Other databases keep plain tables; expired rows are deleted instead.
+"""
+
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+# Partitions created ahead of the current month
+PARTITION_MONTHS_AHEAD = 3
+
+PARTITIONS_SQL = (
+    "SELECT child.relname FROM pg_inherits "
+    "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+    "WHERE parent.relname = %s"
+)
+
+
+class PartitionedTable:
+    """A model table partitioned by month on ``column``, kept for ``retention_setting`` days (0 keeps everything)."""
+
+    def __init__(self, model, column, retention_setting, default_retention_days):
+        self.model = model
+        self.column = column
+        self.retention_setting = retention_setting
+        self.default_retention_days = default_retention_days
+
+    @property
+    def table(self):
+        return self.model._meta.db_table
+
+    @property
+    def default_partition(self):
+        return f"{self.table}_default"
+
+    @property
+    def retention(self):
+        days = getattr(settings, self.retention_setting, self.default_retention_days)
+        return timedelta(days=days) if days else None
+
+    def partition_name(self, month):
+        return f"{self.table}_p{month:%Y%m}"
+
+
+def get_tables():
+    from audit.models import AuditEvent
+    from trips.models import ChatMessage, GPSTrackingHistory
+
+    return [
+        PartitionedTable(ChatMessage, "timestamp", "CHAT_MESSAGE_RETENTION_DAYS", 365),
+        PartitionedTable(GPSTrackingHistory, "recorded_at", "GPS_HISTORY_RETENTION_DAYS", 30),
+        PartitionedTable(AuditEvent, "occurred_at", "AUDIT_RETENTION_DAYS", 6 * 365),
+    ]
+
+
+def month_start(value):
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def month_range(first, last):
+    month = first
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def existing_partitions(cursor, spec):
+    """Return ``{month: partition name}`` for the monthly partitions of ``spec``."""
+    cursor.execute(PARTITIONS_SQL, [spec.table])
+    prefix = f"{spec.table}_p"
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        if name.startswith(prefix):
+            month = datetime.strptime(name[len(prefix) :], "%Y%m").replace(tzinfo=dt_timezone.utc)
+            partitions[month] = name
+    return partitions
+
+
+def create_partition(cursor, spec, month):
+    """
+    Create the partition for ``month``.
+
+    Rows of that month already sitting in the default partition are moved
+    into it first, since Postgres refuses to attach over them.
+    """
+    qn = connection.ops.quote_name
+    table, name, column, default = qn(spec.table), qn(spec.partition_name(month)), qn(spec.column), qn(spec.default_partition)
+    bounds = [month, add_months(month, 1)]
+
+    cursor.execute(f"SELECT 1 FROM {default} WHERE {column} >= %s AND {column} < %s LIMIT 1", bounds)
+    if cursor.fetchone() is None:
+        cursor.execute(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", bounds)
+        return
+
+    cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {default} WHERE {column} >= %s AND {column} < %s RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        bounds,
+    )
+    cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", bounds)
+
+
+def ensure_partitions(spec, now=None, months_ahead=PARTITION_MONTHS_AHEAD):
+    """
+    Create missing monthly partitions up to ``months_ahead`` months after ``now``.
+
+    Also covers older months that have rows stranded in the default partition.
+    Returns the names of the partitions created.
+    """
+    now = now or timezone.now()
+    qn = connection.ops.quote_name
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({qn(spec.column)}) FROM {qn(spec.default_partition)}")
+        oldest = cursor.fetchone()[0]
+        first = month_start(min(oldest, now) if oldest else now)
+        existing = existing_partitions(cursor, spec)
+        for month in month_range(first, add_months(month_start(now), months_ahead)):
+            if month not in existing:
+                create_partition(cursor, spec, month)
+                created.append(spec.partition_name(month))
+    return created
+
+
+def drop_expired_partitions(spec, now=None):
+    """
+    Detach and drop partitions whose whole month is older than the retention period.
+
+    Expired rows left in the default partition are deleted. Returns the names
+    of the partitions dropped.
+    """
+    if spec.retention is None:
+        return []
+    cutoff = (now or timezone.now()) - spec.retention
+    qn = connection.ops.quote_name
+    dropped = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for month, name in sorted(existing_partitions(cursor, spec).items()):
+            if add_months(month, 1) > cutoff:
+                break
+            cursor.execute(f"ALTER TABLE {qn(spec.table)} DETACH PARTITION {qn(name)}")
+            cursor.execute(f"DROP TABLE {qn(name)}")
+            dropped.append(name)
+        cursor.execute(f"DELETE FROM {qn(spec.default_partition)} WHERE {qn(spec.column)} < %s", [cutoff])
+    return dropped
+
+
+def maintain_partitions(now=None):
+    """
+    Create upcoming partitions and drop expired ones for every partitioned table.
+
+    Returns ``{table: {"created": [...], "dropped": [...]}}``; on databases
+    without partitioning, ``{table: {"deleted": count}}``.
+    """
+    now = now or timezone.now()
+    results = {}
+    for spec in get_tables():
+        if connection.vendor != "postgresql":
+            deleted = 0
+            if spec.retention is not None:
+                deleted, _ = spec.model.objects.filter(**{f"{spec.column}__lt": now - spec.retention}).delete()
+            results[spec.table] = {"deleted": deleted}
+            continue
+        results[spec.table] = {"created": ensure_partitions(spec, now), "dropped": drop_expired_partitions(spec, now)}
+    return results
+
+
+def partition_table(schema_editor, model, column, now=None):
+    """
+    Convert ``model``'s plain table into a monthly partitioned one (Postgres).
+
+    Used by migrations. Copies the existing rows into partitions for every
+    month they span and recreates the model's indexes and foreign keys on the
+    partitioned table.
+    """
+    qn = schema_editor.quote_name
+    table = model._meta.db_table
+    new_table = f"{table}_new"
+    spec = PartitionedTable(model, column, None, 0)
+
+    schema_editor.execute(f"CREATE TABLE {qn(new_table)} (LIKE {qn(table)}) PARTITION BY RANGE ({qn(column)})")
+    schema_editor.execute(f"CREATE TABLE {qn(spec.default_partition)} PARTITION OF {qn(new_table)} DEFAULT")
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN({qn(column)}), MAX({qn(column)}) FROM {qn(table)}")
+        oldest, newest = cursor.fetchone()
+    now = now or timezone.now()
+    last = add_months(month_start(max(newest, now) if newest else now), PARTITION_MONTHS_AHEAD)
+    for month in month_range(month_start(min(oldest, now) if oldest else now), last):
+        schema_editor.execute(
+            f"CREATE TABLE {qn(spec.partition_name(month))} PARTITION OF {qn(new_table)} FOR VALUES FROM (%s) TO (%s)",
+            [month, add_months(month, 1)],
+        )
+
+    schema_editor.execute(f"INSERT INTO {qn(new_table)} SELECT * FROM {qn(table)}")
+    schema_editor.execute(f"DROP TABLE {qn(table)}")
+    schema_editor.execute(f"ALTER TABLE {qn(new_table)} RENAME TO {qn(table)}")
+
+    # Identity columns cannot be added to partitioned tables before Postgres 17
+    sequence = f"{table}_id_seq"
+    schema_editor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.{qn('id')}")
+    schema_editor.execute(f"SELECT setval(%s, COALESCE((SELECT MAX({qn('id')}) FROM {qn(table)}), 0) + 1, false)", [sequence])
+    schema_editor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN {qn('id')} SET DEFAULT nextval(%s)", [sequence])
+    schema_editor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY ({qn('id')}, {qn(column)})")
+
+    for field in model._meta.local_fields:
+        if field.remote_field and field.db_constraint:
+            schema_editor.execute(schema_editor._create_fk_sql(model, field, "_fk_%(to_table)s_%(to_column)s"))
+    for statement in schema_editor._model_indexes_sql(model):
+        schema_editor.execute(statement)
@@ -1,6 +1,9 @@
 from rest_framework import serializers
 
-from .models import ChatMessage, Trip
+from users.models import User
+from vehicles.models import Vehicle
+
+from .models import ArchivedChatMessage, ArchivedTrip, ChatMessage, GPSTrackingHistory, Trip
 
 
 class TripSerializer(serializers.ModelSerializer):
@@ -9,9 +12,47 @@ class TripSerializer(serializers.ModelSerializer):
     class Meta:
         model = Trip
         fields = "__all__"
+        # Status, crew and vehicle only change through the transition endpoint (trips.lifecycle)
+        read_only_fields = ["status", "version", "driver", "paramedic", "vehicle", "timeout_flagged_at"]
+
+    def update(self, instance, validated_data):
+        # Write only the fields sent, so an edit never saves back a status read before a concurrent transition
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        return instance
+
+
+class TripTransitionSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Trip.Status.choices)
+    version = serializers.IntegerField(min_value=0, required=False)
+    message = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    driver = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), required=False)
+    paramedic = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), required=False)
+    vehicle = serializers.PrimaryKeyRelatedField(queryset=Vehicle.objects.all(), required=False)
 
 
 class ChatMessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ChatMessage
         fields = "__all__"
+
+
+class GPSTrackingHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GPSTrackingHistory
+        fields = ["latitude", "longitude", "speed", "heading", "recorded_at"]
+
+
+class ArchivedTripSerializer(serializers.ModelSerializer):
+    total_distance = serializers.ReadOnlyField()
+
+    class Meta:
+        model = ArchivedTrip
+        fields = "__all__"
+
+
+class ArchivedChatMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedChatMessage
+        fields = "__all__"
@@ -1,7 +1,7 @@
 """
 Celery background tasks for trip management.
 
-Handles GPS tracking, trip monitoring, and cleanup operations.
+Handles GPS tracking, trip monitoring, and history retention.
 """
 
 from datetime import timedelta
@@ -11,8 +11,10 @@ from celery import shared_task
 from channels.layers import get_channel_layer
 from django.utils import timezone
 
+from config.idempotency import idempotent_task
 
-@shared_task(queue="high_priority")
+
+@shared_task(queue="high_priority", ignore_result=True)
 def broadcast_gps_update(trip_id, latitude, longitude, speed=None, heading=None):
     """
     Broadcast GPS update to all clients tracking a trip.
@@ -44,7 +46,7 @@ def broadcast_gps_update(trip_id, latitude, longitude, speed=None, heading=None)
     return f"GPS update broadcast for trip {trip_id}"
 
 
-@shared_task(queue="high_priority")
+@shared_task(queue="high_priority", ignore_result=True)
 def broadcast_trip_status(trip_id, status, message=None):
     """
     Broadcast trip status change to all clients.
@@ -70,103 +72,142 @@ def broadcast_trip_status(trip_id, status, message=None):
     return f"Status update broadcast for trip {trip_id}: {status}"
 
 
-@shared_task
-def cleanup_old_gps_data():
+@shared_task(queue="high_priority", ignore_result=True)
+def relay_trip_events():
     """
-    Periodic task to cleanup old GPS tracking data.
+    Publish the trip events waiting in the outbox (see trips.outbox).
 
-    Runs every hour (configured in config/celery.py).
-    Removes GPS data older than 30 days to save storage.
+    Kicked after commits that wrote events and run every few seconds from
+    beat (configured in config/celery.py) as a fallback. Stops after 50
+    seconds; the next run continues from there.
     """
-    from trips.models import Trip
+    from trips.outbox import relay
 
-    cutoff_date = timezone.now() - timedelta(days=30)
+    relayed = relay(time_budget=50)
+    return f"Relayed {relayed} trip events"
 
-    # Clear GPS data from old completed trips
-    updated_count = Trip.objects.filter(
-        status__in=["completed", "cancelled"],
-        updated_at__lt=cutoff_date,
-    ).update(
-        current_latitude=None,
-        current_longitude=None,
-    )
 
-    return f"Cleaned up GPS data from {updated_count} old trips"
+@shared_task
+def maintain_partitions():
+    """
+    Periodic task managing the monthly partitions of chat and GPS history.
+
+    Runs daily (configured in config/celery.py). Creates upcoming partitions
+    and drops those past GPS_HISTORY_RETENTION_DAYS / CHAT_MESSAGE_RETENTION_DAYS
+    (and the audit trail's past AUDIT_RETENTION_DAYS).
+    """
+    from trips.partitions import maintain_partitions as maintain
+
+    results = maintain()
+    summary = ", ".join(
+        f"{table}: {len(result.get('created', []))} created, {len(result.get('dropped', []))} dropped, "
+        f"{result.get('deleted', 0)} rows deleted"
+        for table, result in results.items()
+    )
+    return f"Maintained partitions ({summary})"
 
 
 @shared_task
-def check_trip_timeouts():
+def archive_old_trips():
     """
-    Periodic task to check for trip timeouts.
+    Periodic task moving old completed/cancelled trips to the archive tables.
 
-    Runs every 5 minutes (configured in config/celery.py).
-    Flags trips that have been in progress for too long.
+    Runs daily (configured in config/celery.py). Stops after 25 minutes to
+    stay under the task time limit; the next run continues from there.
     """
-    from trips.models import Trip
+    from trips.archive import archive_trips
 
-    # Check for in-progress trips older than 6 hours
-    timeout_threshold = timezone.now() - timedelta(hours=6)
+    archived = archive_trips(time_budget=25 * 60)
+    return f"Archived {archived} trips"
 
-    timeout_trips = Trip.objects.filter(
-        status="in_progress",
-        started_at__lt=timeout_threshold,
-    )
 
-    flagged_count = 0
-    for trip in timeout_trips:
-        # Flag as requiring attention
-        trip.notes = f"{trip.notes or ''}\n[TIMEOUT ALERT] Trip exceeded 6 hour threshold"
-        trip.save(update_fields=["notes", "updated_at"])
-        flagged_count += 1
+@shared_task
+def check_trip_timeouts():
+    """
+    Periodic task flagging active trips that run past MAX_TRIP_DURATION.
 
-        # Optionally: Send notification to dispatcher
-        # send_notification.delay(...)
+    Runs every 5 minutes (configured in config/celery.py). One query over the
+    partial index trip_timeout_sweep_idx finds the overdue trips that are not
+    flagged yet and one UPDATE sets their timeout_flagged_at, which takes them
+    out of that index, so later sweeps never look at them again. Admins
+    (dispatch) get one notification per TRIP_TIMEOUT_NOTIFICATION_BATCH trips.
+    """
+    from django.conf import settings
+    from django.db import transaction
 
-    return f"Flagged {flagged_count} trips exceeding timeout threshold"
+    from trips.models import Trip
+    from users.models import User
+    from users.notifications import notify
+
+    now = timezone.now()
+    threshold = now - timedelta(seconds=settings.MAX_TRIP_DURATION)
+
+    with transaction.atomic():
+        trip_ids = list(
+            Trip.objects.filter(status__in=Trip.ACTIVE_STATUSES, timeout_flagged_at__isnull=True, start_time__lt=threshold)
+            .order_by("start_time")
+            .select_for_update(skip_locked=True)
+            .values_list("pk", flat=True)
+        )
+        if trip_ids:
+            Trip.objects.filter(pk__in=trip_ids).update(timeout_flagged_at=now, updated_at=now)
+
+    if trip_ids:
+        hours = settings.MAX_TRIP_DURATION / 3600
+        dispatchers = list(User.objects.filter(role=User.Role.ADMIN, is_active=True).values_list("pk", flat=True))
+        batch_size = settings.TRIP_TIMEOUT_NOTIFICATION_BATCH
+        for start in range(0, len(trip_ids), batch_size):
+            batch = trip_ids[start : start + batch_size]
+            message = f"{len(batch)} trip(s) exceeded the {hours:g} hour threshold: " + ", ".join(f"#{pk}" for pk in batch)
+            for user_id in dispatchers:
+                notify(user_id, "trip_timeout", message, trip_ids=batch)
+
+    return f"Flagged {len(trip_ids)} trips exceeding timeout threshold"
 
 
 @shared_task(queue="normal")
+@idempotent_task
 def process_trip_completion(trip_id):
     """
     Handle trip completion workflow.
 
-    Triggered when a trip is marked as completed.
+    Queued by the outbox relay when a trip transitions to completed.
     - Generate invoice
-    - Send completion notifications
-    - Update vehicle availability
+
+    The crew and vehicle were already released by the transition itself
+    (see trips.lifecycle and trips.availability). Patients have no user
+    account or address to notify; their company hears of the trip through
+    its invoice email.
 
     Args:
         trip_id: ID of the completed trip
     """
+    from django.conf import settings
+
     from billing.tasks import generate_invoice
     from trips.models import Trip
-    from users.tasks import send_notification
 
     try:
-        trip = Trip.objects.select_related("patient", "driver", "vehicle").get(id=trip_id)
-
-        # Generate invoice for the trip
-        generate_invoice.delay(trip_id)
-
-        # Send completion notification to patient
-        if trip.patient and trip.patient.email:
-            send_notification.delay(
-                user_id=trip.patient.id,
-                notification_type="trip_completed",
-                message=f"Your trip #{trip_id} has been completed.",
-            )
-
-        # Update vehicle availability
-        if trip.vehicle:
-            trip.vehicle.status = "available"
-            trip.vehicle.save(update_fields=["status"])
+        Trip.objects.only("pk").get(id=trip_id)
 
-        # Update driver availability
-        if trip.driver:
-            trip.driver.driver_status = "available"
-            trip.driver.save(update_fields=["driver_status"])
+        # Generate invoice for the trip; otherwise the nightly generate_invoices batch picks it up
+        if settings.INVOICE_TRIPS_ON_COMPLETION:
+            generate_invoice.delay(trip_id)
 
         return f"Trip {trip_id} completion processed successfully"
 
     except Trip.DoesNotExist:
         return f"Trip {trip_id} not found"
+
+
+@shared_task
+def reconcile_availability():
+    """
+    Periodic task correcting the availability registry against the database.
+
+    Runs every minute (configured in config/celery.py); see trips.availability.
+    """
+    from trips.availability import reconcile
+
+    added, removed = reconcile()
+    return f"Availability reconciled: {added} added, {removed} removed"
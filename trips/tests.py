@@ -2,15 +2,41 @@
 Tests for trip management - Fixed with correct Trip model fields.
 """
 
-from django.test import TestCase
+import csv
+import io
+import json
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import QueryDict
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
+from billing.models import Invoice
+from config.exports import _stream_async
+from config.fast_read import CompiledRepresentation
+from ems.models import EMSReport
 from patients.models import Patient
-from trips.models import Trip
-from users.models import User
+from trips import availability, lifecycle, outbox
+from trips.archive import archive_trips
+from trips.filters import TripFilter
+from trips.models import ACTIVE_TRIP_STATUSES, ArchivedTrip, ChatMessage, GPSTrackingHistory, Trip, TripEvent
+from trips.partitions import add_months, ensure_partitions, existing_partitions, get_tables, maintain_partitions, month_start
+from trips.serializers import ChatMessageSerializer, TripSerializer
+from trips.tasks import check_trip_timeouts, process_trip_completion
+from users.models import Company, User
+from users.tasks import send_trip_assignment_notification
+from vehicles.models import Vehicle
 
 
 class TripViewSetTestCase(TestCase):
@@ -56,3 +82,930 @@ class TripViewSetTestCase(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["start_location"], "Test Location")
+
+
+@override_settings(IDEMPOTENCY_KEY_PREFIX="test:idempotency:trips")
+class TripIdempotencyTestCase(TestCase):
+    """Test Idempotency-Key handling on trip creation."""
+
+    def setUp(self):
+        """Set up an authenticated client and a fresh key."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="retrier", email="retrier@example.com", password="retry123")
+        self.client.force_authenticate(self.user)
+        self.key = uuid.uuid4().hex
+        self.payload = {"start_location": "Home", "end_location": "Clinic"}
+
+    def post(self, payload, key=None):
+        return self.client.post(reverse("trip-list"), payload, format="json", HTTP_IDEMPOTENCY_KEY=key or self.key)
+
+    def test_retry_replays_the_first_response(self):
+        """A retried POST returns the stored response and creates nothing."""
+        first = self.post(self.payload)
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        retry = self.post(self.payload)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data["id"], first.data["id"])
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Trip.objects.count(), 1)
+
+    def test_key_reused_for_different_request(self):
+        """Reusing a key with another body is rejected."""
+        self.post(self.payload)
+        response = self.post({**self.payload, "end_location": "Hospital"})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Trip.objects.count(), 1)
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        """Without the header every POST creates a trip."""
+        for _ in range(2):
+            self.client.post(reverse("trip-list"), self.payload, format="json")
+        self.assertEqual(Trip.objects.count(), 2)
+
+    def test_failed_request_can_be_retried_with_the_key(self):
+        """Validation errors are replayed too, but a different key is processed afresh."""
+        self.assertEqual(self.post({"start_location": "Home"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post({"start_location": "Home"}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post(self.payload, key=uuid.uuid4().hex).status_code, status.HTTP_201_CREATED)
+
+
+class FastReadParityTestCase(TestCase):
+    """Test that the fast read path renders exactly what the serializers render."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.driver = User.objects.create_user(
+            username="parity_driver", email="parity_driver@example.com", password="driver123", role=User.Role.DRIVER
+        )
+        self.paramedic = User.objects.create_user(
+            username="parity_medic", email="parity_medic@example.com", password="medic123", role=User.Role.PARAMEDIC
+        )
+        self.token = Token.objects.create(user=self.driver)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        patient = Patient.objects.create(name="Parity Patient", dob="1970-01-01")
+        now = timezone.now()
+
+        self.trips = [
+            Trip.objects.create(patient=patient, start_location="A", end_location="B"),
+            Trip.objects.create(
+                patient=patient,
+                driver=self.driver,
+                paramedic=self.paramedic,
+                start_location="Ünïcode Street",
+                end_location="Hospital",
+                status=Trip.Status.COMPLETED,
+                start_time=now - timedelta(hours=2),
+                end_time=now.replace(microsecond=0),
+                start_odometer=15100.1,
+                end_odometer=15125.7,
+                request_source=Trip.Source.PHONE,
+            ),
+            Trip.objects.create(start_location="C", end_location="D", start_odometer=10.0),
+        ]
+        ChatMessage.objects.create(
+            trip=self.trips[1], sender=self.driver, receiver=self.paramedic, message_content="On the way"
+        )
+        ChatMessage.objects.create(
+            trip=self.trips[1],
+            sender=self.paramedic,
+            receiver=self.driver,
+            message_content="",
+            message_type=ChatMessage.Type.SYSTEM,
+        )
+
+    def assertRendersLike(self, response, data):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, response.accepted_renderer.render(data))
+
+    def test_trip_list_parity(self):
+        """Trip list output is byte-identical to TripSerializer."""
+        response = self.client.get(reverse("trip-list"))
+        self.assertRendersLike(response, TripSerializer(Trip.objects.all(), many=True).data)
+
+    def test_trip_detail_parity(self):
+        """Trip detail output is byte-identical to TripSerializer."""
+        for trip in self.trips:
+            response = self.client.get(reverse("trip-detail", kwargs={"pk": trip.pk}))
+            self.assertRendersLike(response, TripSerializer(trip).data)
+
+    def test_trip_list_parity_in_active_timezone(self):
+        """Datetimes are converted to the active timezone exactly like DateTimeField."""
+        with timezone.override("Africa/Cairo"):
+            response = self.client.get(reverse("trip-list"))
+            self.assertRendersLike(response, TripSerializer(Trip.objects.all(), many=True).data)
+
+    def test_chat_message_list_parity(self):
+        """Chat message list output is byte-identical to ChatMessageSerializer."""
+        response = self.client.get(reverse("chatmessage-list"))
+        self.assertRendersLike(response, ChatMessageSerializer(ChatMessage.objects.all(), many=True).data)
+
+    def test_missing_trip_returns_404(self):
+        """Unknown and malformed primary keys return 404."""
+        response = self.client.get(reverse("trip-detail", kwargs={"pk": 999999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.get("/api/v1/trips/not-a-number/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unsupported_field_requires_annotation(self):
+        """Serializer fields that are not model columns must be mapped explicitly."""
+        with self.assertRaises(ImproperlyConfigured):
+            CompiledRepresentation(TripSerializer)
+
+
+class AsyncReadTestCase(TestCase):
+    """Test the async list/retrieve path served under ASGI."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="async_reader", email="async@example.com", password="reader123")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.trip = Trip.objects.create(start_location="A", end_location="B", status=Trip.Status.EN_ROUTE)
+        Trip.objects.create(start_location="C", end_location="D", start_odometer=10.0, end_odometer=12.5)
+
+    def get_both(self, url, **params):
+        """Fetch ``url`` through the async and the sync path."""
+        async_response = self.client.get(url, params)
+        with override_settings(ASYNC_READ_VIEWS=False):
+            sync_response = self.client.get(url, params)
+        return async_response, sync_response
+
+    def test_matches_sync_views(self):
+        """Async responses are byte-identical to the sync views, errors included."""
+        for url, params in (
+            (reverse("trip-list"), {}),
+            (reverse("trip-list"), {"status": "en_route", "ordering": "-created_at"}),
+            (reverse("trip-list"), {"status": "not-a-status"}),
+            (reverse("trip-detail", kwargs={"pk": self.trip.pk}), {}),
+            (reverse("trip-detail", kwargs={"pk": 999999}), {}),
+        ):
+            async_response, sync_response = self.get_both(url, **params)
+            self.assertEqual(async_response.status_code, sync_response.status_code)
+            self.assertEqual(async_response.content, sync_response.content)
+
+    def test_cached_token_skips_auth_query(self):
+        """Once the token is cached a list costs a single query."""
+        self.client.get(reverse("trip-list"))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("trip-list"))
+        self.assertEqual(len(response.data), 2)
+
+    def test_other_requests_use_sync_views(self):
+        """Unauthenticated, session-authenticated and write requests behave as before."""
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse("trip-list")).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(reverse("trip-list")).status_code, status.HTTP_200_OK)
+        response = self.client.post(reverse("trip-list"), {"start_location": "E", "end_location": "F"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_invalid_token(self):
+        """Unknown tokens get the same 401 as the sync views."""
+        self.client.credentials(HTTP_AUTHORIZATION="Token not-a-real-token")
+        response = self.client.get(reverse("trip-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response["WWW-Authenticate"], "Token")
+
+
+class TripExportTestCase(TestCase):
+    """Test streaming CSV/NDJSON exports."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="finance", email="finance@example.com", password="finance123")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.company = Company.objects.create(company_name="Export Client", company_type=Company.Type.CLIENT)
+        other_company = Company.objects.create(company_name="Other Client", company_type=Company.Type.CLIENT)
+        patient = Patient.objects.create(name="Export Patient", company=self.company)
+        other_patient = Patient.objects.create(name="Other Patient", company=other_company)
+
+        self.trips = [
+            Trip.objects.create(patient=patient, start_location="A, Street", end_location="B", start_odometer=1.5),
+            Trip.objects.create(patient=patient, start_location="C", end_location="D"),
+            Trip.objects.create(patient=other_patient, start_location="E", end_location="F"),
+        ]
+        Trip.objects.filter(pk=self.trips[0].pk).update(created_at=timezone.now() - timedelta(days=40))
+
+    def export(self, export_format, **params):
+        response = self.client.get(f"/api/v1/trips/export/{export_format}/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_csv_export(self):
+        """CSV export has a header row and one row per trip, quoted where needed."""
+        rows = list(csv.reader(io.StringIO(self.export("csv").decode())))
+
+        self.assertEqual(rows[0], list(TripSerializer().fields))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][rows[0].index("start_location")], "A, Street")
+
+    def test_ndjson_export_matches_api_rows(self):
+        """Each NDJSON line is the same object the list endpoint returns."""
+        lines = self.export("ndjson").splitlines()
+        api_rows = {row["id"]: row for row in self.client.get(reverse("trip-list")).json()}
+
+        self.assertEqual(len(lines), 3)
+        for line in lines:
+            row = json.loads(line)
+            self.assertEqual(row, api_rows[row["id"]])
+
+    def test_time_range_and_company_filters(self):
+        """start/end and company narrow the export in SQL."""
+        start = (timezone.now() - timedelta(days=7)).date().isoformat()
+        lines = self.export("ndjson", start=start, company=self.company.pk).splitlines()
+
+        self.assertEqual([json.loads(line)["id"] for line in lines], [self.trips[1].pk])
+
+    def test_asgi_stream_pulls_chunks_lazily(self):
+        """Under ASGI the sync chunk generator is consumed one chunk at a time."""
+        chunks = iter([b"header\n", b"row\n"])
+
+        async def collect():
+            return [chunk async for chunk in _stream_async(chunks)]
+
+        self.assertEqual(async_to_sync(collect)(), [b"header\n", b"row\n"])
+
+    def test_invalid_filters_return_400(self):
+        """Malformed dates and company ids are rejected."""
+        response = self.client.get("/api/v1/trips/export/csv/", {"start": "last month"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get("/api/v1/trips/export/csv/", {"company": "acme"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TripFilterTestCase(TestCase):
+    """Test declarative trip filtering and ordering."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.driver = User.objects.create_user(
+            username="filter_driver", email="filter_driver@example.com", password="driver123", role=User.Role.DRIVER
+        )
+        self.token = Token.objects.create(user=self.driver)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+        self.en_route = Trip.objects.create(
+            driver=self.driver, start_location="A", end_location="B", status=Trip.Status.EN_ROUTE
+        )
+        self.completed = Trip.objects.create(
+            driver=self.driver, start_location="C", end_location="D", status=Trip.Status.COMPLETED
+        )
+        self.pending = Trip.objects.create(start_location="E", end_location="F")
+
+    def ids(self, params):
+        response = self.client.get(reverse("trip-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["id"] for row in response.json()]
+
+    def test_filter_by_status_and_driver(self):
+        """status accepts several values and combines with driver."""
+        self.assertEqual(
+            sorted(self.ids({"status": [Trip.Status.EN_ROUTE, Trip.Status.PENDING]})),
+            [self.en_route.pk, self.pending.pk],
+        )
+        self.assertEqual(self.ids({"driver": self.driver.pk, "status": Trip.Status.COMPLETED}), [self.completed.pk])
+
+    def test_filter_active(self):
+        """active=true returns dispatched trips that are still in progress."""
+        self.assertEqual(self.ids({"active": "true"}), [self.en_route.pk])
+
+    def test_ordering(self):
+        """ordering sorts on whitelisted fields."""
+        self.assertEqual(self.ids({"ordering": "-created_at"}), [self.pending.pk, self.completed.pk, self.en_route.pk])
+
+    def test_invalid_status_returns_400(self):
+        """Unknown statuses are rejected instead of silently ignored."""
+        response = self.client.get(reverse("trip-list"), {"status": "teleporting"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TripIndexUsageTestCase(TestCase):
+    """Test that filtered trip queries are served by the composite and partial indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create a realistically sized and skewed trip table."""
+        cls.drivers = User.objects.bulk_create(
+            [User(username=f"idx_driver{i}", email=f"idx_driver{i}@example.com", role=User.Role.DRIVER) for i in range(200)]
+        )
+        # ~90% completed, a few pending/cancelled and ~4% in progress, as in production
+        statuses = (
+            [Trip.Status.COMPLETED] * 90 + [Trip.Status.CANCELLED] + [Trip.Status.PENDING] * 5 + list(ACTIVE_TRIP_STATUSES[:4])
+        )
+        Trip.objects.bulk_create(
+            [
+                Trip(start_location="A", end_location="B", status=statuses[i % 100], driver=cls.drivers[i % 200])
+                for i in range(20000)
+            ],
+            batch_size=2000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, params, index_name, ordering="-created_at"):
+        queryset = TripFilter(QueryDict(params), queryset=Trip.objects.order_by(ordering)).qs
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_driver_filter(self):
+        """driver uses (driver, created_at)."""
+        self.assertUsesIndex(f"driver={self.drivers[7].pk}", "trip_driver_created_idx")
+
+    def test_vehicle_filter(self):
+        """vehicle uses (vehicle, created_at)."""
+        self.assertUsesIndex("vehicle=3", "trip_vehicle_created_idx")
+
+    def test_status_and_date_range_filter(self):
+        """status plus a date range uses (status, created_at)."""
+        self.assertUsesIndex("status=cancelled&start=2020-01-01&end=2100-01-01", "trip_status_created_idx")
+
+    @skipUnless(connection.vendor == "postgresql", "SQLite cannot match partial indexes against bound parameters")
+    def test_active_filter(self):
+        """active=true uses the partial index over in-progress trips."""
+        self.assertUsesIndex("active=true", "trip_active_created_idx")
+
+
+class PartitionedHistoryTestCase(TestCase):
+    """Test GPS/chat history storage and partition maintenance."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="dispatcher", password="pass123")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+        self.trip = Trip.objects.create(start_location="Home", end_location="Hospital")
+        self.gps = get_tables()[1]
+
+    def add_point(self, recorded_at, **kwargs):
+        return GPSTrackingHistory.objects.create(
+            trip=self.trip, latitude=1.0, longitude=2.0, recorded_at=recorded_at, **kwargs
+        )
+
+    def partition_rows(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(name)}")
+            return cursor.fetchone()[0]
+
+    def test_gps_history_endpoint(self):
+        """The trail is returned oldest first, from the trip's creation or ``since``."""
+        now = timezone.now()
+        self.add_point(now + timedelta(minutes=2), speed=40.0)
+        self.add_point(now + timedelta(minutes=1))
+        self.add_point(self.trip.created_at - timedelta(days=1))
+
+        url = reverse("trip-gps-history", args=[self.trip.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([point["speed"] for point in response.data], [None, 40.0])
+
+        response = self.client.get(url, {"since": (now + timedelta(seconds=90)).isoformat()})
+        self.assertEqual(len(response.data), 1)
+
+        # Without an offset the server's time zone applies
+        naive = timezone.localtime(now + timedelta(seconds=90)).replace(tzinfo=None)
+        response = self.client.get(url, {"since": naive.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+        response = self.client.get(url, {"since": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_chat_message_filters(self):
+        """Messages filter by trip and timestamp range."""
+        other = Trip.objects.create(start_location="Home", end_location="Clinic")
+        for trip in (self.trip, other):
+            ChatMessage.objects.create(trip=trip, sender=self.user, receiver=self.user, message_content="On my way")
+
+        response = self.client.get(reverse("chatmessage-list"), {"trip": self.trip.pk})
+        self.assertEqual(len(response.data), 1)
+        response = self.client.get(reverse("chatmessage-list"), {"start": (timezone.now() + timedelta(hours=1)).isoformat()})
+        self.assertEqual(response.data, [])
+
+    @skipUnless(connection.vendor != "postgresql", "Postgres drops whole partitions instead")
+    def test_retention_deletes_rows_without_partitioning(self):
+        """Without partitioning, expired rows are deleted."""
+        self.add_point(timezone.now() - timedelta(days=45))
+        kept = self.add_point(timezone.now())
+
+        results = maintain_partitions()
+
+        self.assertEqual(results["trips_gpstrackinghistory"]["deleted"], 1)
+        self.assertEqual(list(GPSTrackingHistory.objects.values_list("pk", flat=True)), [kept.pk])
+
+    @skipUnless(connection.vendor == "postgresql", "Partitioning is Postgres-only")
+    def test_partitions_created_ahead(self):
+        """The migration prepares the current month and the months ahead."""
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            months = set(existing_partitions(cursor, self.gps))
+        self.assertTrue({add_months(month_start(now), offset) for offset in range(4)} <= months)
+        self.assertEqual(ensure_partitions(self.gps, now), [])
+
+    @skipUnless(connection.vendor == "postgresql", "Partitioning is Postgres-only")
+    def test_stranded_rows_move_and_expire(self):
+        """Rows in the default partition get their own month, which is dropped once past retention."""
+        old = timezone.now() - timedelta(days=200)
+        point = self.add_point(old)
+        self.assertEqual(self.partition_rows(self.gps.default_partition), 1)
+
+        created = ensure_partitions(self.gps)
+        old_partition = self.gps.partition_name(month_start(old))
+        self.assertIn(old_partition, created)
+        self.assertEqual(self.partition_rows(self.gps.default_partition), 0)
+        self.assertEqual(self.partition_rows(old_partition), 1)
+
+        # Recent queries do not touch the old month
+        plan = GPSTrackingHistory.objects.filter(trip=self.trip, recorded_at__gte=self.trip.created_at).explain()
+        self.assertNotIn(old_partition, plan)
+
+        current = self.add_point(timezone.now())
+        results = maintain_partitions()
+
+        self.assertIn(old_partition, results["trips_gpstrackinghistory"]["dropped"])
+        self.assertFalse(GPSTrackingHistory.objects.filter(pk=point.pk).exists())
+        self.assertTrue(GPSTrackingHistory.objects.filter(pk=current.pk).exists())
+
+
+class TripArchiveTestCase(TestCase):
+    """Test archival of old trips and the archive API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="archivist", password="pass123")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+        self.company = Company.objects.create(company_name="Client", company_type=Company.Type.CLIENT)
+        self.old = timezone.now() - timedelta(days=400)
+
+    def make_trip(self, status=Trip.Status.COMPLETED, created_at=None, **kwargs):
+        trip = Trip.objects.create(start_location="Home", end_location="Hospital", status=status, driver=self.user, **kwargs)
+        Trip.objects.filter(pk=trip.pk).update(created_at=created_at or self.old)
+        trip.refresh_from_db()
+        return trip
+
+    def test_archives_only_old_finished_trips(self):
+        """Old completed/cancelled trips move; recent and in-progress ones stay."""
+        completed = self.make_trip(start_odometer=10.0, end_odometer=25.5)
+        cancelled = self.make_trip(status=Trip.Status.CANCELLED)
+        active = self.make_trip(status=Trip.Status.EN_ROUTE)
+        recent = self.make_trip(created_at=timezone.now() - timedelta(days=10))
+
+        self.assertEqual(archive_trips(pause=0), 2)
+
+        self.assertEqual(set(Trip.objects.values_list("pk", flat=True)), {active.pk, recent.pk})
+        self.assertEqual(set(ArchivedTrip.objects.values_list("pk", flat=True)), {completed.pk, cancelled.pk})
+        archived = ArchivedTrip.objects.get(pk=completed.pk)
+        self.assertEqual(archived.created_at, completed.created_at)
+        self.assertEqual(archived.driver_id, self.user.pk)
+        self.assertEqual(archived.total_distance, 15.5)
+
+    def test_moves_chat_and_ems_and_keeps_invoice(self):
+        """Chat and EMS data move with the trip; the invoice stays in billing, detached."""
+        trip = self.make_trip()
+        message = ChatMessage.objects.create(trip=trip, sender=self.user, receiver=self.user, message_content="Arrived")
+        EMSReport.objects.create(trip=trip, medical_data="BP 120/80")
+        invoice = Invoice.objects.create(trip=trip, company=self.company, amount=Decimal("100.00"))
+        GPSTrackingHistory.objects.create(trip=trip, latitude=1.0, longitude=2.0)
+
+        archive_trips(pause=0)
+
+        archived = ArchivedTrip.objects.get(pk=trip.pk)
+        self.assertEqual(archived.invoice_id, invoice.pk)
+        self.assertEqual(archived.ems_medical_data, "BP 120/80")
+        self.assertEqual(list(archived.chat_messages.values_list("pk", "message_content")), [(message.pk, "Arrived")])
+        self.assertFalse(ChatMessage.objects.exists())
+        self.assertFalse(EMSReport.objects.exists())
+        self.assertFalse(GPSTrackingHistory.objects.exists())
+        invoice.refresh_from_db()
+        self.assertIsNone(invoice.trip_id)
+
+    def test_batches_and_resume(self):
+        """Each run archives whole batches; a stopped run is continued by the next."""
+        trips = [self.make_trip() for _ in range(5)]
+
+        self.assertEqual(archive_trips(batch_size=2, pause=0, max_batches=1), 2)
+        self.assertEqual(list(ArchivedTrip.objects.order_by("pk").values_list("pk", flat=True)), [t.pk for t in trips[:2]])
+
+        self.assertEqual(archive_trips(batch_size=2, pause=0), 3)
+        self.assertFalse(Trip.objects.exists())
+
+    def test_archive_api_is_read_only(self):
+        """Archived trips and their messages are readable but not writable."""
+        trip = self.make_trip()
+        ChatMessage.objects.create(trip=trip, sender=self.user, receiver=self.user, message_content="Done")
+        archive_trips(pause=0)
+
+        response = self.client.get(reverse("archivedtrip-list"), {"driver": self.user.pk})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row["id"] for row in response.data], [trip.pk])
+
+        response = self.client.get(reverse("archivedtrip-messages", args=[trip.pk]))
+        self.assertEqual([row["message_content"] for row in response.data], ["Done"])
+
+        response = self.client.delete(reverse("archivedtrip-detail", args=[trip.pk]))
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+@override_settings(MAX_TRIP_DURATION=6 * 60 * 60, TRIP_TIMEOUT_NOTIFICATION_BATCH=2)
+class TripTimeoutTestCase(TestCase):
+    """Test the set-based trip timeout sweep."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="dispatch", email="dispatch@example.com", password="pass123", role=User.Role.ADMIN
+        )
+        self.driver = User.objects.create_user(
+            username="timeout_driver", email="timeout_driver@example.com", password="pass123", role=User.Role.DRIVER
+        )
+        self.late = timezone.now() - timedelta(hours=7)
+
+    def make_trip(self, status=Trip.Status.IN_TRANSIT, start_time=None):
+        return Trip.objects.create(
+            start_location="Home", end_location="Hospital", status=status, driver=self.driver, start_time=start_time
+        )
+
+    def test_flags_only_overdue_active_trips(self):
+        """Active trips past the threshold are flagged; recent, finished and unstarted ones are not."""
+        overdue = [self.make_trip(start_time=self.late), self.make_trip(Trip.Status.EN_ROUTE, self.late)]
+        recent = self.make_trip(start_time=timezone.now() - timedelta(hours=1))
+        completed = self.make_trip(Trip.Status.COMPLETED, self.late)
+        unstarted = self.make_trip(Trip.Status.ASSIGNED)
+
+        with mock.patch("users.notifications.notify"):
+            self.assertEqual(check_trip_timeouts(), "Flagged 2 trips exceeding timeout threshold")
+
+        flagged = set(Trip.objects.filter(timeout_flagged_at__isnull=False).values_list("pk", flat=True))
+        self.assertEqual(flagged, {trip.pk for trip in overdue})
+        for trip in (recent, completed, unstarted):
+            trip.refresh_from_db()
+            self.assertIsNone(trip.timeout_flagged_at)
+
+    def test_flagged_trips_are_not_rescanned(self):
+        """A second sweep neither reflags nor renotifies."""
+        trip = self.make_trip(start_time=self.late)
+        with mock.patch("users.notifications.notify") as notify:
+            check_trip_timeouts()
+            trip.refresh_from_db()
+            flagged_at = trip.timeout_flagged_at
+            self.assertEqual(check_trip_timeouts(), "Flagged 0 trips exceeding timeout threshold")
+        trip.refresh_from_db()
+        self.assertEqual(trip.timeout_flagged_at, flagged_at)
+        self.assertEqual(notify.call_count, 1)
+
+    def test_notifications_are_batched(self):
+        """Admins get one notification per batch of flagged trips."""
+        trips = [self.make_trip(start_time=self.late - timedelta(minutes=i)) for i in range(3)]
+        with mock.patch("users.notifications.notify") as notify:
+            check_trip_timeouts()
+
+        self.assertEqual(notify.call_count, 2)
+        batches = [call.kwargs["trip_ids"] for call in notify.call_args_list]
+        self.assertEqual(sorted(pk for batch in batches for pk in batch), sorted(trip.pk for trip in trips))
+        self.assertTrue(all(call.args[0] == self.admin.pk for call in notify.call_args_list))
+
+    def test_flag_is_read_only(self):
+        """The API cannot set or clear the timeout flag."""
+        serializer = TripSerializer(data={"start_location": "A", "end_location": "B", "timeout_flagged_at": timezone.now()})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertNotIn("timeout_flagged_at", serializer.validated_data)
+
+
+class TripOutboxTestCase(TestCase):
+    """Test trip events written with trip changes and relayed from the outbox."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="dispatcher", email="dispatcher@example.com", password="pass123")
+        self.client.force_authenticate(self.user)
+        self.driver = User.objects.create_user(
+            username="outbox_driver", email="outbox_driver@example.com", password="pass123", role=User.Role.DRIVER
+        )
+        self.trip = Trip.objects.create(start_location="Home", end_location="Clinic", status=Trip.Status.ARRIVED)
+
+    def events(self):
+        return list(TripEvent.objects.order_by("pk").values_list("trip_id", "kind", "payload"))
+
+    def change(self, method, url, **data):
+        with mock.patch.object(outbox, "kick") as kick, self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return kick
+
+    def test_changes_write_events(self):
+        """A transition writes one status event; plain edits write none."""
+        kick = self.change("post", reverse("trip-transition", args=[self.trip.pk]), status=Trip.Status.COMPLETED)
+        self.change("patch", reverse("trip-detail", args=[self.trip.pk]), end_location="Hospital")
+
+        self.assertEqual(
+            self.events(),
+            [
+                (
+                    self.trip.pk,
+                    "status",
+                    {"status": "completed", "previous_status": "arrived", "version": 1, "driver_id": None, "message": None},
+                ),
+            ],
+        )
+        kick.assert_called_once()
+
+    def test_rolled_back_change_writes_nothing(self):
+        """Events share the trip's transaction."""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            lifecycle.transition(self.trip.pk, Trip.Status.COMPLETED)
+            raise RuntimeError
+        self.assertEqual(self.events(), [])
+        self.trip.refresh_from_db()
+        self.assertEqual((self.trip.status, self.trip.version), (Trip.Status.ARRIVED, 0))
+
+    def test_relay_publishes_in_order_and_deletes(self):
+        """Status events are broadcast per trip in order, tasks queued, and the outbox emptied."""
+        pending = Trip.objects.create(start_location="Home", end_location="Clinic")
+        with self.captureOnCommitCallbacks():
+            lifecycle.transition(pending.pk, Trip.Status.ASSIGNED, driver=self.driver)
+            lifecycle.transition(pending.pk, Trip.Status.EN_ROUTE)
+            lifecycle.transition(self.trip.pk, Trip.Status.COMPLETED)
+
+        sent = []
+
+        async def group_send(group, message):
+            sent.append((group, message["status"], message["version"]))
+
+        layer = mock.Mock(group_send=group_send)
+        with (
+            mock.patch.object(outbox, "get_channel_layer", return_value=layer),
+            mock.patch("config.celery.app.producer_or_acquire"),
+            mock.patch("celery.app.task.Task.apply_async") as apply_async,
+        ):
+            self.assertEqual(outbox.relay(batch_size=2), 3)
+
+        group = f"trip_status_{pending.pk}"
+        self.assertEqual(
+            sent, [(group, "assigned", 1), (group, "en_route", 2), (f"trip_status_{self.trip.pk}", "completed", 1)]
+        )
+        queued = [call.args[0] for call in apply_async.call_args_list]
+        self.assertEqual(queued, [(pending.pk, self.driver.pk, mock.ANY), (self.trip.pk,)])
+        self.assertEqual(self.events(), [])
+
+    def test_reassignment_to_the_same_driver_is_notified(self):
+        """Each assignment is keyed on its own event, so re-assigning within the idempotency TTL notifies again."""
+        pending = Trip.objects.create(start_location="Home", end_location="Clinic")
+        with self.captureOnCommitCallbacks():
+            lifecycle.transition(pending.pk, Trip.Status.ASSIGNED, driver=self.driver)
+            lifecycle.transition(pending.pk, Trip.Status.PENDING)
+            lifecycle.transition(pending.pk, Trip.Status.ASSIGNED, driver=self.driver)
+
+        with (
+            mock.patch.object(outbox, "broadcast"),
+            mock.patch("config.celery.app.producer_or_acquire"),
+            mock.patch("celery.app.task.Task.apply_async") as apply_async,
+        ):
+            outbox.relay()
+        queued = [call.args[0] for call in apply_async.call_args_list]
+        self.assertEqual(len(set(queued)), 2)
+
+        with (
+            override_settings(IDEMPOTENCY_KEY_PREFIX=f"test:idempotency:{uuid.uuid4().hex}"),
+            mock.patch("users.notifications.notify") as notify,
+        ):
+            for args in queued + queued:
+                send_trip_assignment_notification(*args)
+        self.assertEqual(notify.call_count, 2)
+
+    def test_failed_publish_keeps_events(self):
+        """A batch that fails to publish stays in the outbox for the next run."""
+        with self.captureOnCommitCallbacks():
+            lifecycle.transition(self.trip.pk, Trip.Status.COMPLETED)
+        with mock.patch.object(outbox, "publish", side_effect=ConnectionError), self.assertRaises(ConnectionError):
+            outbox.relay()
+        self.assertEqual(len(self.events()), 1)
+
+    def test_completion_processing(self):
+        """A completed trip with a patient is queued for invoicing; nothing is sent to a user id."""
+        self.trip.patient = Patient.objects.create(name="Completed Patient")
+        self.trip.save(update_fields=["patient"])
+        with (
+            override_settings(IDEMPOTENCY_KEY_PREFIX=f"test:idempotency:{uuid.uuid4().hex}", INVOICE_TRIPS_ON_COMPLETION=True),
+            mock.patch("billing.tasks.generate_invoice.delay") as generate_invoice,
+            mock.patch("users.notifications.notify") as notify,
+        ):
+            self.assertEqual(process_trip_completion(self.trip.pk), f"Trip {self.trip.pk} completion processed successfully")
+        generate_invoice.assert_called_once_with(self.trip.pk)
+        notify.assert_not_called()
+
+
+class TripLifecycleTestCase(TestCase):
+    """Test status transitions and their compare-and-swap on the trip version."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="lifecycle", email="lifecycle@example.com", password="pass123")
+        self.client.force_authenticate(self.user)
+        self.driver = User.objects.create_user(
+            username="lifecycle_driver", email="lifecycle_driver@example.com", password="pass123", role=User.Role.DRIVER
+        )
+        self.trip = Trip.objects.create(start_location="Home", end_location="Clinic")
+        self.url = reverse("trip-transition", args=[self.trip.pk])
+
+    def post(self, **data):
+        with mock.patch.object(outbox, "kick"):
+            return self.client.post(self.url, data, format="json")
+
+    def test_transition_bumps_version(self):
+        """An allowed transition updates status and crew and returns the new version."""
+        response = self.post(status=Trip.Status.ASSIGNED, version=0, driver=self.driver.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["status"], response.data["version"]), (Trip.Status.ASSIGNED, 1))
+        self.assertEqual(response.data["driver"], self.driver.pk)
+
+        response = self.post(status=Trip.Status.EN_ROUTE, version=1)
+        self.assertEqual((response.data["status"], response.data["version"]), (Trip.Status.EN_ROUTE, 2))
+
+    def test_stale_version_conflicts(self):
+        """The loser of two transitions from the same version gets 409 and the current state."""
+        self.assertEqual(self.post(status=Trip.Status.CANCELLED, version=0).status_code, status.HTTP_200_OK)
+        response = self.post(status=Trip.Status.ASSIGNED, version=0, driver=self.driver.pk)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual((response.data["status"], response.data["version"]), (Trip.Status.CANCELLED, 1))
+
+    def test_concurrent_write_between_read_and_update(self):
+        """A version bumped after the read still makes the conditional update miss."""
+        original = Trip.objects.filter
+        bumped = []
+
+        def racing_filter(*args, **kwargs):
+            if "version" in kwargs and not bumped:
+                bumped.append(Trip.objects.update(version=F("version") + 1))
+            return original(*args, **kwargs)
+
+        with (
+            mock.patch.object(Trip.objects, "filter", side_effect=racing_filter),
+            self.assertRaises(lifecycle.StaleTrip) as stale,
+        ):
+            lifecycle.transition(self.trip.pk, Trip.Status.CANCELLED)
+        self.assertEqual((stale.exception.status, stale.exception.version), (Trip.Status.PENDING, 1))
+        # The simulated write ran in the transition's transaction, so it was rolled back with it
+        self.trip.refresh_from_db()
+        self.assertEqual((self.trip.status, self.trip.version), (Trip.Status.PENDING, 0))
+        self.assertFalse(TripEvent.objects.exists())
+
+    def test_disallowed_transitions(self):
+        """Skipping states, leaving final states and assigning without a driver are rejected."""
+        self.assertEqual(self.post(status=Trip.Status.COMPLETED).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.post(status=Trip.Status.ASSIGNED).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.post(status=Trip.Status.CANCELLED, driver=self.driver.pk).status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.post(status=Trip.Status.CANCELLED)
+        self.assertEqual(self.post(status=Trip.Status.PENDING).status_code, status.HTTP_400_BAD_REQUEST)
+        self.trip.refresh_from_db()
+        self.assertEqual((self.trip.status, self.trip.version), (Trip.Status.CANCELLED, 1))
+
+    def test_status_is_not_writable_by_patch(self):
+        """Edits leave status and version alone, even when the instance was read before a transition."""
+        response = self.client.patch(
+            reverse("trip-detail", args=[self.trip.pk]), {"status": "completed", "version": 9}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["status"], response.data["version"]), (Trip.Status.PENDING, 0))
+
+        stale = Trip.objects.get(pk=self.trip.pk)
+        lifecycle.transition(self.trip.pk, Trip.Status.CANCELLED)
+        serializer = TripSerializer(stale, data={"end_location": "Hospital"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.trip.refresh_from_db()
+        self.assertEqual((self.trip.status, self.trip.end_location), (Trip.Status.CANCELLED, "Hospital"))
+
+    def test_crew_is_not_writable_by_patch(self):
+        """Crew and vehicle are only assigned by transitions, which bump the version and mark the vehicle."""
+        vendor = Company.objects.create(company_name="Patch Fleet", company_type=Company.Type.VENDOR)
+        vehicle = Vehicle.objects.create(plate_number="PATCH-1", type=Vehicle.Type.BASIC, vendor_company=vendor)
+        response = self.client.patch(
+            reverse("trip-detail", args=[self.trip.pk]), {"driver": self.driver.pk, "vehicle": vehicle.pk}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["driver"], response.data["vehicle"], response.data["version"]), (None, None, 0))
+
+        response = self.post(status=Trip.Status.ASSIGNED, version=0, driver=self.driver.pk, vehicle=vehicle.pk)
+        self.assertEqual(
+            (response.data["driver"], response.data["vehicle"], response.data["version"]), (self.driver.pk, vehicle.pk, 1)
+        )
+        vehicle.refresh_from_db()
+        self.assertEqual(vehicle.status, Vehicle.Status.IN_TRIP)
+
+
+@override_settings(AVAILABILITY_REGISTRY="trips.availability.MemoryRegistry")
+class AvailabilityRegistryTestCase(TestCase):
+    """Test the dispatch availability registry, its updates from transitions and reconciliation."""
+
+    def setUp(self):
+        self.registry = availability.get_registry()
+        self.registry.clear()
+        self.driver = User.objects.create_user(
+            username="avail_driver", email="avail_driver@example.com", password="pass123", role=User.Role.DRIVER
+        )
+        self.medic = User.objects.create_user(
+            username="avail_medic", email="avail_medic@example.com", password="pass123", role=User.Role.PARAMEDIC
+        )
+        User.objects.create_user(
+            username="gone", email="gone@example.com", password="pass123", role=User.Role.DRIVER, is_active=False
+        )
+        vendor = Company.objects.create(company_name="Fleet Co", company_type=Company.Type.VENDOR)
+        self.vehicle = Vehicle.objects.create(plate_number="ICU-1", type=Vehicle.Type.ICU, vendor_company=vendor)
+        self.trip = Trip.objects.create(start_location="Home", end_location="Hospital")
+
+    def transition(self, status, **fields):
+        with mock.patch.object(outbox, "kick"), self.captureOnCommitCallbacks(execute=True):
+            lifecycle.transition(self.trip.pk, status, **fields)
+
+    def test_reconcile_builds_from_database(self):
+        """Active crew off trips and available vehicles are registered; a second run changes nothing."""
+        self.assertEqual(availability.reconcile(), (3, 0))
+        self.assertEqual(availability.reconcile(), (0, 0))
+        self.assertEqual(self.registry.available(availability.CREW, User.Role.DRIVER), [self.driver.pk])
+        self.assertEqual(self.registry.count(availability.CREW, User.Role.PARAMEDIC), 1)
+        self.assertTrue(self.registry.is_available(availability.VEHICLES, Vehicle.Type.ICU, self.vehicle.pk))
+        self.assertEqual(self.registry.count(availability.VEHICLES, Vehicle.Type.BASIC), 0)
+
+    def test_transitions_take_and_release(self):
+        """Assigning takes crew and vehicle out, cancelling puts them back, in the registry and the database."""
+        availability.reconcile()
+        self.transition(Trip.Status.ASSIGNED, driver=self.driver, paramedic=self.medic, vehicle=self.vehicle)
+
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.status, Vehicle.Status.IN_TRIP)
+        self.assertFalse(self.registry.is_available(availability.CREW, User.Role.DRIVER, self.driver.pk))
+        self.assertEqual(self.registry.count(availability.CREW, User.Role.PARAMEDIC), 0)
+        self.assertEqual(self.registry.count(availability.VEHICLES, Vehicle.Type.ICU), 0)
+        self.assertEqual(availability.reconcile(), (0, 0))
+
+        self.transition(Trip.Status.CANCELLED)
+
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.status, Vehicle.Status.AVAILABLE)
+        self.assertTrue(self.registry.is_available(availability.CREW, User.Role.DRIVER, self.driver.pk))
+        self.assertTrue(self.registry.is_available(availability.VEHICLES, Vehicle.Type.ICU, self.vehicle.pk))
+        self.assertEqual(availability.reconcile(), (0, 0))
+
+    def test_unavailable_vehicle_cannot_be_assigned(self):
+        """Assigning a vehicle in maintenance fails and leaves the trip as it was."""
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(status=Vehicle.Status.MAINTENANCE)
+        with self.assertRaises(lifecycle.TransitionError):
+            self.transition(Trip.Status.ASSIGNED, driver=self.driver, vehicle=self.vehicle)
+        self.trip.refresh_from_db()
+        self.assertEqual((self.trip.status, self.trip.version, self.trip.driver_id), (Trip.Status.PENDING, 0, None))
+
+    def test_crew_on_an_active_trip_cannot_be_assigned(self):
+        """A driver or paramedic on another active trip is rejected and nothing is taken."""
+        Trip.objects.create(start_location="Depot", end_location="Clinic", status=Trip.Status.EN_ROUTE, paramedic=self.medic)
+        with self.assertRaises(lifecycle.TransitionError):
+            self.transition(Trip.Status.ASSIGNED, driver=self.driver, paramedic=self.medic, vehicle=self.vehicle)
+        self.trip.refresh_from_db()
+        self.vehicle.refresh_from_db()
+        self.assertEqual((self.trip.status, self.trip.driver_id), (Trip.Status.PENDING, None))
+        self.assertEqual(self.vehicle.status, Vehicle.Status.AVAILABLE)
+
+    def test_release_keeps_crew_on_another_trip(self):
+        """Ending a trip frees only the crew members with no other active trip."""
+        availability.reconcile()
+        self.transition(Trip.Status.ASSIGNED, driver=self.driver, paramedic=self.medic)
+        Trip.objects.create(start_location="Depot", end_location="Clinic", status=Trip.Status.EN_ROUTE, paramedic=self.medic)
+
+        self.transition(Trip.Status.CANCELLED)
+
+        self.assertTrue(self.registry.is_available(availability.CREW, User.Role.DRIVER, self.driver.pk))
+        self.assertFalse(self.registry.is_available(availability.CREW, User.Role.PARAMEDIC, self.medic.pk))
+        self.assertEqual(availability.reconcile(), (0, 0))
+
+    def test_reconcile_repairs_drift(self):
+        """Missed updates and members that left are corrected."""
+        availability.reconcile()
+        self.registry.apply(availability.busy([self.driver.pk]))
+        User.objects.filter(pk=self.medic.pk).update(is_active=False)
+        self.assertEqual(availability.reconcile(), (1, 1))
+        self.assertEqual(self.registry.available(availability.CREW, User.Role.DRIVER), [self.driver.pk])
+        self.assertEqual(self.registry.count(availability.CREW, User.Role.PARAMEDIC), 0)
+
+    def test_availability_endpoint(self):
+        availability.reconcile()
+        client = APIClient()
+        client.force_authenticate(self.driver)
+
+        response = client.get(reverse("availability-list"))
+        self.assertEqual(response.data["crew"], {User.Role.DRIVER: 1, User.Role.PARAMEDIC: 1})
+        self.assertEqual(response.data["vehicles"][Vehicle.Type.ICU], 1)
+
+        response = client.get(reverse("availability-list"), {"role": "Driver", "limit": 5})
+        self.assertEqual(response.data, {"role": "Driver", "count": 1, "available": [self.driver.pk]})
+        self.assertEqual(client.get(reverse("availability-list"), {"role": "Admin"}).status_code, status.HTTP_400_BAD_REQUEST)
@@ -6,6 +6,8 @@ from . import views
 router = DefaultRouter()
 router.register(r"trips", views.TripViewSet)
 router.register(r"messages", views.ChatMessageViewSet)
+router.register(r"archived-trips", views.ArchivedTripViewSet)
+router.register(r"availability", views.AvailabilityViewSet, basename="availability")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -1,16 +1,157 @@
-from rest_framework import permissions, viewsets
+from django.db import transaction
+from django.db.models import F
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters, permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
 
-from .models import ChatMessage, Trip
-from .serializers import ChatMessageSerializer, TripSerializer
+from config.async_views import AsyncReadMixin
+from config.exports import ExportMixin, parse_bound
+from config.fast_read import FastReadMixin
+from config.idempotency import IdempotencyMixin
 
+from . import availability, lifecycle, outbox
+from .filters import ArchivedTripFilter, ChatMessageFilter, TripFilter
+from .models import ArchivedTrip, ChatMessage, Trip
+from .serializers import (
+    ArchivedChatMessageSerializer,
+    ArchivedTripSerializer,
+    ChatMessageSerializer,
+    GPSTrackingHistorySerializer,
+    TripSerializer,
+    TripTransitionSerializer,
+)
 
-class TripViewSet(viewsets.ModelViewSet):
+
+class TripViewSet(IdempotencyMixin, ExportMixin, AsyncReadMixin, viewsets.ModelViewSet):
     queryset = Trip.objects.all()
     serializer_class = TripSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = TripFilter
+    ordering_fields = ["created_at", "start_time", "end_time", "status"]
+    fast_read_annotations = {"total_distance": F("end_odometer") - F("start_odometer")}
+    export_company_field = "patient__company"
+
+    # Creates are published through the outbox (trips.outbox), committed with the trip. Edits cannot
+    # change status or crew, which only move through transitions, so they have nothing to publish.
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            outbox.record_changes(serializer.save())
+
+    @action(detail=True, methods=["post"])
+    def transition(self, request, pk=None):
+        """
+        Move the trip to another status.
+
+        POST /api/v1/trips/{id}/transition/
+        {"status": "assigned", "version": 0, "driver": 7, "message": "..."}
+
+        ``version`` is the trip version the client last saw; when the trip
+        has changed since, nothing is written and 409 Conflict returns the
+        current status and version. Transitions not allowed from the current
+        status are rejected with 400 (see trips.lifecycle.TRANSITIONS).
+        """
+        trip = self.get_object()
+        serializer = TripTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            lifecycle.transition(trip.pk, **serializer.validated_data)
+        except lifecycle.StaleTrip as e:
+            return Response({"detail": str(e), "status": e.status, "version": e.version}, status=status.HTTP_409_CONFLICT)
+        except lifecycle.TransitionError as e:
+            raise ValidationError({"status": [str(e)]})
+        except Trip.DoesNotExist:
+            raise NotFound()
+        trip.refresh_from_db()
+        return Response(self.get_serializer(trip).data)
+
+    @action(detail=True, methods=["get"], url_path="gps-history")
+    def gps_history(self, request, pk=None):
+        """
+        GPS trail of a trip, oldest first.
 
+        GET /api/v1/trips/{id}/gps-history/?since=2025-01-01T10:00:00Z
 
-class ChatMessageViewSet(viewsets.ModelViewSet):
+        Bounded below by the trip's creation time, so only the monthly
+        partitions the trip spans are scanned. A ``since`` without an offset
+        is in the server's time zone.
+        """
+        trip = self.get_object()
+        since = trip.created_at
+        requested = parse_bound(request.query_params.get("since"), "since")
+        if requested is not None:
+            since = max(since, requested)
+
+        points = trip.gps_history.filter(recorded_at__gte=since).order_by("recorded_at")
+        return Response(GPSTrackingHistorySerializer(points, many=True).data)
+
+
+class ChatMessageViewSet(IdempotencyMixin, ExportMixin, FastReadMixin, viewsets.ModelViewSet):
     queryset = ChatMessage.objects.all()
     serializer_class = ChatMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ChatMessageFilter
+    export_time_field = "timestamp"
+    export_company_field = "trip__patient__company"
+
+
+class ArchivedTripViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only access to trips moved out of the hot tables by trips.archive."""
+
+    queryset = ArchivedTrip.objects.all()
+    serializer_class = ArchivedTripSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = ArchivedTripFilter
+    ordering_fields = ["created_at", "start_time", "end_time", "archived_at"]
+    ordering = ["-created_at"]
+
+    @action(detail=True, methods=["get"])
+    def messages(self, request, pk=None):
+        """
+        Chat messages of an archived trip, oldest first.
+
+        GET /api/v1/archived-trips/{id}/messages/
+        """
+        trip = self.get_object()
+        messages = trip.chat_messages.order_by("timestamp", "pk")
+        return Response(ArchivedChatMessageSerializer(messages, many=True).data)
+
+
+class AvailabilityViewSet(viewsets.ViewSet):
+    """
+    Crew and vehicles available for dispatch, from the availability registry (trips.availability).
+
+    GET /api/v1/availability/                           counts per crew role and vehicle type
+    GET /api/v1/availability/?role=Driver&limit=20      longest idle drivers first
+    GET /api/v1/availability/?vehicle_type=ICU
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        registry = availability.get_registry()
+        params = request.query_params
+        for param, kind in (("role", availability.CREW), ("vehicle_type", availability.VEHICLES)):
+            if param not in params:
+                continue
+            group = params[param]
+            if group not in availability.groups(kind):
+                raise ValidationError({param: [f"Choose one of {', '.join(availability.groups(kind))}."]})
+            try:
+                limit = min(max(int(params.get("limit", 50)), 1), 500)
+            except ValueError:
+                raise ValidationError({"limit": ["Enter a whole number."]})
+            return Response(
+                {param: group, "count": registry.count(kind, group), "available": registry.available(kind, group, limit)}
+            )
+
+        return Response(
+            {
+                kind: {group: registry.count(kind, group) for group in availability.groups(kind)}
+                for kind in (availability.CREW, availability.VEHICLES)
+            }
+        )
@@ -5,6 +5,8 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from config.async_views import async_read_view
+
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
@@ -53,30 +55,37 @@ def logout(request):
     Headers: Authorization: Token abc123...
     """
     try:
-        # Delete the user's token
+        # Delete the user's token (also drops it from the token cache, see users.signals)
         request.user.auth_token.delete()
         return Response({"message": "Successfully logged out"})
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+def profile_data(user):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "role": getattr(user, "role", ""),
+        "status": getattr(user, "status", ""),
+    }
+
+
 @api_view(["GET"])
-def user_profile(request):
+def _user_profile(request):
     """
     Get current user profile
 
     GET /api/v1/auth/profile/
     Headers: Authorization: Token abc123...
     """
-    user = request.user
-    return Response(
-        {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "role": getattr(user, "role", ""),
-            "status": getattr(user, "status", ""),
-        }
-    )
+    return Response(profile_data(request.user))
+
+
+# Token-authenticated requests are served without a thread (see config/async_views.py)
+@async_read_view(_user_profile)
+async def user_profile(view):
+    return profile_data(view.request.user)
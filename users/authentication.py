@@ -0,0 +1,208 @@
+"""
+Cached token authentication.
+
+Resolving an API token to its user normally costs a Token/User join on every
+request. Resolved tokens are kept in two cache levels:
+
+1. a small in-process LRU with a very short TTL, so hot tokens cost nothing;
+2. the shared Django cache (Redis), so other workers and pods skip the
+   database too.
+
+Deleting a token (logout) or saving its user (deactivation, role changes)
+drops both levels in this process and the shared level everywhere; other
+processes' LRU entries expire within ``AUTH_TOKEN_LOCAL_CACHE_TTL`` seconds.
+Cache outages fall back to the database.
+
+The shared level stores the user's fields as a plain dict without the
+password hash, which is loaded from the database only if something reads it.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+def _ttl():
+    return getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60)
+
+
+def _local_ttl():
+    return getattr(settings, "AUTH_TOKEN_LOCAL_CACHE_TTL", 5)
+
+
+class LocalTokenCache:
+    """Thread-safe LRU of resolved tokens with a per-entry TTL."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, key, token, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_tokens = LocalTokenCache()
+
+
+def token_cache_key(key):
+    # Hashed so raw credentials never end up in the cache; v2 entries are dicts, not pickled Tokens
+    return "auth:token:v2:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_token_key(request):
+    """Return the key of an ``Authorization: Token <key>`` header, or None."""
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != b"token":
+        return None
+    try:
+        return auth[1].decode()
+    except UnicodeError:
+        return None
+
+
+# Never copied to the shared cache
+UNCACHED_USER_FIELDS = ("password",)
+
+
+def _to_cached(token):
+    """Return what the shared level stores for ``token``: plain values, no credentials."""
+    fields = [field.attname for field in User._meta.concrete_fields if field.attname not in UNCACHED_USER_FIELDS]
+    return {"created": token.created, "user": {name: getattr(token.user, name) for name in fields}}
+
+
+def _from_cached(key, cached):
+    """Rebuild the ``Token`` and its ``User``; the uncached fields stay deferred."""
+    user = User.from_db(None, list(cached["user"]), list(cached["user"].values()))
+    token = Token(key=key, user=user, created=cached["created"])
+    token._state.adding = False
+    return token
+
+
+def _load_token(key):
+    try:
+        return Token.objects.select_related("user").get(key=key)
+    except Token.DoesNotExist:
+        return None
+
+
+def get_token(key):
+    """Return the ``Token`` (with ``user`` loaded) for ``key``, or None if it does not exist."""
+    token = local_tokens.get(key)
+    if token is not None:
+        return token
+
+    cache_key = token_cache_key(key)
+    try:
+        cached = cache.get(cache_key)
+    except Exception:
+        logger.warning("Token cache unavailable, authenticating from the database", exc_info=True)
+        return _load_token(key)
+
+    if cached is not None:
+        token = _from_cached(key, cached)
+    else:
+        token = _load_token(key)
+        if token is None:
+            return None
+        try:
+            cache.set(cache_key, _to_cached(token), _ttl())
+        except Exception:
+            logger.warning("Could not cache token", exc_info=True)
+
+    local_tokens.set(key, token, _local_ttl())
+    return token
+
+
+async def aget_token(key):
+    """
+    Async ``get_token`` using the async cache and ORM interfaces.
+
+    Returns None for unknown keys and inactive users.
+    """
+    token = local_tokens.get(key)
+    if token is None:
+        cache_key = token_cache_key(key)
+        try:
+            cached = await cache.aget(cache_key)
+        except Exception:
+            logger.warning("Token cache unavailable, authenticating from the database", exc_info=True)
+            return await sync_to_async(_load_token)(key)
+
+        if cached is not None:
+            token = _from_cached(key, cached)
+        else:
+            try:
+                token = await Token.objects.select_related("user").aget(key=key)
+            except Token.DoesNotExist:
+                return None
+            try:
+                await cache.aset(cache_key, _to_cached(token), _ttl())
+            except Exception:
+                logger.warning("Could not cache token", exc_info=True)
+        local_tokens.set(key, token, _local_ttl())
+
+    return token if token.user.is_active else None
+
+
+def invalidate_token(key):
+    """Drop a cached token, e.g. after it was deleted or its user changed."""
+    local_tokens.delete(key)
+    try:
+        cache.delete(token_cache_key(key))
+    except Exception:
+        logger.warning("Could not invalidate cached token", exc_info=True)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` resolving tokens through the two-level token cache."""
+
+    def authenticate_credentials(self, key):
+        token = get_token(key)
+        if token is None:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        return (token.user, token)
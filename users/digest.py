@@ -0,0 +1,83 @@
+"""
+Daily trip digest for drivers and paramedics.
+
+All of today's trips with a crew member are read with one query on
+``Trip.start_time`` (index ``trip_start_time_idx``) and grouped per crew
+member in memory; the crew's addresses come from a second query. Digests are
+rendered ``DIGEST_CHUNK_SIZE`` at a time and each chunk goes to the
+notification transport (see users.notifications) over one connection.
+
+Crew members without trips today get no digest.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from trips.models import Trip
+
+from .models import User
+from .notifications import get_transport
+
+CREW_ROLES = (User.Role.DRIVER, User.Role.PARAMEDIC)
+
+# Columns read per trip: everything the digest shows
+TRIP_COLUMNS = ["pk", "driver_id", "paramedic_id", "status", "start_time", "start_location", "end_location"]
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def trips_by_crew(day, user_id=None):
+    """Return ``{user_id: [trip row, ...]}`` for crew with trips starting on ``day``, in start order."""
+    start, end = day_bounds(day)
+    trips = Trip.objects.filter(start_time__gte=start, start_time__lt=end).exclude(status=Trip.Status.CANCELLED)
+    if user_id is None:
+        trips = trips.filter(Q(driver__isnull=False) | Q(paramedic__isnull=False))
+    else:
+        trips = trips.filter(Q(driver_id=user_id) | Q(paramedic_id=user_id))
+
+    crew = {}
+    for row in trips.order_by("start_time", "pk").values_list(*TRIP_COLUMNS):
+        _, driver_id, paramedic_id = row[:3]
+        for member_id in {driver_id, paramedic_id} - {None}:
+            if user_id is None or member_id == user_id:
+                crew.setdefault(member_id, []).append(row)
+    return crew
+
+
+def render_digest(name, day, trips):
+    """Return ``(subject, body)`` for one crew member's digest."""
+    lines = [f"Hello {name},", "", f"You have {len(trips)} trip(s) on {day:%Y-%m-%d}:", ""]
+    for pk, _, _, status, start_time, start_location, end_location in trips:
+        local_start = timezone.localtime(start_time)
+        lines.append(f"- {local_start:%H:%M} Trip #{pk}: {start_location} -> {end_location} ({status})")
+    return f"Daily Digest - {day:%Y-%m-%d}", "\n".join(lines)
+
+
+def send_digests(day=None, user_id=None, chunk_size=None):
+    """Send today's digests (or ``user_id``'s only); returns ``(crew with trips, digests sent)``."""
+    day = day or timezone.localdate()
+    chunk_size = chunk_size or getattr(settings, "DIGEST_CHUNK_SIZE", 1000)
+
+    crew = trips_by_crew(day, user_id)
+    if not crew:
+        return 0, 0
+    recipients = list(
+        User.objects.filter(pk__in=crew, is_active=True, role__in=CREW_ROLES)
+        .exclude(email="")
+        .order_by("pk")
+        .values_list("pk", "email", "first_name", "username")
+    )
+
+    sent = 0
+    for offset in range(0, len(recipients), chunk_size):
+        chunk = recipients[offset : offset + chunk_size]
+        digests = [(email, *render_digest(first_name or username, day, crew[pk])) for pk, email, first_name, username in chunk]
+        with get_transport() as transport:
+            sent += transport.send(digests)
+    return len(crew), sent
@@ -19,6 +19,9 @@ class User(AbstractUser):
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.ACTIVE)
     phone_number = models.CharField(max_length=20, blank=True, null=True)
 
+    # Client/vendor staff belong to a company and only see its records; ATW staff have none
+    company = models.ForeignKey("users.Company", on_delete=models.SET_NULL, related_name="users", blank=True, null=True)
+
     # We can remove username requirement if we want email login, but forcing username=email is easier for now
     # or just keep standard django username. Let's keep standard for simplicity unless SRS forces email login.
     # SRS implies login, usually email. Let's ensure email is unique.
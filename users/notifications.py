@@ -0,0 +1,174 @@
+"""
+Buffered, coalesced notification delivery.
+
+``notify`` does not send anything: it appends the event to a per-user list
+in Redis and marks the user due ``NOTIFICATION_COALESCE_WINDOW`` seconds
+after their first pending event. The ``flush_notifications`` task (every
+few seconds, see config/celery.py) pops due users in batches of
+``NOTIFICATION_BATCH_SIZE``, loads all of their recipients with one query,
+merges each user's events into a single message and hands the batch to the
+transport, which sends it over one connection.
+
+The transport is pluggable through ``NOTIFICATION_TRANSPORT``. The default
+``EmailTransport`` goes through Django's ``EMAIL_BACKEND``, so the console
+and file backends serve as local stand-ins for SMTP.
+
+If Redis is unreachable, ``notify`` delivers the event on its own right away.
+"""
+
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Pops up to ARGV[2] users due by ARGV[1]; atomic, so concurrent flushes never share a user
+POP_DUE_SCRIPT = """
+local users = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #users > 0 then
+    redis.call('ZREM', KEYS[1], unpack(users))
+end
+return users
+"""
+
+# Pending lists outlive a stalled flusher by this much before Redis drops them
+PENDING_TTL = 24 * 60 * 60
+
+
+def _prefix():
+    return getattr(settings, "NOTIFICATION_REDIS_PREFIX", "atw:notify")
+
+
+def _due_key():
+    return f"{_prefix()}:due"
+
+
+def _pending_key(user_id):
+    return f"{_prefix()}:pending:{user_id}"
+
+
+def _redis():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection("default")
+
+
+class EmailTransport:
+    """Sends a batch of notifications as emails over a single backend connection."""
+
+    def __init__(self):
+        self.connection = get_connection()
+
+    def __enter__(self):
+        self.connection.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.connection.close()
+
+    def send(self, notifications):
+        """Send ``(email, subject, body)`` triples; returns the number sent."""
+        messages = [
+            EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [email]) for email, subject, body in notifications
+        ]
+        return self.connection.send_messages(messages) or 0
+
+
+def get_transport():
+    return import_string(getattr(settings, "NOTIFICATION_TRANSPORT", "users.notifications.EmailTransport"))()
+
+
+def coalesce(events):
+    """Merge a user's pending events into one ``(subject, body)``."""
+    if len(events) == 1:
+        event = events[0]
+        return f"ATW Transportation - {event['type']}", event["message"]
+    body = "\n".join(f"- {event['message']}" for event in events)
+    return f"ATW Transportation - {len(events)} updates", body
+
+
+def deliver(pending):
+    """
+    Deliver ``{user_id: [event, ...]}``, one message per user.
+
+    Recipients are resolved with a single query; users without an email
+    address or no longer active are skipped. Returns the number sent.
+    """
+    from users.models import User
+
+    recipients = dict(User.objects.filter(pk__in=pending, is_active=True).exclude(email="").values_list("pk", "email"))
+    notifications = [(recipients[user_id], *coalesce(events)) for user_id, events in pending.items() if user_id in recipients]
+    if not notifications:
+        return 0
+    with get_transport() as transport:
+        return transport.send(notifications)
+
+
+def notify(user_id, notification_type, message, **context):
+    """Queue a notification for ``user_id``; it is merged with others that arrive within the window."""
+    event = json.dumps({"type": notification_type, "message": message, "context": context}, default=str)
+    window = getattr(settings, "NOTIFICATION_COALESCE_WINDOW", 60)
+    try:
+        with _redis().pipeline() as pipe:
+            pipe.rpush(_pending_key(user_id), event)
+            pipe.expire(_pending_key(user_id), PENDING_TTL)
+            pipe.zadd(_due_key(), {str(user_id): time.time() + window}, nx=True)
+            pipe.execute()
+    except Exception:
+        logger.warning("Notification buffer unavailable, delivering directly", exc_info=True)
+        deliver({int(user_id): [json.loads(event)]})
+
+
+def pop_due(redis, now, batch_size):
+    """
+    Take up to ``batch_size`` due users and their pending events out of Redis.
+
+    Returns ``(popped, pending)``: the number of users popped and
+    ``{user_id: [event, ...]}`` for those that still had events.
+    """
+    user_ids = [int(user_id) for user_id in redis.eval(POP_DUE_SCRIPT, 1, _due_key(), now, batch_size)]
+    if not user_ids:
+        return 0, {}
+    with redis.pipeline() as pipe:
+        for user_id in user_ids:
+            pipe.lrange(_pending_key(user_id), 0, -1)
+            pipe.delete(_pending_key(user_id))
+        results = pipe.execute()
+    pending = {user_id: [json.loads(event) for event in raw] for user_id, raw in zip(user_ids, results[::2]) if raw}
+    return len(user_ids), pending
+
+
+def requeue(redis, pending, retry_at):
+    """Put undelivered events back, due again at ``retry_at``."""
+    with redis.pipeline() as pipe:
+        for user_id, events in pending.items():
+            pipe.lpush(_pending_key(user_id), *[json.dumps(event) for event in reversed(events)])
+            pipe.expire(_pending_key(user_id), PENDING_TTL)
+            pipe.zadd(_due_key(), {str(user_id): retry_at}, nx=True)
+        pipe.execute()
+
+
+def flush(now=None, batch_size=None):
+    """Deliver every user whose window has closed by ``now``; returns ``(users, sent)``."""
+    now = time.time() if now is None else now
+    batch_size = batch_size or getattr(settings, "NOTIFICATION_BATCH_SIZE", 500)
+    redis = _redis()
+
+    users = sent = 0
+    while True:
+        popped, pending = pop_due(redis, now, batch_size)
+        if pending:
+            try:
+                sent += deliver(pending)
+            except Exception:
+                logger.exception("Notification delivery failed for %d users, retrying later", len(pending))
+                requeue(redis, pending, time.time() + getattr(settings, "NOTIFICATION_COALESCE_WINDOW", 60))
+                break
+            users += len(pending)
+        if popped < batch_size:
+            break
+    return users, sent
@@ -6,7 +6,9 @@ from .models import Company, User
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ["id", "username", "email", "first_name", "last_name", "role", "status", "phone_number"]
+        fields = ["id", "username", "email", "first_name", "last_name", "role", "status", "phone_number", "company"]
+        # The company scopes patient search (patients.views); users cannot move themselves into another one
+        read_only_fields = ["company"]
 
 
 class CompanySerializer(serializers.ModelSerializer):
@@ -6,16 +6,17 @@ Handles email notifications, SMS, and push notifications.
 
 from celery import shared_task
 
+from config.idempotency import idempotent_task
 
-@shared_task(queue="low_priority")
+
+@shared_task(queue="low_priority", ignore_result=True)
 def send_notification(user_id, notification_type, message, **kwargs):
     """
     Send notification to a user.
 
-    Supports multiple notification channels:
-    - Email
-    - SMS (future)
-    - Push notifications (future)
+    Kept for callers that still enqueue one task per notification; the
+    notification joins the coalescing buffer (see users.notifications).
+    In-process callers should call ``users.notifications.notify`` directly.
 
     Args:
         user_id: User ID to send notification to
@@ -26,37 +27,32 @@ def send_notification(user_id, notification_type, message, **kwargs):
     Returns:
         Success or error message
     """
-    from users.models import User
+    from users.notifications import notify
 
     try:
-        user = User.objects.get(id=user_id)
+        notify(user_id, notification_type, message, **kwargs)
+        return f"Notification queued for user {user_id}: {notification_type}"
 
-        # TODO: Implement actual notification sending
-        # For now, just log the notification
+    except Exception as e:
+        return f"Error sending notification: {str(e)}"
 
-        # Example: Email notification
-        if user.email:
-            # send_email(
-            #     to=user.email,
-            #     subject=f"ATW Transportation - {notification_type}",
-            #     message=message,
-            #     **kwargs
-            # )
-            pass
 
-        # Example: SMS notification (future)
-        # if user.phone:
-        #     send_sms(to=user.phone, message=message)
+@shared_task(queue="low_priority", ignore_result=True)
+def flush_notifications():
+    """
+    Periodic task delivering buffered notifications whose coalescing window has closed.
 
-        return f"Notification sent to user {user_id}: {notification_type}"
+    Runs every few seconds (configured in config/celery.py); each user gets
+    one message for everything queued for them within the window.
+    """
+    from users.notifications import flush
 
-    except User.DoesNotExist:
-        return f"User {user_id} not found"
-    except Exception as e:
-        return f"Error sending notification: {str(e)}"
+    users, sent = flush()
+    return f"Delivered {sent} notifications to {users} users"
 
 
-@shared_task(queue="low_priority")
+@shared_task(queue="low_priority", ignore_result=True)
+@idempotent_task
 def send_welcome_email(user_id):
     """
     Send welcome email to newly registered user.
@@ -87,89 +83,61 @@ def send_welcome_email(user_id):
 
     except User.DoesNotExist:
         return f"User {user_id} not found"
-    except Exception as e:
-        return f"Error sending welcome email: {str(e)}"
 
 
-@shared_task(queue="normal")
-def send_trip_assignment_notification(trip_id, driver_id):
+@shared_task(queue="normal", ignore_result=True)
+@idempotent_task
+def send_trip_assignment_notification(trip_id, driver_id, event_id=None):
     """
     Notify driver about new trip assignment.
 
     Args:
         trip_id: Trip ID
         driver_id: Driver user ID
+        event_id: Outbox event of the assignment; part of the idempotency key,
+            so a later re-assignment to the same driver is notified again
 
     Returns:
         Success or error message
     """
     from trips.models import Trip
-    from users.models import User
+    from users.notifications import notify
 
     try:
-        trip = Trip.objects.select_related("patient").get(id=trip_id)
-        # The 'driver' variable was fetched but not used.
-        # driver = User.objects.get(id=driver_id)
+        trip = Trip.objects.get(id=trip_id)
 
         message = f"You have been assigned to Trip #{trip_id}. "
-        message += f"Pickup: {trip.pickup_location}, Dropoff: {trip.dropoff_location}. "
-        message += f"Scheduled time: {trip.scheduled_pickup_time}"
+        message += f"Pickup: {trip.start_location}, Dropoff: {trip.end_location}."
+        if trip.start_time:
+            message += f" Start time: {trip.start_time}"
 
-        return send_notification(
-            user_id=driver_id,
-            notification_type="trip_assigned",
-            message=message,
-            trip_id=trip_id,
-        )
+        notify(driver_id, "trip_assigned", message, trip_id=trip_id)
+        return f"Notification queued for user {driver_id}: trip_assigned"
 
-    except (Trip.DoesNotExist, User.DoesNotExist) as e:
+    except Trip.DoesNotExist as e:
         return f"Error: {str(e)}"
 
 
 @shared_task(queue="low_priority")
-def send_daily_digest(user_id):
+def send_daily_digest(user_id=None):
     """
     Send daily digest email with trip summary and updates.
 
+    Runs daily for every driver and paramedic (configured in
+    config/celery.py); today's trips are read in one query and the digests
+    are sent in chunks (see users.digest).
+
     Args:
-        user_id: User ID
+        user_id: Only send this user's digest (optional)
 
     Returns:
         Success or error message
     """
-    from django.utils import timezone
-
-    from trips.models import Trip
-    from users.models import User
+    from users.digest import send_digests
 
     try:
-        user = User.objects.get(id=user_id)
-
-        if not user.email:
-            return f"No email address for user {user_id}"
+        crew, sent = send_digests(user_id=user_id)
+        return f"Daily digest sent to {sent} of {crew} crew members with trips today"
 
-        # Get today's trips
-        today = timezone.now().date()
-        trips = Trip.objects.filter(
-            driver=user,
-            scheduled_pickup_time__date=today,
-        ).order_by("scheduled_pickup_time")
-
-        # TODO: Send digest email with trip list
-        # send_email(
-        #     to=user.email,
-        #     subject=f"Daily Digest - {today}",
-        #     template="daily_digest.html",
-        #     context={
-        #         "user": user,
-        #         "trips": trips,
-        #         "date": today,
-        #     }
-        # )
-
-        return f"Daily digest sent to {user.email} with {trips.count()} trips"
-
-    except User.DoesNotExist:
-        return f"User {user_id} not found"
     except Exception as e:
         return f"Error sending daily digest: {str(e)}"
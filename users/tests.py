@@ -2,13 +2,25 @@
 Tests for user authentication and management - Fixed to match actual models.
 """
 
-from django.test import TestCase
+import base64
+import time
+import uuid
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
+from trips.models import Trip
+from users.authentication import LocalTokenCache, local_tokens, token_cache_key
+from users.digest import day_bounds, send_digests
 from users.models import Company, User
+from users.notifications import flush, notify
 
 
 class AuthenticationTestCase(TestCase):
@@ -124,6 +136,16 @@ class UserViewSetTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(User.objects.filter(username="newuser").exists())
 
+    def test_company_is_read_only(self):
+        """A user cannot pick the company that scopes their patient search."""
+        company = Company.objects.create(company_name="Other Client", company_type=Company.Type.CLIENT)
+        url = reverse("user-detail", args=[self.admin_user.pk])
+        response = self.client.patch(url, {"company": company.pk, "first_name": "Ada"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.admin_user.refresh_from_db()
+        self.assertEqual((self.admin_user.company_id, self.admin_user.first_name), (None, "Ada"))
+
     def test_get_user_detail(self):
         """Test retrieving user details."""
         url = reverse("user-detail", kwargs={"pk": self.admin_user.pk})
@@ -178,3 +200,200 @@ class CompanyTestCase(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 2)
+
+
+class AsyncProfileTestCase(TestCase):
+    """Test the async profile endpoint and its token cache."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="profiled", email="profiled@example.com", password="profile123")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_profile_from_cache(self):
+        """A cached token serves the profile without touching the database."""
+        self.client.get(reverse("profile"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("profile"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["username"], "profiled")
+
+    def test_logout_invalidates_cached_token(self):
+        """A logged-out token stops working immediately."""
+        self.assertEqual(self.client.get(reverse("profile")).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(reverse("logout")).status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(reverse("profile")).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+    """Test cached token authentication and its invalidation."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="cached", email="cached@example.com", password="cached123")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_cached_token_skips_auth_query(self):
+        """After the first request the token join is served from cache."""
+        url = reverse("company-list")
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        local_tokens.clear()
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+    def test_shared_cache_holds_no_password_hash(self):
+        """The shared level stores the user without credentials; they load on demand."""
+        self.client.get(reverse("company-list"))
+        cached = cache.get(token_cache_key(self.token.key))
+        self.assertEqual(cached["user"]["id"], self.user.pk)
+        self.assertNotIn("password", cached["user"])
+        self.assertNotIn(self.user.password, repr(cached))
+
+        local_tokens.clear()
+        response = self.client.get(reverse("profile"))
+        self.assertEqual(response.data["username"], "cached")
+        self.assertTrue(response.wsgi_request.user.check_password("cached123"))
+
+    def test_deactivation_invalidates_cached_token(self):
+        """A deactivated user is rejected on the next request."""
+        url = reverse("company-list")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(str(response.data["detail"]), "User inactive or deleted.")
+
+    def test_invalid_token(self):
+        """Unknown tokens are rejected with DRF's message."""
+        self.client.credentials(HTTP_AUTHORIZATION="Token not-a-real-token")
+        response = self.client.get(reverse("company-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(str(response.data["detail"]), "Invalid token.")
+
+    def test_basic_auth_disabled_by_default(self):
+        """Basic auth is off unless API_BASIC_AUTH is set."""
+        self.client.credentials()
+        self.client.credentials(HTTP_AUTHORIZATION="Basic " + base64.b64encode(b"cached:cached123").decode())
+        response = self.client.get(reverse("company-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_local_cache_lru_and_ttl(self):
+        """The process-local level evicts least recently used and expired entries."""
+        local = LocalTokenCache(maxsize=2)
+        local.set("a", 1, ttl=60)
+        local.set("b", 2, ttl=60)
+        local.get("a")
+        local.set("c", 3, ttl=60)
+        self.assertEqual((local.get("a"), local.get("b"), local.get("c")), (1, None, 3))
+
+        local.set("d", 4, ttl=-1)
+        self.assertIsNone(local.get("d"))
+
+
+class NotificationPipelineTestCase(TestCase):
+    """Test buffered, coalesced notification delivery."""
+
+    def setUp(self):
+        """Isolate the Redis buffer and set up recipients."""
+        override = override_settings(
+            NOTIFICATION_REDIS_PREFIX=f"test:notify:{uuid.uuid4().hex}", NOTIFICATION_COALESCE_WINDOW=60
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.driver = User.objects.create_user(username="notified", email="notified@example.com", password="pass123")
+        self.medic = User.objects.create_user(username="medic", email="medic@example.com", password="pass123")
+        self.later = time.time() + 120
+
+    def test_events_within_window_are_coalesced(self):
+        """Several events for one user become one message; one query resolves all recipients."""
+        notify(self.driver.pk, "trip_assigned", "Assigned to Trip #1")
+        notify(self.driver.pk, "trip_timeout", "Trip #1 is overdue")
+        notify(self.medic.pk, "trip_assigned", "Assigned to Trip #1")
+
+        self.assertEqual(flush(), (0, 0))
+        with self.assertNumQueries(1):
+            self.assertEqual(flush(now=self.later), (2, 2))
+
+        messages = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(messages["notified@example.com"].subject, "ATW Transportation - 2 updates")
+        self.assertIn("Trip #1 is overdue", messages["notified@example.com"].body)
+        self.assertEqual(messages["medic@example.com"].body, "Assigned to Trip #1")
+        self.assertEqual(flush(now=self.later), (0, 0))
+
+    def test_batch_uses_one_connection(self):
+        """Each batch is handed to the transport over a single connection."""
+        for user in (self.driver, self.medic):
+            notify(user.pk, "digest", "Your day")
+        with mock.patch("django.core.mail.backends.locmem.EmailBackend.open") as open_connection:
+            flush(now=self.later, batch_size=10)
+        self.assertEqual(open_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_failed_delivery_is_retried(self):
+        """Events survive a transport failure and go out on a later flush."""
+        notify(self.driver.pk, "trip_assigned", "Assigned to Trip #2")
+        with mock.patch("users.notifications.deliver", side_effect=ConnectionError):
+            self.assertEqual(flush(now=self.later), (0, 0))
+        self.assertEqual(flush(now=self.later + 120), (1, 1))
+        self.assertEqual(mail.outbox[0].body, "Assigned to Trip #2")
+
+
+class DailyDigestTestCase(TestCase):
+    """Test the fleet-wide daily digest."""
+
+    def setUp(self):
+        """Set up crew and today's trips."""
+        self.driver = User.objects.create_user(
+            username="digest_driver", email="driver@example.com", password="pass123", role=User.Role.DRIVER
+        )
+        self.medic = User.objects.create_user(
+            username="digest_medic", email="medic@example.com", password="pass123", role=User.Role.PARAMEDIC
+        )
+        self.idle = User.objects.create_user(
+            username="idle_driver", email="idle@example.com", password="pass123", role=User.Role.DRIVER
+        )
+        self.today = timezone.localdate()
+        noon = day_bounds(self.today)[0] + timezone.timedelta(hours=12)
+        for hours, paramedic in ((2, self.medic), (0, None)):
+            Trip.objects.create(
+                start_location="Home",
+                end_location="Hospital",
+                status=Trip.Status.ASSIGNED,
+                driver=self.driver,
+                paramedic=paramedic,
+                start_time=noon + timezone.timedelta(hours=hours),
+            )
+        yesterday = noon - timezone.timedelta(days=1)
+        Trip.objects.create(start_location="A", end_location="B", driver=self.idle, start_time=yesterday)
+        Trip.objects.create(
+            start_location="A", end_location="B", driver=self.idle, status=Trip.Status.CANCELLED, start_time=noon
+        )
+
+    def test_one_query_per_stage_and_chunked_delivery(self):
+        """Trips and recipients take one query each; digests go out in chunks."""
+        with self.assertNumQueries(2), mock.patch("django.core.mail.backends.locmem.EmailBackend.open") as connection:
+            self.assertEqual(send_digests(self.today, chunk_size=1), (2, 2))
+        self.assertEqual(connection.call_count, 2)
+
+        digests = {message.to[0]: message.body for message in mail.outbox}
+        self.assertEqual(set(digests), {"driver@example.com", "medic@example.com"})
+        self.assertIn("You have 2 trip(s)", digests["driver@example.com"])
+        self.assertLess(digests["driver@example.com"].index("12:00"), digests["driver@example.com"].index("14:00"))
+        self.assertIn("You have 1 trip(s)", digests["medic@example.com"])
+
+    def test_single_crew_member(self):
+        """Passing a user limits the digest to that crew member."""
+        self.assertEqual(send_digests(self.today, user_id=self.medic.pk), (1, 1))
+        self.assertEqual([message.to for message in mail.outbox], [["medic@example.com"]])
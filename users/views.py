@@ -1,16 +1,18 @@
 from rest_framework import permissions, viewsets
 
+from config.idempotency import IdempotencyMixin
+
 from .models import Company, User
 from .serializers import CompanySerializer, UserSerializer
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(IdempotencyMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
-class CompanyViewSet(viewsets.ModelViewSet):
+class CompanyViewSet(IdempotencyMixin, viewsets.ModelViewSet):
     queryset = Company.objects.all()
     serializer_class = CompanySerializer
     permission_classes = [permissions.IsAuthenticated]
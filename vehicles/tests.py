@@ -2,7 +2,7 @@
 Tests for vehicle management - Fixed to match actual Vehicle model.
 """
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.authtoken.models import Token
@@ -94,3 +94,19 @@ class VehicleViewSetTestCase(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["plate_number"], "AMB-401")
+
+    def test_async_reads_match_sync_views(self):
+        """The async list/detail path renders exactly what the sync views render."""
+        vehicle = Vehicle.objects.create(
+            plate_number="AMB-501",
+            type=Vehicle.Type.WHEELCHAIR,
+            vendor_company=self.company,
+            odometer_reading=1520.5,
+        )
+
+        for url in (reverse("vehicle-list"), reverse("vehicle-detail", kwargs={"pk": vehicle.pk})):
+            async_response = self.client.get(url)
+            with override_settings(ASYNC_READ_VIEWS=False):
+                sync_response = self.client.get(url)
+            self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(async_response.content, sync_response.content)
@@ -1,10 +1,13 @@
 from rest_framework import permissions, viewsets
 
+from config.async_views import AsyncReadMixin
+from config.idempotency import IdempotencyMixin
+
 from .models import Vehicle
 from .serializers import VehicleSerializer
 
 
-class VehicleViewSet(viewsets.ModelViewSet):
+class VehicleViewSet(IdempotencyMixin, AsyncReadMixin, viewsets.ModelViewSet):
     queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
     permission_classes = [permissions.IsAuthenticated]